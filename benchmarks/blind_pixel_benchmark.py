@@ -0,0 +1,35 @@
+"""Compares the precomputed blind pixel replacement with cv2.inpaint.
+
+Run from the repository root with `python -m benchmarks.blind_pixel_benchmark`."""
+import timeit
+import cv2
+import numpy as np
+
+from src.BlindPixelCorrector import BlindPixelCorrector
+
+SENSOR_SIZES = [(120, 160), (288, 384), (480, 640)]
+BLIND_PIXEL_RATIO = 0.001
+REPEATS = 200
+
+
+def run(height, width):
+    rng = np.random.default_rng(0)
+    frame = rng.normal(8000, 50, (height, width)).astype(np.float32)
+    mask = np.zeros((height, width), dtype=np.uint8)
+    count = max(10, int(height * width * BLIND_PIXEL_RATIO))
+    mask[rng.integers(0, height, count), rng.integers(0, width, count)] = 255
+
+    inpaint_time = timeit.timeit(lambda: cv2.inpaint(frame, mask, 3, cv2.INPAINT_TELEA), number=REPEATS) / REPEATS
+    build_time = timeit.timeit(lambda: BlindPixelCorrector(mask), number=10) / 10
+    corrector = BlindPixelCorrector(mask)
+    work_frame = frame.copy()
+    correct_time = timeit.timeit(lambda: corrector.correct(work_frame), number=REPEATS) / REPEATS
+    return inpaint_time, build_time, correct_time
+
+
+if __name__ == "__main__":
+    print(f"{'sensor':>10} {'inpaint':>12} {'build':>12} {'correct':>12} {'speedup':>8}")
+    for height, width in SENSOR_SIZES:
+        inpaint_time, build_time, correct_time = run(height, width)
+        print(f"{width:>4}x{height:<5} {inpaint_time*1e6:>10.1f}us {build_time*1e6:>10.1f}us "
+              f"{correct_time*1e6:>10.1f}us {inpaint_time/correct_time:>7.1f}x")
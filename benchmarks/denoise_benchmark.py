@@ -0,0 +1,36 @@
+"""Measures the temporal denoiser and the noise it removes.
+
+Run from the repository root with `python -m benchmarks.denoise_benchmark`."""
+import timeit
+import numpy as np
+
+from src.TemporalDenoiser import TemporalDenoiser
+
+SENSOR_SIZES = [(120, 160), (288, 384), (480, 640), (1024, 1280)]
+NOISE = 20.0
+WARMUP_FRAMES = 50
+REPEATS = 200
+
+
+def run(height, width):
+    rng = np.random.default_rng(0)
+    rows, cols = np.mgrid[0:height, 0:width]
+    scene = (8000 + 10 * cols + 5 * rows).astype(np.float32)
+    frames = [scene + rng.normal(0, NOISE, scene.shape).astype(np.float32) for _ in range(8)]
+
+    denoiser = TemporalDenoiser(motion_threshold=3 * NOISE)
+    for index in range(WARMUP_FRAMES):
+        output = denoiser.denoise(frames[index % len(frames)].copy())
+    residual = float(np.std(output - scene))
+
+    work_frame = frames[0].copy()
+    denoise_time = timeit.timeit(lambda: denoiser.denoise(work_frame), number=REPEATS) / REPEATS
+    return denoise_time, residual
+
+
+if __name__ == "__main__":
+    print(f"{'sensor':>10} {'denoise':>12} {'ns/pixel':>9} {'noise in':>9} {'noise out':>10}")
+    for height, width in SENSOR_SIZES:
+        denoise_time, residual = run(height, width)
+        print(f"{width:>4}x{height:<5} {denoise_time*1e6:>10.1f}us {denoise_time*1e9/(width*height):>9.2f} "
+              f"{NOISE:>9.1f} {residual:>10.1f}")
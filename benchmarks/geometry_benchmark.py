@@ -0,0 +1,55 @@
+"""Measures orienting, colorizing and scaling a frame for display and
+recording: colorizing strided views and resizing the color frame against
+planned geometry steps per output.
+
+Run from the repository root with `python -m benchmarks.geometry_benchmark`."""
+import timeit
+import cv2
+import numpy as np
+
+from src.Geometry import GeometryTransform
+from src.Palette import PaletteEngine
+
+SENSOR_SIZES = [(120, 160), (480, 640)]
+ROTATION, FLIP = 1, 2
+RECORDING_SCALE = 2
+PALETTE = cv2.COLORMAP_INFERNO
+REPEATS = 200
+
+
+def chained(frame, palette_engine):
+    oriented = np.flip(np.rot90(frame, 4 - ROTATION), 1)
+    display_frame = palette_engine.colorize(oriented, PALETTE)
+    height, width = display_frame.shape[:2]
+    recording_frame = cv2.resize(display_frame, (width * RECORDING_SCALE, height * RECORDING_SCALE),
+                                 interpolation=cv2.INTER_CUBIC)
+    return display_frame, recording_frame
+
+
+def planned(frame, geometry, palette_engine, recording_output):
+    display_frame = palette_engine.colorize(geometry.apply(frame, ROTATION, FLIP), PALETTE)
+    height, width = display_frame.shape[:2]
+    gray_frame = geometry.apply(frame, ROTATION, FLIP, output_size=(width * RECORDING_SCALE, height * RECORDING_SCALE),
+                                interpolation=cv2.INTER_CUBIC, output="recording")
+    recording_frame = palette_engine.colorize(gray_frame, PALETTE, out=recording_output)
+    return display_frame, recording_frame
+
+
+def run(height, width):
+    frame = np.random.default_rng(0).integers(0, 256, (height, width), dtype=np.uint8)
+    palette_engine = PaletteEngine()
+    geometry = GeometryTransform()
+    recording_output = np.empty((width * RECORDING_SCALE, height * RECORDING_SCALE, 3), dtype=np.uint8)
+    planned(frame, geometry, palette_engine, recording_output)
+
+    chained_time = timeit.timeit(lambda: chained(frame, palette_engine), number=REPEATS) / REPEATS
+    planned_time = timeit.timeit(lambda: planned(frame, geometry, palette_engine, recording_output),
+                                  number=REPEATS) / REPEATS
+    return chained_time, planned_time
+
+
+if __name__ == "__main__":
+    print(f"{'sensor':>10} {'chained':>10} {'planned':>10}")
+    for height, width in SENSOR_SIZES:
+        chained_time, planned_time = run(height, width)
+        print(f"{width:>4}x{height:<5} {chained_time*1e6:>8.1f}us {planned_time*1e6:>8.1f}us")
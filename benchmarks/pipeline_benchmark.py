@@ -0,0 +1,216 @@
+"""Per-stage benchmarks of the Compositor pipeline on synthetic frames.
+
+Run from the repository root:
+
+    python -m benchmarks.pipeline_benchmark                   compare with the baseline
+    python -m benchmarks.pipeline_benchmark --save-baseline   record a new baseline
+
+Results are written as JSON. When a baseline exists, any benchmark whose
+median latency, taken from its quietest round, grew by more than the
+tolerance fails the run with exit code 1. The baseline is machine specific,
+record it on the machine that compares.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+import numpy as np
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import cv2
+
+from src.Calibrator import Calibrator
+from src.Compositor import Compositor
+from src.drivers.SyntheticCamera import SyntheticCamera
+from src.drivers.MAG160Core import Mag160Core, FRAME_TAIL_DTYPE
+
+SENSOR_SIZES = [(160, 120), (384, 288), (640, 512), (1280, 1024)]
+RECORDING_SCALE = 2
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+DEFAULT_TOLERANCE = 0.5
+SYNTHETIC_FRAMES = 16
+
+
+class CannedUsbDevice():
+    """Answers `read` with the same frame packet over and over."""
+    def __init__(self, content_packet: bytes):
+        self.packets = [bytes(28), content_packet]
+        self.reads = 0
+
+    def read(self, endpoint, buffer, timeout):
+        packet = self.packets[self.reads % 2]
+        self.reads += 1
+        memoryview(buffer)[:len(packet)] = packet
+        return len(packet)
+
+
+def measure(function, rounds=5, round_time=0.1, min_iterations=10, max_iterations=2000):
+    """Returns per-call latencies in seconds, one array per round."""
+    function() # warm up caches and lazily allocated buffers
+    results = []
+    for _ in range(rounds):
+        latencies = []
+        started = time.perf_counter()
+        while len(latencies) < max_iterations and (len(latencies) < min_iterations or time.perf_counter() - started < round_time):
+            call_started = time.perf_counter_ns()
+            function()
+            latencies.append(time.perf_counter_ns() - call_started)
+        results.append(np.array(latencies) / 1e9)
+    return results
+
+
+def summarize(rounds):
+    latencies = np.concatenate(rounds)
+    return {
+        "iterations": len(latencies),
+        "mean_us": float(latencies.mean() * 1e6),
+        "p50_us": float(np.percentile(latencies, 50) * 1e6),
+        "p95_us": float(np.percentile(latencies, 95) * 1e6),
+        # the quietest round, used for regression checks as it is the least noisy
+        "best_p50_us": float(min(np.percentile(latencies, 50) for latencies in rounds) * 1e6),
+        "throughput_fps": float(1 / latencies.mean()),
+    }
+
+
+def make_pipeline(width, height):
+    camera = SyntheticCamera(width=width, height=height, realtime=False, threaded_acquisition=False,
+                             dead_pixels=max(10, width * height // 2000))
+    camera.connect()
+    frames = []
+    for _ in range(SYNTHETIC_FRAMES):
+        frame, frame_info = camera.get_image_data()
+        frames.append(frame.copy())
+    camera.ffc_frame = np.full((height, width), camera.base_level, dtype=np.float32)
+
+    calibrator = Calibrator()
+    mask = np.zeros((height, width), dtype=np.uint8)
+    mask[camera.dead_pixel_mask] = 255
+    calibrator.set_blind_pixel_mask(mask)
+
+    compositor = Compositor()
+    compositor.calibrator = calibrator
+    compositor.assign_device(camera)
+    compositor.settings.color_palette = cv2.COLORMAP_INFERNO
+    compositor.settings.rotation = 1
+    compositor.settings.flip = 1
+    compositor.settings.temporal_denoise = True
+    return camera, compositor, frames
+
+
+def benchmark_stages(width, height):
+    camera, compositor, frames = make_pipeline(width, height)
+    frame_cycle = itertools.cycle(frames)
+    raw_frame = frames[0]
+    ffc_frame = camera.ffc_frame
+
+    corrected_frame = compositor.correct_ffc(raw_frame, ffc_frame).copy()
+    normalized_frame = compositor.adjust_span(corrected_frame)
+    transformed_frame = compositor.transform(normalized_frame)
+    color_frame = compositor.colorize(transformed_frame).copy()
+    record_size = (color_frame.shape[1] * RECORDING_SCALE, color_frame.shape[0] * RECORDING_SCALE)
+    record_frame = np.empty((record_size[1], record_size[0], 3), dtype=np.uint8)
+    blind_pixel_frame = corrected_frame.copy()
+    denoise_frame = corrected_frame.copy()
+
+    def full_pipeline():
+        camera.frame_buffer = next(frame_cycle)
+        compositor.read()
+
+    stages = {
+        "ffc": lambda: compositor.correct_ffc(raw_frame, ffc_frame),
+        "denoise": lambda: compositor.denoise(denoise_frame),
+        "blind_pixel": lambda: compositor.correct_blind_pixels(blind_pixel_frame),
+        "span": lambda: compositor.adjust_span(corrected_frame),
+        "transform": lambda: np.ascontiguousarray(compositor.transform(normalized_frame)),
+        "colorize": lambda: compositor.colorize(transformed_frame),
+        "record_resize": lambda: cv2.resize(color_frame, record_size, record_frame, interpolation=cv2.INTER_CUBIC),
+        "pipeline": full_pipeline,
+    }
+    return {name: summarize(measure(function)) for name, function in stages.items()}
+
+
+def benchmark_decode(width, height):
+    camera = Mag160Core()
+    camera.frame_width, camera.frame_height = width, height
+    camera.frame_packet_size = width * height * 2 + 1024
+    camera.device_info = {"fpa_temp_fix": 0}
+    camera.imgin_endpoint = type("Endpoint", (), {"bEndpointAddress": 0x81})()
+    tail = np.zeros(1, dtype=FRAME_TAIL_DTYPE)
+    tail["frame_index"] = 1
+    tail["fpa_temp"] = 30000
+    frame = np.random.default_rng(0).integers(0, 2**14, (height, width), dtype=np.uint16)
+    camera.device = CannedUsbDevice(frame.tobytes() + tail.tobytes())
+    camera.allocate_frame_buffers()
+    return summarize(measure(camera.get_image_data))
+
+
+def run_benchmarks(sensor_sizes):
+    results = {}
+    for width, height in sensor_sizes:
+        size = f"{width}x{height}"
+        for stage, summary in benchmark_stages(width, height).items():
+            results[f"{stage}@{size}"] = summary
+        results[f"decode@{size}"] = benchmark_decode(width, height)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, summary in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        ratio = summary["best_p50_us"] / reference["best_p50_us"]
+        if ratio > 1 + tolerance:
+            regressions.append((name, reference["best_p50_us"], summary["best_p50_us"], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed relative growth of the median latency (default %(default)s)")
+    parser.add_argument("--sizes", nargs="*", default=[f"{w}x{h}" for w, h in SENSOR_SIZES],
+                        help="sensor sizes as WIDTHxHEIGHT")
+    args = parser.parse_args(argv)
+
+    sensor_sizes = [tuple(int(value) for value in size.split("x")) for size in args.sizes]
+    results = run_benchmarks(sensor_sizes)
+    document = {
+        "machine": platform.node(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "results": results,
+    }
+
+    print(f"{'benchmark':<28} {'p50':>10} {'p95':>10} {'fps':>10}")
+    for name, summary in results.items():
+        print(f"{name:<28} {summary['p50_us']:>8.1f}us {summary['p95_us']:>8.1f}us {summary['throughput_fps']:>10.0f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(document, f, indent=2)
+    if args.save_baseline or not os.path.exists(args.baseline):
+        with open(args.baseline, "w") as f:
+            json.dump(document, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    regressions = compare(results, baseline, args.tolerance)
+    for name, reference, current, ratio in regressions:
+        print(f"REGRESSION {name}: {reference:.1f}us -> {current:.1f}us ({ratio:.2f}x)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,42 @@
+"""Measures converting frames to temperatures: evaluating the calibration
+model per pixel against the engine's cached tables.
+
+Run from the repository root with `python -m benchmarks.radiometry_benchmark`."""
+import timeit
+import numpy as np
+
+from src.Radiometry import PlanckCalibrationModel, RadiometricEngine
+
+SENSOR_SIZES = [(120, 160), (288, 384), (480, 640), (1024, 1280)]
+MODEL = PlanckCalibrationModel(r=2.2e6, b=1430.0, f=1.0, o=2000.0, fpa_slope=-50.0)
+FPA_TEMP_CELSIUS = 31.0
+REPEATS = 50
+
+
+def run(height, width):
+    rng = np.random.default_rng(0)
+    frame = rng.uniform(12000, 40000, (height, width)).astype(np.float32)
+    engine = RadiometricEngine(MODEL)
+    output = np.empty(frame.shape, dtype=np.float32)
+    engine.convert(frame, FPA_TEMP_CELSIUS, output)
+
+    model_time = timeit.timeit(lambda: MODEL.temperature(frame, FPA_TEMP_CELSIUS), number=REPEATS) / REPEATS
+    table_time = timeit.timeit(lambda: engine.convert(frame, FPA_TEMP_CELSIUS, output), number=REPEATS) / REPEATS
+    spot_time = timeit.timeit(lambda: engine.spot(frame, FPA_TEMP_CELSIUS, width // 2, height // 2),
+                              number=REPEATS) / REPEATS
+    return model_time, table_time, spot_time
+
+
+def run_table_build():
+    engine = RadiometricEngine(MODEL, cache_size=1)
+    fpa_temps = iter(np.arange(0, 1000) * engine.bucket_width)
+    return timeit.timeit(lambda: engine.table(next(fpa_temps)), number=REPEATS) / REPEATS
+
+
+if __name__ == "__main__":
+    print(f"{'sensor':>10} {'per pixel':>12} {'table':>10} {'ns/pixel':>9} {'spot':>8}")
+    for height, width in SENSOR_SIZES:
+        model_time, table_time, spot_time = run(height, width)
+        print(f"{width:>4}x{height:<5} {model_time*1e6:>10.1f}us {table_time*1e6:>8.1f}us "
+              f"{table_time*1e9/(width*height):>9.2f} {spot_time*1e6:>6.1f}us")
+    print(f"new FPA bucket: {run_table_build()*1e3:.2f} ms to build its table")
@@ -0,0 +1,123 @@
+"""Measures the display side of a frame in the main window: getting a color
+frame on screen, and showing the automatic span in the span widgets.
+
+Run from the repository root with `python -m benchmarks.render_benchmark`,
+it uses the offscreen Qt platform unless QT_QPA_PLATFORM says otherwise."""
+import os
+import sys
+import time
+import timeit
+import numpy as np
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import QApplication, QLabel
+from PyQt5.QtCore import Qt
+
+from src.FrameCanvas import FrameCanvas
+from src.utils import matlike_to_pixmap
+
+SENSOR_SIZES = [(120, 160), (288, 384), (480, 640)]
+VIEW_SIZE = (960, 720)
+REPEATS = 200
+BURST_FRAMES = 300
+
+
+def label_frame(label: QLabel, frame: np.ndarray):
+    # the previous path: a new pixmap per frame, scaled, then painted
+    pixmap = matlike_to_pixmap(frame)
+    pixmap = pixmap.scaled(label.size(), Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.FastTransformation)
+    label.setPixmap(pixmap)
+    label.repaint()
+
+
+def canvas_frame(canvas: FrameCanvas, frame: np.ndarray):
+    canvas.set_frame(frame)
+    canvas.repaint()
+
+
+def run_display(height, width):
+    frame = np.random.default_rng(0).integers(0, 256, (height, width, 3), dtype=np.uint8)
+    label = QLabel()
+    label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+    canvas = FrameCanvas()
+    for widget in (label, canvas):
+        widget.resize(*VIEW_SIZE)
+        widget.show()
+    QApplication.processEvents()
+    label_time = timeit.timeit(lambda: label_frame(label, frame), number=REPEATS) / REPEATS
+    canvas_time = timeit.timeit(lambda: canvas_frame(canvas, frame), number=REPEATS) / REPEATS
+    assert canvas.frames_painted >= REPEATS
+    label.close()
+    canvas.close()
+    return label_time, canvas_time
+
+
+def run_burst(app: QApplication):
+    """Frames delivered faster than the display refreshes, as a camera
+    catching up after a stall would."""
+    frame = np.zeros((120, 160, 3), dtype=np.uint8)
+    canvas = FrameCanvas()
+    canvas.resize(*VIEW_SIZE)
+    canvas.show()
+    started = time.perf_counter()
+    for _ in range(BURST_FRAMES):
+        canvas.set_frame(frame)
+        app.processEvents()
+        time.sleep(0.001)
+    while canvas.pending:
+        app.processEvents()
+    seconds = time.perf_counter() - started
+    canvas.close()
+    return canvas.frames_received, canvas.frames_painted, seconds
+
+
+def run_span(app: QApplication):
+    from src.drivers.SyntheticCamera import SyntheticCamera
+    from src.main_window import MainWindow
+
+    main_window = MainWindow(SyntheticCamera())
+    main_window.selected_camera.frame_ready.disconnect(main_window.update_frame)
+    main_window.show()
+    app.processEvents()
+    ruler_updates = []
+    update_palette_ruler = main_window.update_palette_ruler
+    main_window.update_palette_ruler = lambda: (ruler_updates.append(1), update_palette_ruler())
+
+    values = [(7000 + (i % 50), 9000 + (i % 70)) for i in range(REPEATS)]
+
+    def live(index=[0]):
+        # what the widgets cost when their handlers run for every update
+        low, high = values[index[0] % len(values)]
+        index[0] += 1
+        main_window.spanStartSlider.setValue(int(low*10))
+        main_window.spanStartDoubleSpinBox.setValue(low)
+        main_window.spanEndSlider.setValue(int(high*10))
+        main_window.spanEndDoubleSpinBox.setValue(high)
+
+    def blocked(index=[0]):
+        low, high = values[index[0] % len(values)]
+        index[0] += 1
+        main_window.show_automatic_span(low, high)
+
+    live_time = timeit.timeit(live, number=REPEATS) / REPEATS
+    blocked_time = timeit.timeit(blocked, number=REPEATS) / REPEATS
+    main_window.selected_camera.close()
+    main_window.close()
+    return live_time, blocked_time, len(ruler_updates)
+
+
+if __name__ == "__main__":
+    app = QApplication(sys.argv)
+    print(f"display {VIEW_SIZE[0]}x{VIEW_SIZE[1]}, platform {app.platformName()}")
+    print(f"{'sensor':>10} {'pixmap+label':>14} {'canvas':>10}")
+    for height, width in SENSOR_SIZES:
+        label_time, canvas_time = run_display(height, width)
+        print(f"{width:>4}x{height:<5} {label_time*1e6:>12.1f}us {canvas_time*1e6:>8.1f}us")
+
+    received, painted, seconds = run_burst(app)
+    print(f"burst: {received} frames in {seconds:.2f} s, {painted} painted")
+
+    live_time, blocked_time, ruler_updates = run_span(app)
+    print(f"span widgets: {live_time*1e6:.1f}us with handlers, {blocked_time*1e6:.1f}us blocked, "
+          f"{ruler_updates} palette ruler redraws")
@@ -0,0 +1,44 @@
+"""Measures ROI statistics against slicing every ROI, from 1 to 1000 ROIs.
+
+Run from the repository root with `python -m benchmarks.roi_benchmark`."""
+import timeit
+import numpy as np
+
+from src.RoiStatistics import RoiStatistics
+
+SENSOR_SIZES = [(120, 160), (480, 640)]
+ROI_COUNTS = [1, 10, 100, 1000]
+ROI_SIZES = [8, 16, 32, 64] # sides, dozens of monitored regions use a few sizes
+REPEATS = 20
+
+
+def slicing(frame, rois):
+    results = []
+    for x, y, width, height in rois:
+        area = frame[y:y + height, x:x + width]
+        results.append((area.mean(), area.std(), area.min(), area.max()))
+    return results
+
+
+def run(height, width, count):
+    rng = np.random.default_rng(0)
+    frame = rng.normal(8000, 300, (height, width)).astype(np.float32)
+    sizes = rng.choice(ROI_SIZES, (count, 2))
+    rois = np.stack([rng.integers(0, width - sizes[:, 0]), rng.integers(0, height - sizes[:, 1]),
+                     sizes[:, 0], sizes[:, 1]], axis=1)
+    statistics = RoiStatistics()
+    statistics.set_rois(rois)
+    statistics.compute(frame)
+
+    slicing_time = timeit.timeit(lambda: slicing(frame, rois), number=REPEATS) / REPEATS
+    table_time = timeit.timeit(lambda: statistics.compute(frame), number=REPEATS) / REPEATS
+    return slicing_time, table_time, len(statistics.levels)
+
+
+if __name__ == "__main__":
+    print(f"{'sensor':>10} {'ROIs':>5} {'slicing':>10} {'tables':>10} {'per ROI':>9} {'levels':>7}")
+    for height, width in SENSOR_SIZES:
+        for count in ROI_COUNTS:
+            slicing_time, table_time, levels = run(height, width, count)
+            print(f"{width:>4}x{height:<5} {count:>5} {slicing_time*1e3:>8.2f}ms {table_time*1e3:>8.2f}ms "
+                  f"{table_time*1e6/count:>7.2f}us {levels:>7}")
@@ -0,0 +1,113 @@
+"""Startup time: importing the main window, and launch to first frame with a
+synthetic camera standing in for the sensor.
+
+Run from the repository root:
+
+    python -m benchmarks.startup_benchmark                   compare with the baseline
+    python -m benchmarks.startup_benchmark --save-baseline   record a new baseline
+
+Every measurement runs in a fresh interpreter, the median of `--runs` is
+reported. A median that grew by more than the tolerance over the baseline
+fails the run with exit code 1.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+STARTED = time.perf_counter()
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "startup_baseline.json")
+DEFAULT_TOLERANCE = 0.3
+DEFAULT_RUNS = 5
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure_import():
+    started = time.perf_counter()
+    import src.main_window # noqa: F401
+    return time.perf_counter() - started
+
+
+def measure_first_frame():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    from src.drivers.SyntheticCamera import SyntheticCamera
+    from src.main_window import MainWindow
+
+    app = QApplication(sys.argv)
+    first_frame = []
+    update_frame = MainWindow.update_frame
+
+    def timed_update_frame(self):
+        update_frame(self)
+        if not first_frame:
+            first_frame.append(time.perf_counter() - STARTED)
+            app.quit()
+
+    MainWindow.update_frame = timed_update_frame
+    main_window = MainWindow(SyntheticCamera())
+    main_window.show()
+    app.exec()
+    main_window.selected_camera.close()
+    return first_frame[0]
+
+
+MEASUREMENTS = {
+    "import_main_window": measure_import,
+    "first_frame": measure_first_frame,
+}
+
+
+def run_child(name, runs):
+    times = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-m", "benchmarks.startup_benchmark", "--child", name],
+                                cwd=REPOSITORY, capture_output=True, text=True, check=True).stdout
+        times.append(float(output.strip().splitlines()[-1]))
+    times.sort()
+    return {"median_ms": times[len(times) // 2] * 1000, "min_ms": times[0] * 1000, "max_ms": times[-1] * 1000}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed relative growth of the median (default %(default)s)")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    parser.add_argument("--child", choices=MEASUREMENTS, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(MEASUREMENTS[args.child]())
+        return 0
+
+    # a warm up run, so the compiled forms and bytecode caches exist
+    run_child("first_frame", 1)
+    results = {name: run_child(name, args.runs) for name in MEASUREMENTS}
+    for name, result in results.items():
+        print(f"{name:<20} {result['median_ms']:>8.1f} ms  (min {result['min_ms']:.1f}, max {result['max_ms']:.1f})")
+
+    if args.save_baseline or not os.path.exists(args.baseline):
+        with open(args.baseline, "w") as f:
+            json.dump({"machine": platform.node(), "python": platform.python_version(), "results": results}, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    regressions = 0
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference and result["median_ms"] > reference["median_ms"] * (1 + args.tolerance):
+            print(f"REGRESSION {name}: {reference['median_ms']:.1f} ms -> {result['median_ms']:.1f} ms")
+            regressions += 1
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
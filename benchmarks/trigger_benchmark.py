@@ -0,0 +1,52 @@
+"""Measures the per-frame cost of the trigger engine against rendering the
+frame, at the MAG-160 and a VGA resolution.
+
+Run from the repository root with `python -m benchmarks.trigger_benchmark`."""
+import tempfile
+import timeit
+import numpy as np
+
+from src.Calibrator import Calibrator
+from src.Compositor import Compositor
+from src.Radiometry import RadiometricEngine, LinearCalibrationModel
+from src.TriggerEngine import TriggerEngine, MotionTrigger, TemperatureTrigger
+from src.drivers.frame_info import FRAME_INFO_DTYPE
+
+SENSOR_SIZES = [(120, 160), (480, 640)]
+FRAMERATE = 30
+REPEATS = 200
+
+
+def run(height, width, directory):
+    rng = np.random.default_rng(0)
+    frames = rng.normal(8000, 30, (8, height, width)).astype(np.uint16)
+    ffc_frame = rng.normal(8000, 30, (height, width)).astype(np.float32)
+    frame_info = np.zeros(1, dtype=FRAME_INFO_DTYPE)[0]
+    frame_info["fpa_temp_celsius"] = 30.0
+
+    compositor = Compositor()
+    compositor.calibrator = Calibrator()
+    compositor.display_size = (640, 480)
+    engine = TriggerEngine(f"{directory}/benchmark", (height, width), FRAMERATE,
+                           triggers=[MotionTrigger(threshold=1000), TemperatureTrigger(500.0, (0, 0, width // 2, height // 2))])
+    engine.radiometry = RadiometricEngine(LinearCalibrationModel(0.04, 8000))
+
+    counter = iter(range(10**9))
+    render_time = timeit.timeit(lambda: compositor.process(frames[next(counter) % 8], ffc_frame, 30.0),
+                                number=REPEATS) / REPEATS
+    trigger_time = timeit.timeit(lambda: engine.on_frame(frames[next(counter) % 8], frame_info, ffc_frame),
+                                 number=REPEATS) / REPEATS
+    evaluate_time = timeit.timeit(lambda: engine.evaluate(frames[next(counter) % 8], frame_info, ffc_frame),
+                                  number=REPEATS) / REPEATS
+    assert not engine.events
+    engine.close()
+    return render_time, trigger_time, evaluate_time
+
+
+if __name__ == "__main__":
+    print(f"{'sensor':>10} {'render':>10} {'on_frame':>10} {'evaluate':>10} {'share':>7}")
+    with tempfile.TemporaryDirectory() as directory:
+        for height, width in SENSOR_SIZES:
+            render_time, trigger_time, evaluate_time = run(height, width, directory)
+            print(f"{width:>4}x{height:<5} {render_time*1e3:>8.3f}ms {trigger_time*1e3:>8.3f}ms "
+                  f"{evaluate_time*1e3:>8.3f}ms {trigger_time/render_time:>6.1%}")
@@ -1,12 +1,102 @@
+import argparse
+import logging
+import os
 import sys
 from PyQt5.QtWidgets import QApplication
 
 from src.main_window import MainWindow
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Open Infrared Viewer")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--synthetic", type=int, nargs="?", const=1, metavar="COUNT",
+                        help="use synthetic cameras instead of the MAG-160 Core, more than one opens the multi-view")
+    source.add_argument("--replay", metavar="PATH", help="replay a recorded raw capture")
+    source.add_argument("--all-devices", action="store_true", help="open every attached MAG-160 Core in the multi-view")
+    parser.add_argument("--calibration", metavar="PATH", help="radiometric calibration model JSON for temperature readouts")
+    parser.add_argument("--frame-bus", metavar="NAME", help="publish raw frames to the shared memory frame bus NAME")
+    parser.add_argument("--telemetry", metavar="PATH", nargs="?", const="",
+                        help="log pipeline timings every second, or write them to the CSV file PATH, "
+                             "one file per device in the multi-view")
+    return parser.parse_known_args()[0]
+
+def create_device(args):
+    if args.synthetic:
+        from src.drivers.SyntheticCamera import SyntheticCamera
+        return SyntheticCamera()
+    if args.replay:
+        from src.drivers.ReplayCamera import ReplayCamera
+        return ReplayCamera(args.replay)
+    return None
+
+def create_device_manager(args):
+    from src.DeviceManager import DeviceManager
+    device_manager = DeviceManager()
+    if args.synthetic:
+        from src.drivers.SyntheticCamera import SyntheticCamera
+        for seed in range(args.synthetic):
+            device_manager.add_device(SyntheticCamera(seed=seed))
+    else:
+        device_manager.discover()
+    return device_manager
+
+def start_telemetry_sinks(args, telemetries: dict):
+    """A sink per `{name: Telemetry}`, named ones write to PATH with the name
+    appended to the file name."""
+    if args.telemetry is None:
+        return []
+    from src.Telemetry import TelemetrySink
+    logging.basicConfig(level=logging.INFO)
+    sinks = []
+    for name, telemetry in telemetries.items():
+        telemetry.enabled = True
+        path = args.telemetry or None
+        if path is not None and name is not None:
+            stem, extension = os.path.splitext(path)
+            path = f"{stem}_{name}{extension}"
+        sinks.append(TelemetrySink(telemetry, path, name=name).start())
+    return sinks
+
+def stop_telemetry_sinks(sinks):
+    for sink in sinks:
+        sink.stop()
+
+def run_multi_view(args, app):
+    from src.multi_view_window import MultiViewWindow
+    device_manager = create_device_manager(args)
+    # every pipeline records into its own telemetry
+    telemetry_sinks = start_telemetry_sinks(args, {pipeline.serial_number: pipeline.telemetry
+                                                   for pipeline in device_manager})
+    multi_view_window = MultiViewWindow(device_manager)
+    multi_view_window.show()
+    exit_code = app.exec()
+    device_manager.close()
+    stop_telemetry_sinks(telemetry_sinks)
+    return exit_code
+
 if __name__ == "__main__":
+    args = parse_args()
     app = QApplication(sys.argv)
-    main_window = MainWindow()
+    if args.all_devices or (args.synthetic or 0) > 1:
+        sys.exit(run_multi_view(args, app))
+    main_window = MainWindow(create_device(args))
+    telemetry_sinks = start_telemetry_sinks(args, {None: main_window.telemetry})
+    if args.calibration:
+        from src.Radiometry import load_calibration_model
+        main_window.compositor.set_calibration_model(load_calibration_model(args.calibration))
+    frame_bus = None
+    if args.frame_bus:
+        from src.FrameBus import FrameBusWriter
+        device = main_window.selected_camera
+        frame_bus = FrameBusWriter(args.frame_bus, (device.frame_height, device.frame_width))
+        device.add_frame_sink(frame_bus.publish)
     main_window.show()
-    sys.exit(app.exec())
+    exit_code = app.exec()
+    if frame_bus is not None:
+        # stop acquisition first, the bus must not be in use when unmapped
+        main_window.selected_camera.close()
+        frame_bus.close()
+    stop_telemetry_sinks(telemetry_sinks)
+    sys.exit(exit_code)
 else:
-    ...
\ No newline at end of file
+    ...
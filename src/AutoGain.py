@@ -0,0 +1,95 @@
+import cv2
+import numpy as np
+
+from src.settings import AGC_MODE_LINEAR, AGC_MODE_PLATEAU
+
+HISTOGRAM_BINS = 1024
+SAMPLE_PIXELS = 2**15 # larger frames are histogrammed on a regular subsample
+OUTPUT_LEVELS = 256
+
+
+class AutoGain():
+    """Maps corrected frames to 8 bits from one histogram per frame.
+
+    The histogram covers the frame's own range, taken on a regular subsample
+    for frames over `SAMPLE_PIXELS`, which leaves the percentiles unchanged
+    for practical purposes. In linear mode the span runs between two
+    percentiles, so a few hot or dead pixels can't blow it out, and is
+    smoothed over time so the view doesn't pump. The output is then a single
+    saturating scale-and-offset pass, the arithmetic form of a linear lookup
+    table. In plateau mode the span is equalized as well: the histogram of the
+    spanned levels, clipped at `plateau` times its mean, becomes a 256 entry
+    table applied with `cv2.LUT`."""
+    def __init__(self):
+        self.output: np.ndarray | None = None
+        self.levels: np.ndarray | None = None
+        self.bins: np.ndarray | None = None
+        self.lut = np.zeros((OUTPUT_LEVELS, 1), dtype=np.uint8)
+        self.span: tuple[float, float] | None = None
+
+    def reset(self):
+        self.span = None
+
+    def sample(self, frame: np.ndarray) -> np.ndarray:
+        step = max(1, int(np.ceil(np.sqrt(frame.size / SAMPLE_PIXELS))))
+        return np.ascontiguousarray(frame[::step, ::step]) if step > 1 else frame
+
+    def percentile_span(self, sample: np.ndarray, low_percentile: float, high_percentile: float):
+        minimum, maximum, _, _ = cv2.minMaxLoc(sample)
+        if maximum <= minimum:
+            return minimum, maximum
+        # bin indices are rounded, bin k holds the values within half a bin of
+        # minimum + k / scale
+        scale = (HISTOGRAM_BINS - 1) / (maximum - minimum)
+        if self.bins is None or self.bins.shape != sample.shape:
+            self.bins = np.empty(sample.shape, dtype=np.uint16)
+        cv2.addWeighted(sample, scale, sample, 0, -minimum * scale, self.bins, dtype=cv2.CV_16U)
+        histogram = cv2.calcHist([self.bins], [0], None, [HISTOGRAM_BINS], [0, HISTOGRAM_BINS]).ravel()
+        cumulative = np.cumsum(histogram)
+        low_bin = np.searchsorted(cumulative, cumulative[-1] * low_percentile / 100, side="right")
+        high_bin = np.searchsorted(cumulative, cumulative[-1] * high_percentile / 100)
+        low = max(minimum + (low_bin - 0.5) / scale, minimum)
+        high = min(minimum + (high_bin + 0.5) / scale, maximum)
+        return low, high
+
+    def apply(self, corrected_frame: np.ndarray, mode=AGC_MODE_LINEAR, low_percentile=0.5, high_percentile=99.5,
+              smoothing=0.2, plateau=4.0, manual_span=None) -> tuple[np.ndarray, float, float]:
+        """Returns the 8-bit frame, in a buffer reused by the next call, and
+        the span it was mapped with. `smoothing` is the weight of the new span
+        (1 disables smoothing). A `manual_span` replaces the automatic one."""
+        if self.output is None or self.output.shape != corrected_frame.shape:
+            self.output = np.empty(corrected_frame.shape, dtype=np.uint8)
+            self.levels = np.empty(corrected_frame.shape, dtype=np.uint8)
+            self.span = None
+
+        sample = self.sample(corrected_frame)
+        if manual_span is not None:
+            low, high = float(manual_span[0]), float(manual_span[1])
+            self.span = None
+        else:
+            low, high = self.percentile_span(sample, low_percentile, high_percentile)
+            if self.span is not None and smoothing < 1:
+                low = self.span[0] + smoothing * (low - self.span[0])
+                high = self.span[1] + smoothing * (high - self.span[1])
+            self.span = low, high
+        scale = (OUTPUT_LEVELS - 1) / max(high - low, 1e-6)
+
+        if mode != AGC_MODE_PLATEAU:
+            cv2.addWeighted(corrected_frame, scale, corrected_frame, 0, -low * scale, self.output, dtype=cv2.CV_8U)
+            return self.output, low, high
+
+        cv2.addWeighted(corrected_frame, scale, corrected_frame, 0, -low * scale, self.levels, dtype=cv2.CV_8U)
+        sample_levels = self.sample(self.levels)
+        histogram = cv2.calcHist([sample_levels], [0], None, [OUTPUT_LEVELS], [0, OUTPUT_LEVELS]).ravel()
+        # the clipped ends hold everything outside the span, leave them out
+        inner = histogram[1:-1]
+        limit = max(1.0, plateau * inner.sum() / len(inner))
+        cumulative = np.cumsum(np.minimum(inner, limit))
+        lut = self.lut.ravel()
+        lut[0], lut[-1] = 0, OUTPUT_LEVELS - 1
+        if cumulative[-1] > 0:
+            lut[1:-1] = np.rint(cumulative * ((OUTPUT_LEVELS - 1) / cumulative[-1]))
+        else:
+            lut[1:-1] = np.arange(1, OUTPUT_LEVELS - 1)
+        cv2.LUT(self.levels, self.lut, self.output)
+        return self.output, low, high
@@ -0,0 +1,66 @@
+import numpy as np
+
+DEFAULT_RADIUS = 3 # same neighbourhood as the cv2.inpaint radius it replaces
+MAX_RADIUS = 64
+
+
+class BlindPixelCorrector():
+    """Replaces blind pixels with the inverse-distance weighted mean of the
+    good pixels around them.
+
+    The neighbour indices and weights are computed once per mask, so
+    correcting a frame is a single vectorized gather over the bad pixels."""
+    def __init__(self, mask: np.ndarray, radius=DEFAULT_RADIUS):
+        self.shape = mask.shape
+        self.radius = radius
+        good = mask == 0
+        self.pixel_indices = np.flatnonzero(~good)
+
+        height, width = self.shape
+        pixel_rows, pixel_cols = np.divmod(self.pixel_indices, width)
+        self.neighbor_indices = np.zeros((len(self.pixel_indices), 0), dtype=np.intp)
+        self.weights = np.zeros((len(self.pixel_indices), 0), dtype=np.float32)
+
+        # grow the neighbourhood until every bad pixel has a good neighbour
+        pending = np.arange(len(self.pixel_indices))
+        while len(pending) and radius <= MAX_RADIUS:
+            offset_rows, offset_cols, distances = self._disk_offsets(radius)
+            rows = pixel_rows[pending, None] + offset_rows
+            cols = pixel_cols[pending, None] + offset_cols
+            valid = (rows >= 0) & (rows < height) & (cols >= 0) & (cols < width)
+            rows = np.where(valid, rows, 0)
+            cols = np.where(valid, cols, 0)
+            valid &= good[rows, cols]
+            weights = np.where(valid, 1 / distances, 0).astype(np.float32)
+            total_weights = weights.sum(axis=1)
+
+            found = total_weights > 0
+            if self.neighbor_indices.shape[1] < len(distances):
+                pad = len(distances) - self.neighbor_indices.shape[1]
+                self.neighbor_indices = np.pad(self.neighbor_indices, ((0, 0), (0, pad)))
+                self.weights = np.pad(self.weights, ((0, 0), (0, pad)))
+            self.neighbor_indices[pending[found], :len(distances)] = (rows * width + cols)[found]
+            self.weights[pending[found], :len(distances)] = weights[found] / total_weights[found, None]
+
+            pending = pending[~found]
+            radius *= 2
+
+    @staticmethod
+    def _disk_offsets(radius):
+        offset_rows, offset_cols = np.mgrid[-radius:radius + 1, -radius:radius + 1]
+        distances = np.hypot(offset_rows, offset_cols)
+        in_disk = (distances > 0) & (distances <= radius)
+        return offset_rows[in_disk], offset_cols[in_disk], distances[in_disk]
+
+    @property
+    def pixel_count(self):
+        return len(self.pixel_indices)
+
+    def correct(self, frame: np.ndarray) -> np.ndarray:
+        """Corrects a contiguous frame in place and returns it."""
+        if not self.pixel_count:
+            return frame
+        flat_frame = frame.reshape(-1)
+        flat_frame[self.pixel_indices] = np.einsum(
+            "ij,ij->i", flat_frame[self.neighbor_indices], self.weights)
+        return frame
@@ -0,0 +1,122 @@
+import numpy as np
+
+# classes of blind pixels, bits of the array returned by `classify`
+PIXEL_DEAD = 1 # responds much less than the others between two scenes
+PIXEL_STUCK = 2 # doesn't fluctuate with the temporal noise
+PIXEL_NOISY = 4 # fluctuates much more than the others
+
+DEFAULT_DEAD_TOLERANCE = 0.05 # of the median response
+DEFAULT_STUCK_RATIO = 0.05 # of the median temporal noise
+DEFAULT_NOISY_RATIO = 5.0 # times the median temporal noise
+
+
+class PixelStatistics():
+    """Per-pixel running mean and variance of a stream of frames, updated
+    with Welford's algorithm. Memory is two float64 images however many
+    frames are added, plus two scratch images so adding a frame doesn't
+    allocate."""
+    def __init__(self, shape: tuple):
+        self.shape = shape
+        self.count = 0
+        self.mean = np.zeros(shape, dtype=np.float64)
+        self.m2 = np.zeros(shape, dtype=np.float64)
+        self.delta = np.empty(shape, dtype=np.float64)
+        self.scratch = np.empty(shape, dtype=np.float64)
+
+    def add(self, frame: np.ndarray):
+        self.count += 1
+        np.subtract(frame, self.mean, out=self.delta)
+        np.divide(self.delta, self.count, out=self.scratch)
+        self.mean += self.scratch
+        # delta * (frame - new mean)
+        np.subtract(frame, self.mean, out=self.scratch)
+        np.multiply(self.scratch, self.delta, out=self.scratch)
+        self.m2 += self.scratch
+
+    @property
+    def variance(self) -> np.ndarray:
+        return self.m2 / max(1, self.count - 1)
+
+
+class BlindPixelDetector():
+    """Finds blind pixels from frames of one or more flat scenes.
+
+    Frames of each scene are reduced to running statistics as they arrive.
+    `analyze` turns them into each pixel's response and noise relative to
+    the sensor's median, after which `classify` only compares, so moving a
+    tolerance re-thresholds at once. Dead pixels need two scenes at
+    different temperatures, stuck and noisy pixels are found from any scene
+    of at least two frames."""
+    def __init__(self, dead_tolerance=DEFAULT_DEAD_TOLERANCE, stuck_ratio=DEFAULT_STUCK_RATIO,
+                 noisy_ratio=DEFAULT_NOISY_RATIO):
+        self.dead_tolerance = dead_tolerance
+        self.stuck_ratio = stuck_ratio
+        self.noisy_ratio = noisy_ratio
+        self.scenes: list[PixelStatistics] = []
+        self.relative_response: np.ndarray | None = None
+        self.relative_noise: np.ndarray | None = None
+        self.analyzed = False
+
+    def reset(self):
+        self.scenes = []
+        self.relative_response = None
+        self.relative_noise = None
+        self.analyzed = False
+
+    def start_scene(self, shape: tuple) -> PixelStatistics:
+        self.scenes.append(PixelStatistics(shape))
+        self.analyzed = False
+        return self.scenes[-1]
+
+    def add(self, frame: np.ndarray):
+        """Adds a frame to the current scene."""
+        if not self.scenes or self.scenes[-1].shape != frame.shape:
+            self.start_scene(frame.shape)
+        self.scenes[-1].add(frame)
+        self.analyzed = False
+
+    @property
+    def frame_count(self):
+        return sum(scene.count for scene in self.scenes)
+
+    def analyze(self):
+        scenes = [scene for scene in self.scenes if scene.count]
+        if not scenes:
+            raise ValueError("No frames to analyze")
+        shape = scenes[-1].shape
+        if any(scene.shape != shape for scene in scenes):
+            raise ValueError("Scenes of different resolutions")
+
+        self.relative_response = None
+        if len(scenes) >= 2:
+            response = np.abs(scenes[-1].mean - scenes[0].mean)
+            self.relative_response = response / max(np.median(response), np.finfo(np.float64).tiny)
+
+        self.relative_noise = None
+        noisy_scenes = [scene for scene in scenes if scene.count >= 2]
+        if noisy_scenes:
+            # pooled over the scenes, each weighted by its degrees of freedom
+            m2 = sum(scene.m2 for scene in noisy_scenes)
+            degrees = sum(scene.count - 1 for scene in noisy_scenes)
+            noise = np.sqrt(m2 / degrees)
+            self.relative_noise = noise / max(np.median(noise), np.finfo(np.float64).tiny)
+        self.analyzed = True
+
+    def classify(self, dead_tolerance: float | None = None) -> np.ndarray:
+        """Returns the PIXEL_* bits of every pixel, 0 for good pixels."""
+        if dead_tolerance is not None:
+            self.dead_tolerance = dead_tolerance
+        if not self.analyzed:
+            self.analyze()
+        shape = self.scenes[-1].shape
+        classes = np.zeros(shape, dtype=np.uint8)
+        if self.relative_response is not None:
+            classes[self.relative_response < self.dead_tolerance] |= PIXEL_DEAD
+        if self.relative_noise is not None:
+            classes[self.relative_noise < self.stuck_ratio] |= PIXEL_STUCK
+            classes[self.relative_noise > self.noisy_ratio] |= PIXEL_NOISY
+        return classes
+
+    def mask(self, dead_tolerance: float | None = None) -> np.ndarray:
+        """The blind pixel mask, 255 for blind pixels."""
+        return (self.classify(dead_tolerance) != 0).astype(np.uint8) * 255
@@ -1,47 +1,110 @@
+import os
+from typing import TYPE_CHECKING
 import cv2
 import numpy as np
 
-from src.drivers.base import BaseDriver
-from src.utils import GeneralSettings
+from src.BlindPixelCorrector import BlindPixelCorrector
+from src.BlindPixelDetector import BlindPixelDetector, DEFAULT_DEAD_TOLERANCE
+from src.settings import CACHE_DIRECTORY, GeneralSettings
+
+if TYPE_CHECKING:
+    from src.drivers.base import BaseDriver
+
+BLIND_PIXEL_MASK_DIRECTORY = os.path.join(CACHE_DIRECTORY, "blind_pixels")
+DEFAULT_DETECTION_FRAMES = 64 # per scene
 
 class Calibrator():
     def __init__(self):
-        self.current_device: BaseDriver | None = None
+        self.current_device: "BaseDriver | None" = None
         self.settings: GeneralSettings | None = None
 
-        self.blind_pixel_detection_frames: list[np.ndarray] = []
-        self.frame_difference: np.ndarray | None = None
+        self.blind_pixel_detector = BlindPixelDetector()
+        self.blind_pixel_detection_tolerance = DEFAULT_DEAD_TOLERANCE
+        # frames still to add to the scene being captured
+        self.frames_to_capture = 0
 
-        self.blind_pixel_detection_tolerance = 0.05
+        self.blind_pixel_mask: np.ndarray | None = None
+        self.blind_pixel_corrector: BlindPixelCorrector | None = None
+        self.blind_pixel_mask_directory = BLIND_PIXEL_MASK_DIRECTORY
 
-        self.blind_pixel_mask = np.zeros((120, 160), dtype=np.uint8)
-        self.blind_pixel_mask[12, 72] = 1
-        self.blind_pixel_mask[51:53, 124:127] = 1
-        self.blind_pixel_mask[59:62, 80] = 1
+    def assign_device(self, device: "BaseDriver"):
+        """Takes a connected device and loads the blind pixel mask saved for
+        it, if any."""
+        self.current_device = device
+        self.load_blind_pixel_mask()
 
+    def blind_pixel_mask_path(self) -> str | None:
+        # masks belong to one sensor at one resolution
+        device = self.current_device
+        if device is None or not device.device_info or "serial_number" not in device.device_info:
+            return None
+        name = f"{device.device_info['serial_number']}_{device.frame_width}x{device.frame_height}.png"
+        return os.path.join(self.blind_pixel_mask_directory, name)
 
-    def assign_device(self, device: BaseDriver):
-        self.current_device = device
+    def load_blind_pixel_mask(self) -> bool:
+        path = self.blind_pixel_mask_path()
+        mask = None
+        if path is not None and os.path.exists(path):
+            mask = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if mask is None or mask.shape != (self.current_device.frame_height, self.current_device.frame_width):
+            self.set_blind_pixel_mask(None)
+            return False
+        self.set_blind_pixel_mask(mask)
+        return True
 
-    def blind_pixel_detection(self):
-        if len(self.blind_pixel_detection_frames) < 2:
-            self.blind_pixel_detection_frames.append(self.current_device.frame_buffer - self.current_device.ffc_frame)
+    def save_blind_pixel_mask(self):
+        path = self.blind_pixel_mask_path()
+        if path is None:
+            raise ValueError("The device has no serial number to save its mask under")
+        mask = self.blind_pixel_mask
+        if mask is None:
+            mask = np.zeros((self.current_device.frame_height, self.current_device.frame_width), dtype=np.uint8)
+        os.makedirs(self.blind_pixel_mask_directory, exist_ok=True)
+        cv2.imwrite(path, (mask > 0).astype(np.uint8) * 255)
 
-        if len(self.blind_pixel_detection_frames) == 2:
-            self.frame_difference = np.abs(self.blind_pixel_detection_frames[1] - self.blind_pixel_detection_frames[0])
+    def capture_blind_pixel_scene(self, frame_count=DEFAULT_DETECTION_FRAMES):
+        """Adds the next `frame_count` frames, relative to the FFC reference,
+        to a new scene of the detector. Frames are taken by a frame sink in
+        the acquisition thread, frames during FFC are left out."""
+        device = self.current_device
+        self.blind_pixel_detector.start_scene((device.frame_height, device.frame_width))
+        self.frames_to_capture = frame_count
+        device.remove_frame_sink(self.capture_blind_pixel_frame)
+        device.add_frame_sink(self.capture_blind_pixel_frame)
 
-            self.frame_min_value = self.frame_difference.min()
-            self.frame_max_value = self.frame_difference.max()
+    def capture_blind_pixel_frame(self, frame: np.ndarray, frame_info):
+        if self.frames_to_capture <= 0 or self.current_device.performing_ffc:
+            return
+        self.blind_pixel_detector.add(np.subtract(frame, self.current_device.ffc_frame, dtype=np.float32))
+        self.frames_to_capture -= 1
+        if self.frames_to_capture == 0:
+            self.current_device.remove_frame_sink(self.capture_blind_pixel_frame)
 
-            self.normalized_difference = (self.frame_difference - self.frame_min_value) / (self.frame_max_value - self.frame_min_value)
+    @property
+    def capturing_blind_pixel_scene(self):
+        return self.frames_to_capture > 0
 
-            self.blind_pixel_mask = self.normalized_difference < self.blind_pixel_detection_tolerance
-            self.blind_pixel_mask = self.blind_pixel_mask.astype(np.uint8) * 255
+    def blind_pixel_detection(self):
+        """Classifies the pixels from the scenes captured so far."""
+        self.blind_pixel_detector.analyze()
+        self.set_blind_pixel_mask(self.blind_pixel_detector.mask(self.blind_pixel_detection_tolerance))
 
     def set_blind_pixel_detection_tolerance(self, tolerance: float):
         self.blind_pixel_detection_tolerance = tolerance
-        self.blind_pixel_mask = self.normalized_difference < self.blind_pixel_detection_tolerance
-        self.blind_pixel_mask = self.blind_pixel_mask.astype(np.uint8) * 255
+        if self.blind_pixel_detector.analyzed:
+            self.set_blind_pixel_mask(self.blind_pixel_detector.mask(tolerance))
+
+    def set_blind_pixel_mask(self, blind_pixel_mask: np.ndarray | None):
+        # the replacement table only depends on the mask, rebuild it here
+        # instead of on every frame
+        self.blind_pixel_mask = blind_pixel_mask
+        if blind_pixel_mask is None or not blind_pixel_mask.any():
+            self.blind_pixel_corrector = None
+        else:
+            self.blind_pixel_corrector = BlindPixelCorrector(blind_pixel_mask)
 
     def clear_blind_pixel_detection_frames(self):
-        self.blind_pixel_detection_frames.clear()
\ No newline at end of file
+        self.frames_to_capture = 0
+        if self.current_device is not None:
+            self.current_device.remove_frame_sink(self.capture_blind_pixel_frame)
+        self.blind_pixel_detector.reset()
@@ -1,16 +1,37 @@
 import time
+from typing import TYPE_CHECKING
 import cv2
 import numpy as np
 
-from src.drivers.base import BaseDriver
+from src.AutoGain import AutoGain
 from src.Calibrator import Calibrator
-from src.utils import (
+from src.Geometry import GeometryTransform, oriented_size, fit_size
+from src.Palette import PaletteEngine, load_palette_file
+from src.Radiometry import CalibrationModel, RadiometricEngine
+from src.RawRecording import RawRecorder, RAW_EXTENSION
+from src.RoiStatistics import RoiStatistics, RoiLog
+from src.Telemetry import TELEMETRY
+from src.TriggerEngine import TriggerEngine, Trigger, MotionTrigger, TemperatureTrigger
+from src.TemporalDenoiser import TemporalDenoiser
+from src.VideoEncoder import (
+    VideoEncoder,
+    VIDEO_CODECS,
+    BACKPRESSURE_DROP_OLDEST,
+)
+from src.settings import (
     GeneralSettings,
     FrameProperties,
 )
 
+if TYPE_CHECKING:
+    from src.drivers.base import BaseDriver
+
 NULL_FRAME = np.zeros((480, 640, 3))
 
+RECORDING_FORMAT_VIDEO = "video" # colorized 8-bit output
+RECORDING_FORMAT_RAW = "raw" # 16-bit sensor frames with their frame info
+RECORDING_FORMAT_TRIGGERED = "triggered" # raw frames around trigger events only
+
 class Compositor():
     def __init__(self):
         self.test = True
@@ -19,18 +40,53 @@ class Compositor():
         self.last_frame = NULL_FRAME
         self.last_frame_properties = FrameProperties()
         self.settings = GeneralSettings()
+        self.telemetry = TELEMETRY
+        self.palette_engine = PaletteEngine()
+        self.corrected_frame: np.ndarray | None = None
+        self.ffc_reference: np.ndarray | None = None
+        self.ffc_reference_mean = np.float32(0)
+        self.temporal_denoiser = TemporalDenoiser()
+        self.auto_gain = AutoGain()
+        self.radiometry: RadiometricEngine | None = None
+        self.fpa_temp_celsius: float | None = None
+        self.roi_statistics = RoiStatistics()
+        self.roi_log: RoiLog | None = None
+        self.frames_rendered = 0
+        self.geometry = GeometryTransform()
+        # (width, height) the display frame is fitted into, None for the
+        # sensor resolution
+        self.display_size: tuple[int, int] | None = None
+        self.normalized_frame: np.ndarray | None = None
+        self.recording_frame: np.ndarray | None = None
 
         self.recording = False
         self.recording_resolution = (640, 480)
         self.recording_scale = 1
+        self.recording_format = RECORDING_FORMAT_VIDEO
+        self.recording_path = None
+        self.recording_name = "output" # file name without the extension
 
-        self.fourcc = cv2.VideoWriter.fourcc(*'XVID')
-        self.video_writer = None
+        self.recording_codec = "XVID"
+        self.recording_backpressure = BACKPRESSURE_DROP_OLDEST
+        self.recording_queue_size = 32
+        self.video_encoder: VideoEncoder | None = None
+        self.raw_recorder: RawRecorder | None = None
+        self.raw_recorded_ffc_frame = None
+        # triggers added to those made from the settings
+        self.triggers: list[Trigger] = []
+        self.trigger_engine: TriggerEngine | None = None
 
-    def assign_device(self, device: BaseDriver):
+    def assign_device(self, device: "BaseDriver"):
         if self.current_device is not None:
             self.current_device.close()
         self.current_device = device
+        calibration_model = getattr(device, "calibration_model", None)
+        self.set_calibration_model(calibration_model)
+
+    def set_calibration_model(self, calibration_model: CalibrationModel | None):
+        self.radiometry = RadiometricEngine(calibration_model) if calibration_model is not None else None
+        if self.trigger_engine is not None:
+            self.trigger_engine.radiometry = self.radiometry
 
     def read(self):
         if self.current_device is None:
@@ -42,57 +98,187 @@ class Compositor():
         if ir_raw_frame is None or ffc_pause: 
             return self.last_frame
         ffc_raw_frame = self.current_device.ffc_frame
+        frame_info = self.current_device.frame_info
+        fpa_temp_celsius = float(frame_info["fpa_temp_celsius"]) if frame_info is not None else None
+        return self.process(ir_raw_frame, ffc_raw_frame, fpa_temp_celsius)
 
-        # Correction
-        ffc_corrected_frame = ir_raw_frame - ffc_raw_frame + np.mean(ffc_raw_frame)
-        ffc_corrected_frame = ffc_corrected_frame.astype(np.float32)
+    def process(self, ir_raw_frame: np.ndarray, ffc_raw_frame: np.ndarray,
+                fpa_temp_celsius: float | None = None) -> np.ndarray:
+        """Renders a frame and records it when recording video."""
+        color_frame = self.render(ir_raw_frame, ffc_raw_frame, fpa_temp_celsius)
+        self.last_frame = color_frame
+        video_encoder = self.video_encoder
+        if video_encoder is not None:
+            started = self.telemetry.start()
+            video_encoder.submit(self.render_recording_frame(color_frame, video_encoder.frame_size))
+            self.telemetry.stop("record", started)
+            self.telemetry.set_value("record_dropped", video_encoder.frames_dropped)
+        return color_frame
 
-        if self.calibrator.blind_pixel_mask is not None:
-            ffc_corrected_frame = cv2.inpaint(ffc_corrected_frame, self.calibrator.blind_pixel_mask, 3, cv2.INPAINT_TELEA)
+    def render(self, ir_raw_frame: np.ndarray, ffc_raw_frame: np.ndarray,
+               fpa_temp_celsius: float | None = None) -> np.ndarray:
+        """Runs the processing stages on a raw frame and returns the BGR frame,
+        which may live in a buffer reused by the next call. The FPA
+        temperature selects the radiometric table, the last known one is used
+        when it isn't given."""
+        telemetry = self.telemetry
+        if fpa_temp_celsius is not None:
+            self.fpa_temp_celsius = fpa_temp_celsius
+        # Correction
+        started = telemetry.start()
+        corrected_frame = self.correct_ffc(ir_raw_frame, ffc_raw_frame)
+        telemetry.stop("ffc", started)
+        started = telemetry.start()
+        self.denoise(corrected_frame)
+        telemetry.stop("denoise", started)
+        started = telemetry.start()
+        self.correct_blind_pixels(corrected_frame)
+        telemetry.stop("blind_pixel", started)
 
         # Span Adjustment
-        if self.settings.manual_span:
-            frame_min_value, frame_max_value = self.settings.span_range
-        else:
-            frame_min_value = ffc_corrected_frame.min()
-            frame_max_value = ffc_corrected_frame.max()
-        ffc_corrected_frame = np.clip(ffc_corrected_frame, frame_min_value, frame_max_value)
-        normalized_frame = cv2.normalize(ffc_corrected_frame, None, 0, 255, cv2.NORM_MINMAX, dtype=cv2.CV_8U)
+        started = telemetry.start()
+        normalized_frame = self.adjust_span(corrected_frame)
+        telemetry.stop("span", started)
+        started = telemetry.start()
+        self.measure(corrected_frame)
+        telemetry.stop("radiometry", started)
+        if len(self.roi_statistics):
+            started = telemetry.start()
+            self.measure_rois(corrected_frame)
+            telemetry.stop("roi", started)
+        self.frames_rendered += 1
 
         # Transform
-        transformed_frame = np.rot90(normalized_frame, 4 - self.settings.rotation)
-        if self.settings.flip == 1:
-            transformed_frame = np.flip(transformed_frame, 0)
-        elif self.settings.flip == 2:
-            transformed_frame = np.flip(transformed_frame, 1)
-        elif self.settings.flip == 3:
-            transformed_frame = np.flip(transformed_frame, (0,1))
+        started = telemetry.start()
+        self.normalized_frame = normalized_frame
+        transformed_frame = self.transform(normalized_frame, self.output_size(normalized_frame.shape, self.display_size))
+        telemetry.stop("transform", started)
 
         # Colorize
-        color_frame = transformed_frame
-        if self.settings.invert_colors:
-            color_frame = np.invert(color_frame)
-        color_frame = cv2.cvtColor(color_frame, cv2.COLOR_GRAY2BGR)
-        if self.settings.color_palette is not None:
-            color_frame = cv2.applyColorMap(color_frame, self.settings.color_palette)
+        started = telemetry.start()
+        color_frame = self.colorize(transformed_frame)
+        telemetry.stop("colorize", started)
+        return color_frame
+
+    def correct_ffc(self, ir_raw_frame: np.ndarray, ffc_raw_frame: np.ndarray) -> np.ndarray:
+        # the reference only changes on FFC, so its mean is computed once
+        if ffc_raw_frame is not self.ffc_reference:
+            self.ffc_reference = ffc_raw_frame
+            self.ffc_reference_mean = np.float32(np.mean(ffc_raw_frame))
+            # the offsets changed under the temporal average
+            self.temporal_denoiser.reset()
+        if self.corrected_frame is None or self.corrected_frame.shape != ir_raw_frame.shape:
+            self.corrected_frame = np.empty(ir_raw_frame.shape, dtype=np.float32)
+        np.subtract(ir_raw_frame, ffc_raw_frame, out=self.corrected_frame, dtype=np.float32)
+        self.corrected_frame += self.ffc_reference_mean
+        return self.corrected_frame
+
+    def denoise(self, corrected_frame: np.ndarray) -> np.ndarray:
+        if not self.settings.temporal_denoise:
+            self.temporal_denoiser.reset()
+            return corrected_frame
+        self.temporal_denoiser.configure(self.settings.denoise_strength, self.settings.denoise_motion_threshold)
+        return self.temporal_denoiser.denoise(corrected_frame)
+
+    def correct_blind_pixels(self, corrected_frame: np.ndarray) -> np.ndarray:
+        blind_pixel_corrector = self.calibrator.blind_pixel_corrector
+        if blind_pixel_corrector is not None and blind_pixel_corrector.shape == corrected_frame.shape:
+            blind_pixel_corrector.correct(corrected_frame)
+        return corrected_frame
+
+    def radiometry_ready(self) -> bool:
+        return self.radiometry is not None and self.fpa_temp_celsius is not None
+
+    def adjust_span(self, corrected_frame: np.ndarray) -> np.ndarray:
+        settings = self.settings
+        manual_span = settings.span_range if settings.manual_span else None
+        if settings.temperature_span and self.radiometry_ready():
+            manual_span = [self.radiometry.counts_for(temperature, self.fpa_temp_celsius)
+                           for temperature in settings.temperature_span_range]
+        normalized_frame, frame_min_value, frame_max_value = self.auto_gain.apply(
+            corrected_frame,
+            mode=settings.agc_mode,
+            low_percentile=settings.agc_low_percentile,
+            high_percentile=settings.agc_high_percentile,
+            smoothing=settings.agc_smoothing,
+            plateau=settings.agc_plateau,
+            manual_span=manual_span,
+        )
 
-        self.last_frame = color_frame
-        if self.recording:
-            record_frame = cv2.resize(color_frame, None, fx=self.recording_scale, fy=self.recording_scale, interpolation=cv2.INTER_CUBIC)
-            self.video_writer.write(record_frame)
-            
         self.last_frame_properties.min_value = frame_min_value
         self.last_frame_properties.max_value = frame_max_value
-        return color_frame
+        return normalized_frame
+
+    def measure(self, corrected_frame: np.ndarray):
+        """Reads the spot and span temperatures into `last_frame_properties`."""
+        properties = self.last_frame_properties
+        if not self.radiometry_ready():
+            properties.min_temperature = properties.max_temperature = properties.spot_temperature = None
+            return
+        fpa_temp_celsius = self.fpa_temp_celsius
+        properties.min_temperature = self.radiometry.temperature(properties.min_value, fpa_temp_celsius)
+        properties.max_temperature = self.radiometry.temperature(properties.max_value, fpa_temp_celsius)
+        height, width = corrected_frame.shape
+        x, y = self.settings.spot_position if self.settings.spot_position is not None else (width // 2, height // 2)
+        properties.spot_temperature = self.radiometry.spot(corrected_frame, fpa_temp_celsius, x, y)
+
+    def measure_rois(self, corrected_frame: np.ndarray) -> np.ndarray:
+        """Statistics of the ROIs set with `roi_statistics.set_rois`, also
+        kept in `roi_statistics.results` until the next frame."""
+        results = self.roi_statistics.compute(corrected_frame, self.radiometry, self.fpa_temp_celsius)
+        roi_log = self.roi_log
+        if roi_log is not None:
+            roi_log.write(self.frames_rendered, results)
+        return results
+
+    def start_roi_log(self, path: str):
+        self.stop_roi_log()
+        self.roi_log = RoiLog(path)
+
+    def stop_roi_log(self):
+        if self.roi_log is not None:
+            roi_log, self.roi_log = self.roi_log, None
+            roi_log.close()
+
+    def output_size(self, frame_shape: tuple, bounds: tuple[int, int] | None) -> tuple[int, int]:
+        """The (width, height) of the transformed frame fitted into `bounds`."""
+        size = oriented_size(frame_shape, self.settings.rotation, self.settings.crop)
+        return size if bounds is None else fit_size(size, bounds)
+
+    def transform(self, normalized_frame: np.ndarray, output_size: tuple[int, int] | None = None,
+                  interpolation=cv2.INTER_LINEAR, output="display") -> np.ndarray:
+        settings = self.settings
+        return self.geometry.apply(normalized_frame, settings.rotation, settings.flip, settings.crop,
+                                   output_size, interpolation, output)
+
+    def render_recording_frame(self, color_frame: np.ndarray, recording_size: tuple[int, int]) -> np.ndarray:
+        """The last rendered frame at the recording size, transformed from the
+        normalized frame instead of resizing the display frame."""
+        height, width = color_frame.shape[:2]
+        if (width, height) == tuple(recording_size):
+            return color_frame
+        gray_frame = self.transform(self.normalized_frame, self.output_size(self.normalized_frame.shape, recording_size),
+                                    cv2.INTER_CUBIC, output="recording")
+        if self.recording_frame is None or self.recording_frame.shape[:2] != gray_frame.shape:
+            self.recording_frame = np.empty((*gray_frame.shape, 3), dtype=np.uint8)
+        return self.palette_engine.colorize(gray_frame, self.settings.color_palette, self.settings.invert_colors,
+                                            self.recording_frame)
+
+    def recording_size(self) -> tuple[int, int]:
+        device = self.current_device
+        width, height = oriented_size((device.frame_height, device.frame_width), self.settings.rotation, self.settings.crop)
+        return int(round(width * self.recording_scale)), int(round(height * self.recording_scale))
+
+    def colorize(self, transformed_frame: np.ndarray) -> np.ndarray:
+        return self.palette_engine.colorize(transformed_frame, self.settings.color_palette, self.settings.invert_colors)
     
     def get_palette_ruler(self):
-        gradient = np.arange(256, dtype=np.uint8).reshape(1, 256)
-        if self.settings.invert_colors: 
-            gradient = np.flip(gradient)
-        color_ruler = cv2.cvtColor(gradient, cv2.COLOR_GRAY2BGR)
-        if self.settings.color_palette is not None:
-            color_ruler = cv2.applyColorMap(gradient, self.settings.color_palette)
-        return color_ruler
+        return self.palette_engine.ruler(self.settings.color_palette, self.settings.invert_colors)
+
+    def load_palette(self, path: str) -> str:
+        name = load_palette_file(path)
+        self.palette_engine.invalidate(name)
+        return name
     
     def capture_frame(self):
         if self.current_device is None:
@@ -101,16 +287,91 @@ class Compositor():
 
     def start_recording(self):
         if self.recording: return
+        # only recording once the writer exists, a failed start can be retried
+        if self.recording_format == RECORDING_FORMAT_RAW:
+            self.start_raw_recording()
+        elif self.recording_format == RECORDING_FORMAT_TRIGGERED:
+            self.start_triggered_recording()
+        else:
+            self.start_video_recording()
         self.recording = True
-        height, width, channels = self.last_frame.shape
-        self.video_writer = cv2.VideoWriter(
-            'output.avi', 
-            self.fourcc, 
-            self.current_device.framerate, 
-            (width * self.recording_scale, height * self.recording_scale), 
+
+    def start_video_recording(self):
+        self.recording_path = f'{self.recording_name}{VIDEO_CODECS[self.recording_codec]}'
+        # frames are rendered at the recording size, the encoder only encodes
+        self.video_encoder = VideoEncoder(
+            self.recording_path,
+            self.current_device.framerate,
+            self.recording_size(),
+            codec=self.recording_codec,
+            queue_size=self.recording_queue_size,
+            backpressure=self.recording_backpressure,
             )
 
+    def start_raw_recording(self):
+        device = self.current_device
+        self.recording_path = f'{self.recording_name}{RAW_EXTENSION}'
+        self.raw_recorder = RawRecorder(self.recording_path, device.frame_width, device.frame_height, device.device_info)
+        self.raw_recorded_ffc_frame = None
+        device.add_frame_sink(self.record_raw_frame)
+
+    def record_raw_frame(self, frame: np.ndarray, frame_info):
+        # called in the acquisition thread for every frame
+        raw_recorder = self.raw_recorder
+        if raw_recorder is None:
+            return
+        ffc_frame = self.current_device.ffc_frame
+        if ffc_frame is not self.raw_recorded_ffc_frame:
+            self.raw_recorded_ffc_frame = ffc_frame
+            raw_recorder.add_ffc_frame(ffc_frame, frame_info)
+        raw_recorder.append(frame, frame_info)
+
+    def start_triggered_recording(self):
+        device = self.current_device
+        settings = self.settings
+        triggers = list(self.triggers)
+        if settings.trigger_motion_threshold is not None:
+            triggers.append(MotionTrigger(settings.trigger_motion_threshold))
+        if settings.trigger_temperature is not None:
+            triggers.append(TemperatureTrigger(settings.trigger_temperature, settings.trigger_temperature_roi))
+        self.recording_path = self.recording_name
+        self.trigger_engine = TriggerEngine(
+            self.recording_name,
+            (device.frame_height, device.frame_width),
+            device.framerate,
+            settings.trigger_pre_seconds,
+            settings.trigger_post_seconds,
+            parameters=device.device_info,
+            triggers=triggers,
+            )
+        self.trigger_engine.radiometry = self.radiometry
+        self.trigger_engine.telemetry = self.telemetry
+        device.add_frame_sink(self.evaluate_triggers)
+
+    def evaluate_triggers(self, frame: np.ndarray, frame_info):
+        # called in the acquisition thread for every frame
+        trigger_engine = self.trigger_engine
+        if trigger_engine is None:
+            return
+        device = self.current_device
+        trigger_engine.on_frame(frame, frame_info, device.ffc_frame, device.performing_ffc)
+
+    def trigger_recording(self):
+        """Starts or extends an event when recording triggered."""
+        if self.trigger_engine is not None:
+            self.trigger_engine.fire()
+
     def stop_recording(self):
         if not self.recording: return
         self.recording = False
-        self.video_writer.release()
\ No newline at end of file
+        if self.trigger_engine is not None:
+            trigger_engine, self.trigger_engine = self.trigger_engine, None
+            self.current_device.remove_frame_sink(self.evaluate_triggers)
+            trigger_engine.close()
+        if self.raw_recorder is not None:
+            raw_recorder, self.raw_recorder = self.raw_recorder, None
+            self.current_device.remove_frame_sink(self.record_raw_frame)
+            raw_recorder.close()
+        if self.video_encoder is not None:
+            video_encoder, self.video_encoder = self.video_encoder, None
+            video_encoder.close(drain=True)
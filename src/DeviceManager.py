@@ -0,0 +1,227 @@
+import threading
+from typing import TYPE_CHECKING, Callable
+import numpy as np
+
+from src.Calibrator import Calibrator
+from src.Compositor import Compositor, RECORDING_FORMAT_VIDEO
+from src.Telemetry import Telemetry
+from src.drivers.acquisition import FrameDispatcher
+from src.settings import GeneralSettings
+
+if TYPE_CHECKING:
+    from src.drivers.base import BaseDriver
+
+PROCESSING_TIMEOUT = 0.1 # seconds between checks for a stop request
+
+
+class DevicePipeline():
+    """One camera with its own Calibrator, Compositor and telemetry.
+
+    The driver's acquisition thread copies each frame into a back buffer and
+    wakes the pipeline's processing thread, which swaps it for its work
+    buffer and renders the newest frame. Frames that arrive while a frame is
+    rendering replace each other, the camera is never held up. The OpenCV and
+    numpy stages release the GIL, so several pipelines render in parallel on
+    several cores. The GUI is notified through a queued signal, at most once
+    per frame it has shown."""
+    def __init__(self, device: "BaseDriver", settings: GeneralSettings,
+                 on_frame: Callable[["DevicePipeline"], None] | None = None):
+        self.device = device
+        self.settings = settings
+        self.on_frame = on_frame
+        self.telemetry = Telemetry(enabled=True)
+
+        self.calibrator = Calibrator()
+        self.calibrator.settings = settings
+        self.compositor = Compositor()
+        self.compositor.settings = settings
+        self.compositor.calibrator = self.calibrator
+        self.compositor.telemetry = self.telemetry
+        self.compositor.assign_device(device)
+
+        self.pending_frame: np.ndarray | None = None
+        self.work_frame: np.ndarray | None = None
+        self.pending_fpa_temp_celsius: float | None = None
+        self.display_frame: np.ndarray | None = None
+        self.received_sequence = 0
+        self.rendered_sequence = 0
+        self.frames_rendered = 0
+        self.frames_skipped = 0
+
+        # the pending frame, written by the acquisition thread
+        self.frame_lock = threading.Lock()
+        # the display frame, read by the GUI
+        self.display_lock = threading.Lock()
+        # the compositor, while rendering or starting and stopping a recording
+        self.processing_lock = threading.Lock()
+        self.dispatcher = FrameDispatcher(self._dispatch)
+        self._frame_available = threading.Event()
+        self._dispatch_pending = threading.Event()
+        self._running = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def serial_number(self):
+        return self.device.device_info["serial_number"]
+
+    @property
+    def running(self):
+        return self._running.is_set()
+
+    def start(self):
+        """Connects the device and starts processing its frames. Call from
+        the GUI thread."""
+        self.device.telemetry = self.telemetry
+        self.device.connect()
+        self.calibrator.assign_device(self.device)
+        self.telemetry.set_value("target_fps", self.device.framerate or 0)
+        self.compositor.recording_name = f"output_{self.serial_number}"
+
+        self._running.set()
+        self._thread = threading.Thread(target=self._run, name=f"DevicePipeline-{self.serial_number}", daemon=True)
+        self._thread.start()
+        self.device.add_frame_sink(self.receive_frame)
+        return self
+
+    def stop(self, timeout=2.0):
+        """Stops recording and processing, and closes the device."""
+        self.device.remove_frame_sink(self.receive_frame)
+        self._running.clear()
+        self._frame_available.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.stop_recording()
+        self.device.close()
+
+    def receive_frame(self, frame: np.ndarray, frame_info):
+        # a frame sink, called in the acquisition thread
+        with self.frame_lock:
+            if self.pending_frame is None or self.pending_frame.shape != frame.shape:
+                self.pending_frame = np.empty(frame.shape, dtype=frame.dtype)
+            np.copyto(self.pending_frame, frame)
+            self.pending_fpa_temp_celsius = float(frame_info["fpa_temp_celsius"])
+            self.received_sequence += 1
+        self._frame_available.set()
+
+    def latest_frame(self) -> np.ndarray | None:
+        """A copy of the newest rendered BGR frame."""
+        with self.display_lock:
+            return None if self.display_frame is None else self.display_frame.copy()
+
+    def start_recording(self, recording_format=RECORDING_FORMAT_VIDEO):
+        with self.processing_lock:
+            self.compositor.recording_format = recording_format
+            self.compositor.start_recording()
+
+    def stop_recording(self):
+        with self.processing_lock:
+            self.compositor.stop_recording()
+
+    def trigger_recording(self):
+        self.compositor.trigger_recording()
+
+    def _run(self):
+        while self._running.is_set():
+            if not self._frame_available.wait(PROCESSING_TIMEOUT):
+                continue
+            self._frame_available.clear()
+            with self.frame_lock:
+                if self.received_sequence == self.rendered_sequence:
+                    continue
+                self.frames_skipped += self.received_sequence - self.rendered_sequence - 1
+                self.rendered_sequence = self.received_sequence
+                if self.work_frame is None or self.work_frame.shape != self.pending_frame.shape:
+                    self.work_frame = np.empty_like(self.pending_frame)
+                self.pending_frame, self.work_frame = self.work_frame, self.pending_frame
+                fpa_temp_celsius = self.pending_fpa_temp_celsius
+            if self.device.performing_ffc and self.settings.freeze_on_ffc:
+                continue
+
+            started = self.telemetry.start()
+            with self.processing_lock:
+                color_frame = self.compositor.process(self.work_frame, self.device.ffc_frame, fpa_temp_celsius)
+            with self.display_lock:
+                if self.display_frame is None or self.display_frame.shape != color_frame.shape:
+                    self.display_frame = np.empty(color_frame.shape, dtype=color_frame.dtype)
+                np.copyto(self.display_frame, color_frame)
+            self.telemetry.stop("render", started)
+            self.telemetry.tick("rendered")
+            self.frames_rendered += 1
+
+            if self.on_frame is not None and not self._dispatch_pending.is_set():
+                self._dispatch_pending.set()
+                self.dispatcher.frame_arrived.emit()
+
+    def _dispatch(self):
+        self._dispatch_pending.clear()
+        if self.on_frame is not None:
+            self.on_frame(self)
+
+
+class DeviceManager():
+    """Opens every attached camera and keeps a `DevicePipeline` per device,
+    keyed by serial number.
+
+    All pipelines share `settings`, so palette and span changes apply to
+    every view. `on_frame` is called in the GUI thread with the pipeline
+    that rendered a new frame."""
+    def __init__(self, settings: GeneralSettings | None = None):
+        self.settings = settings if settings is not None else GeneralSettings()
+        self.pipelines: dict[int, DevicePipeline] = {}
+        self.on_frame: Callable[[DevicePipeline], None] | None = None
+        self.recording = False
+        self.recording_format = RECORDING_FORMAT_VIDEO
+
+    def __len__(self):
+        return len(self.pipelines)
+
+    def __iter__(self):
+        return iter(list(self.pipelines.values()))
+
+    def discover(self) -> list[DevicePipeline]:
+        """Opens every MAG-160 core that isn't open yet."""
+        from src.drivers.MAG160Core import Mag160Core, find_devices
+        open_addresses = {(pipeline.device.device.bus, pipeline.device.device.address)
+                          for pipeline in self if isinstance(pipeline.device, Mag160Core)}
+        return [self.add_device(Mag160Core(usb_device)) for usb_device in find_devices()
+                if (usb_device.bus, usb_device.address) not in open_addresses]
+
+    def add_device(self, device: "BaseDriver") -> DevicePipeline:
+        pipeline = DevicePipeline(device, self.settings, self._frame_rendered)
+        pipeline.start()
+        if pipeline.serial_number in self.pipelines:
+            pipeline.stop()
+            raise ValueError(f"A device with serial number {pipeline.serial_number} is already open")
+        self.pipelines[pipeline.serial_number] = pipeline
+        if self.recording:
+            pipeline.start_recording(self.recording_format)
+        return pipeline
+
+    def remove_device(self, serial_number):
+        self.pipelines.pop(serial_number).stop()
+
+    def start_recording(self, recording_format=RECORDING_FORMAT_VIDEO):
+        """Records every device, each to its own file."""
+        self.recording = True
+        self.recording_format = recording_format
+        for pipeline in self:
+            pipeline.start_recording(recording_format)
+
+    def stop_recording(self):
+        self.recording = False
+        for pipeline in self:
+            pipeline.stop_recording()
+
+    def trigger_recording(self):
+        """Starts or extends an event on every device recording triggered."""
+        for pipeline in self:
+            pipeline.trigger_recording()
+
+    def close(self):
+        for serial_number in list(self.pipelines):
+            self.remove_device(serial_number)
+
+    def _frame_rendered(self, pipeline: DevicePipeline):
+        if self.on_frame is not None:
+            self.on_frame(pipeline)
@@ -0,0 +1,172 @@
+import struct
+import time
+from multiprocessing import shared_memory, resource_tracker
+import numpy as np
+
+from src.drivers.frame_info import FRAME_INFO_DTYPE
+
+# magic, version, capacity, height, width, dtype string
+BUS_HEADER = struct.Struct("<4sIIII8s")
+BUS_MAGIC = b"IRFB"
+BUS_VERSION = 1
+# the header is followed by the total number of frames published
+BUS_HEADER_SIZE = 64
+
+DEFAULT_BUS_CAPACITY = 16
+POLL_INTERVAL = 0.001
+
+# buses created by this process, their reader must leave the tracking alone
+_created_names = set()
+
+
+def bus_layout(capacity: int, frame_shape: tuple, dtype) -> np.dtype:
+    """The shared memory layout of a bus. Every slot carries the sequence
+    number of the frame it holds, 0 while it is being written."""
+    slot_dtype = np.dtype([
+        ("sequence", "<u8"),
+        ("info", FRAME_INFO_DTYPE),
+        ("frame", np.dtype(dtype), frame_shape),
+    ], align=True)
+    return np.dtype([
+        ("header", "u1", BUS_HEADER_SIZE - 8),
+        ("published", "<u8"),
+        ("slots", slot_dtype, capacity),
+    ])
+
+
+class FrameBusWriter():
+    """Publishes frames into a ring of slots in shared memory, so other
+    processes can read them without going through the GUI process.
+
+    `publish` has the frame sink signature and is called in the acquisition
+    thread. A slot's sequence number is cleared before its frame is
+    overwritten and set after, which lets readers tell a valid frame from one
+    that was overwritten under them."""
+    def __init__(self, name: str | None, frame_shape: tuple, dtype=np.uint16, capacity=DEFAULT_BUS_CAPACITY):
+        self.capacity = capacity
+        self.frame_shape = tuple(frame_shape)
+        self.dtype = np.dtype(dtype)
+        layout = bus_layout(capacity, self.frame_shape, self.dtype)
+        self.shared_memory = shared_memory.SharedMemory(name, create=True, size=layout.itemsize)
+        self.name = self.shared_memory.name
+        _created_names.add(self.name)
+
+        self.bus = np.ndarray((), dtype=layout, buffer=self.shared_memory.buf)
+        self.bus["header"][:BUS_HEADER.size] = np.frombuffer(BUS_HEADER.pack(
+            BUS_MAGIC, BUS_VERSION, capacity, self.frame_shape[0], self.frame_shape[1], self.dtype.str.encode()), dtype=np.uint8)
+        self.slots = self.bus["slots"]
+        self.slots["sequence"] = 0
+        self.published = 0
+
+    def publish(self, frame: np.ndarray, frame_info):
+        sequence = self.published + 1
+        slot = self.slots[(sequence - 1) % self.capacity]
+        slot["sequence"] = 0
+        np.copyto(slot["frame"], frame, casting="unsafe")
+        slot["info"] = frame_info
+        slot["sequence"] = sequence
+        self.bus["published"] = self.published = sequence
+
+    def close(self, unlink=True):
+        self.bus = self.slots = None
+        self.shared_memory.close()
+        if unlink:
+            self.shared_memory.unlink()
+            _created_names.discard(self.name)
+
+
+class FrameBusReader():
+    """Attaches to a bus created by `FrameBusWriter`, possibly in another
+    process.
+
+    `view` returns zero-copy views into shared memory; they are only known to
+    be intact if `is_valid(sequence)` still holds after they were used.
+    `next_frame` walks the frames in order, skipping ahead and counting
+    `frames_overrun` when the reader fell more than a ring behind."""
+    def __init__(self, name: str):
+        self.shared_memory = shared_memory.SharedMemory(name)
+        if name not in _created_names:
+            # only the creator owns the segment, don't let this process's
+            # resource tracker unlink it at exit
+            resource_tracker.unregister(self.shared_memory._name, "shared_memory")
+        self.name = name
+
+        magic, version, capacity, height, width, dtype = BUS_HEADER.unpack_from(self.shared_memory.buf)
+        if magic != BUS_MAGIC or version != BUS_VERSION:
+            self.shared_memory.close()
+            raise ValueError(f"{name} is not a frame bus")
+        self.capacity = capacity
+        self.frame_shape = (height, width)
+        self.dtype = np.dtype(dtype.rstrip(b"\0").decode())
+        layout = bus_layout(capacity, self.frame_shape, self.dtype)
+        self.bus = np.ndarray((), dtype=layout, buffer=self.shared_memory.buf)
+        self.slots = self.bus["slots"]
+
+        self.last_sequence = self.published
+        self.frames_read = 0
+        self.frames_overrun = 0
+
+    @property
+    def published(self) -> int:
+        return int(self.bus["published"])
+
+    def is_valid(self, sequence: int) -> bool:
+        return int(self.slots[(sequence - 1) % self.capacity]["sequence"]) == sequence
+
+    def view(self, sequence: int):
+        """Returns `(frame, frame_info)` views of frame number `sequence`, or
+        `(None, None)` if it was overwritten or has not been published yet."""
+        if sequence <= 0 or not self.is_valid(sequence):
+            return None, None
+        slot = self.slots[(sequence - 1) % self.capacity]
+        return slot["frame"], slot["info"]
+
+    def read(self, sequence: int):
+        """Like `view` but returns copies, which are guaranteed intact."""
+        frame, frame_info = self.view(sequence)
+        if frame is None:
+            return None, None
+        frame, frame_info = frame.copy(), frame_info.copy()
+        if not self.is_valid(sequence):
+            return None, None
+        return frame, frame_info
+
+    def latest(self):
+        """Returns a copy of the newest frame as `(frame, frame_info, sequence)`."""
+        while True:
+            sequence = self.published
+            if sequence == 0:
+                return None, None, 0
+            frame, frame_info = self.read(sequence)
+            if frame is not None:
+                return frame, frame_info, sequence
+
+    def next_frame(self, timeout: float | None = None, copy=True):
+        """Waits for the frame after the last one returned and returns
+        `(frame, frame_info, sequence)`, or `(None, None, 0)` on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            published = self.published
+            if published > self.last_sequence:
+                sequence = self.last_sequence + 1
+                # keep a slot of margin for the one being written
+                oldest = published - self.capacity + 2
+                if sequence < oldest:
+                    self.frames_overrun += oldest - sequence
+                    sequence = oldest
+                frame, frame_info = self.read(sequence) if copy else self.view(sequence)
+                if frame is None:
+                    # overwritten between the checks, try again from the newest
+                    self.frames_overrun += 1
+                    self.last_sequence = sequence
+                    continue
+                self.last_sequence = sequence
+                self.frames_read += 1
+                return frame, frame_info, sequence
+            if deadline is not None and time.monotonic() >= deadline:
+                return None, None, 0
+            time.sleep(POLL_INTERVAL)
+
+    def close(self):
+        self.bus = self.slots = None
+        self.shared_memory.close()
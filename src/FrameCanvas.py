@@ -0,0 +1,118 @@
+import time
+import cv2
+import numpy as np
+
+from PyQt5.QtWidgets import QFrame
+from PyQt5.QtGui import (
+    QImage,
+    QPainter,
+)
+from PyQt5.QtCore import (
+    Qt,
+    QRect,
+    QSize,
+    QTimer,
+)
+
+DEFAULT_REFRESH_RATE = 60.0
+DEFAULT_SIZE = QSize(640, 480)
+
+# 32-bit pixels are what QPainter draws and scales without converting first,
+# in memory they are BGRA like OpenCV's
+CONVERSIONS = {
+    1: cv2.COLOR_GRAY2BGRA,
+    3: cv2.COLOR_BGR2BGRA,
+}
+
+
+class FrameCanvas(QFrame):
+    """Displays frames from a QImage that wraps a reused buffer.
+
+    `set_frame` converts the frame into the buffer, in the 32-bit format the
+    painter draws natively, and asks for a repaint, at most once per display
+    refresh. Frames arriving in between replace the pending one, so a fast
+    camera can't queue up paints. Scaling to the widget happens once, while
+    painting."""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setAttribute(Qt.WidgetAttribute.WA_OpaquePaintEvent)
+        self.buffer: np.ndarray | None = None
+        self.image: QImage | None = None
+        self.telemetry = None
+        self.frame_interval = 1 / DEFAULT_REFRESH_RATE
+        self.last_paint = 0.0
+        self.pending = False
+        self.frames_received = 0
+        self.frames_coalesced = 0
+        self.frames_painted = 0
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.timeout.connect(self.update)
+
+    def sizeHint(self) -> QSize:
+        return DEFAULT_SIZE
+
+    def showEvent(self, event):
+        screen = self.screen()
+        if screen is not None and screen.refreshRate() > 0:
+            self.frame_interval = 1 / screen.refreshRate()
+        super().showEvent(event)
+
+    def set_frame(self, frame: np.ndarray):
+        """Shows an 8-bit BGR or grayscale frame. The frame is copied, the
+        caller may reuse it right away."""
+        channels = frame.shape[2] if frame.ndim == 3 else 1
+        if frame.dtype != np.uint8 or channels not in CONVERSIONS:
+            raise ValueError(f"Unsupported frame: {frame.dtype} with {channels} channels")
+        height, width = frame.shape[:2]
+        if self.buffer is None or self.buffer.shape[:2] != (height, width):
+            self.buffer = np.empty((height, width, 4), dtype=np.uint8)
+            self.image = QImage(self.buffer.data, width, height, self.buffer.strides[0], QImage.Format.Format_RGB32)
+        cv2.cvtColor(frame, CONVERSIONS[channels], self.buffer)
+        self.frames_received += 1
+
+        if self.pending:
+            self.frames_coalesced += 1
+            return
+        self.pending = True
+        wait = self.last_paint + self.frame_interval - time.monotonic()
+        if wait > 0:
+            self.refresh_timer.start(int(wait * 1000) + 1)
+        else:
+            self.update()
+
+    def clear(self):
+        self.buffer = None
+        self.image = None
+        self.update()
+
+    def image_rect(self) -> QRect:
+        """The area the frame is painted to, fitted to the widget keeping
+        its aspect ratio."""
+        area = self.contentsRect()
+        if self.image is None:
+            return area
+        size = self.image.size().scaled(area.size(), Qt.AspectRatioMode.KeepAspectRatio)
+        rect = QRect(0, 0, size.width(), size.height())
+        rect.moveCenter(area.center())
+        return rect
+
+    def paintEvent(self, event):
+        started = self.telemetry.start() if self.telemetry is not None else 0
+        self.refresh_timer.stop()
+        painter = QPainter(self)
+        painter.fillRect(self.contentsRect(), Qt.GlobalColor.black)
+        if self.image is not None:
+            painter.drawImage(self.image_rect(), self.image)
+        self.drawFrame(painter)
+        painter.end()
+
+        if self.pending:
+            self.pending = False
+            self.last_paint = time.monotonic()
+            self.frames_painted += 1
+            if self.telemetry is not None:
+                self.telemetry.tick("displayed")
+        if self.telemetry is not None:
+            self.telemetry.stop("paint", started)
@@ -0,0 +1,138 @@
+from collections import OrderedDict
+from typing import Callable
+import cv2
+import numpy as np
+
+GEOMETRY_CACHE_SIZE = 8
+
+
+def oriented_size(input_shape: tuple, rotation=0, crop=None) -> tuple[int, int]:
+    """(width, height) of the cropped and rotated frame before scaling."""
+    height, width = input_shape[:2]
+    if crop is not None:
+        _, _, width, height = clip_crop(input_shape, crop)
+    return (height, width) if rotation % 2 else (width, height)
+
+
+def clip_crop(input_shape: tuple, crop) -> tuple[int, int, int, int]:
+    height, width = input_shape[:2]
+    x, y, crop_width, crop_height = (int(value) for value in crop)
+    x = min(max(x, 0), width - 1)
+    y = min(max(y, 0), height - 1)
+    return x, y, max(1, min(crop_width, width - x)), max(1, min(crop_height, height - y))
+
+
+def fit_size(size: tuple[int, int], bounds: tuple[int, int]) -> tuple[int, int]:
+    """The largest size with the aspect ratio of `size` within `bounds`."""
+    width, height = size
+    scale = min(bounds[0] / width, bounds[1] / height)
+    return max(1, int(round(width * scale))), max(1, int(round(height * scale)))
+
+
+def numpy_orientation(frame: np.ndarray, rotation: int, flip: int) -> np.ndarray:
+    # the orientation as the pipeline first defined it, with strided views
+    frame = np.rot90(frame, 4 - rotation % 4)
+    if flip == 1:
+        return np.flip(frame, 0)
+    if flip == 2:
+        return np.flip(frame, 1)
+    if flip == 3:
+        return np.flip(frame, (0, 1))
+    return frame
+
+
+def anti_transpose(source: np.ndarray, destination: np.ndarray) -> np.ndarray:
+    cv2.transpose(source, destination)
+    return cv2.flip(destination, -1, destination)
+
+
+# every rotation and flip combination is one of these, writing `source`
+# oriented into `destination`
+ORIENTATIONS: list[Callable[[np.ndarray, np.ndarray], np.ndarray]] = [
+    lambda source, destination: cv2.flip(source, 0, destination),
+    lambda source, destination: cv2.flip(source, 1, destination),
+    lambda source, destination: cv2.flip(source, -1, destination),
+    lambda source, destination: cv2.rotate(source, cv2.ROTATE_90_CLOCKWISE, destination),
+    lambda source, destination: cv2.rotate(source, cv2.ROTATE_90_COUNTERCLOCKWISE, destination),
+    lambda source, destination: cv2.transpose(source, destination),
+    anti_transpose,
+]
+
+
+def find_orientation(rotation: int, flip: int) -> Callable[[np.ndarray, np.ndarray], np.ndarray] | None:
+    """The OpenCV operation matching `numpy_orientation`, None for none."""
+    probe = np.arange(6, dtype=np.uint8).reshape(2, 3)
+    expected = numpy_orientation(probe, rotation, flip)
+    if np.array_equal(expected, probe):
+        return None
+    for orientation in ORIENTATIONS:
+        destination = np.empty(expected.shape, dtype=np.uint8)
+        if np.array_equal(orientation(probe, destination), expected):
+            return orientation
+    raise ValueError(f"No orientation for rotation {rotation} and flip {flip}")
+
+
+class GeometryTransform():
+    """Crops, rotates by quarter turns, flips and scales a frame into reused
+    output buffers.
+
+    The steps for an output are planned once per (input size, rotation,
+    flip, crop, output size, interpolation): the crop is a view, rotation
+    and flip together are one OpenCV transpose, rotate or flip at the
+    cropped size, and scaling is a single resize into the output. Display
+    and recording outputs are each made from the frame directly, without
+    going through each other."""
+    def __init__(self, cache_size=GEOMETRY_CACHE_SIZE):
+        self.cache_size = cache_size
+        self.plans: OrderedDict[tuple, tuple] = OrderedDict()
+        self.plans_built = 0
+        self.outputs: dict[tuple, np.ndarray] = {}
+
+    def get_plan(self, input_shape: tuple, rotation: int, flip: int, crop,
+                 output_size: tuple[int, int], interpolation: int) -> tuple:
+        key = (input_shape[:2], rotation % 4, flip, crop and tuple(crop), output_size, interpolation)
+        plan = self.plans.get(key)
+        if plan is None:
+            plan = self.build_plan(input_shape, rotation, flip, crop, output_size)
+            self.plans[key] = plan
+            self.plans_built += 1
+            if len(self.plans) > self.cache_size:
+                self.plans.popitem(last=False)
+        else:
+            self.plans.move_to_end(key)
+        return plan
+
+    @staticmethod
+    def build_plan(input_shape: tuple, rotation: int, flip: int, crop, output_size: tuple[int, int]) -> tuple:
+        """(crop slices, orientation or None, whether to scale)."""
+        height, width = input_shape[:2]
+        x, y, crop_width, crop_height = clip_crop(input_shape, crop) if crop is not None else (0, 0, width, height)
+        slices = (slice(y, y + crop_height), slice(x, x + crop_width))
+        scaled = output_size != oriented_size(input_shape, rotation, crop)
+        return slices, find_orientation(rotation, flip), scaled
+
+    def buffer(self, output: str, step: str, shape: tuple, dtype) -> np.ndarray:
+        buffer = self.outputs.get((output, step))
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = self.outputs[(output, step)] = np.empty(shape, dtype=dtype)
+        return buffer
+
+    def apply(self, frame: np.ndarray, rotation=0, flip=0, crop=None, output_size: tuple[int, int] | None = None,
+              interpolation=cv2.INTER_LINEAR, output="display") -> np.ndarray:
+        """Returns the transformed frame, `output_size` as (width, height)
+        defaults to the oriented size. Frames are written to buffers named
+        after `output`, overwritten by the next call with that name. A
+        frame that is only cropped, or not transformed at all, is returned as
+        a view."""
+        output_size = oriented_size(frame.shape, rotation, crop) if output_size is None else tuple(output_size)
+        slices, orientation, scaled = self.get_plan(frame.shape, rotation, flip, crop, output_size, interpolation)
+        frame = frame[slices]
+        if orientation is not None:
+            # oriented at the cropped size, outputs are usually scaled up
+            width, height = oriented_size(frame.shape, rotation)
+            step = "oriented" if scaled else "output"
+            frame = orientation(frame, self.buffer(output, step, (height, width, *frame.shape[2:]), frame.dtype))
+        if scaled:
+            destination = self.buffer(output, "output", (output_size[1], output_size[0], *frame.shape[2:]), frame.dtype)
+            frame = cv2.resize(frame, output_size, destination, interpolation=interpolation)
+        return frame
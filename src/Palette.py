@@ -0,0 +1,98 @@
+import os
+from collections import OrderedDict
+import cv2
+import numpy as np
+
+PALETTE_CACHE_SIZE = 8
+PALETTE_SIZE = 256
+
+# User palettes loaded from file, keyed by name, as 256x1x3 BGR tables
+CUSTOM_PALETTES: dict[str, np.ndarray] = {}
+
+GRAY_GRADIENT = np.arange(PALETTE_SIZE, dtype=np.uint8).reshape(PALETTE_SIZE, 1)
+
+
+def build_palette_lut(palette, invert=False) -> np.ndarray:
+    """Builds the 256x1x3 BGR lookup table for an OpenCV colormap id, the name
+    of a custom palette, or None for grayscale."""
+    if palette is None:
+        lut = cv2.cvtColor(GRAY_GRADIENT, cv2.COLOR_GRAY2BGR).reshape(PALETTE_SIZE, 1, 3)
+    elif isinstance(palette, str):
+        lut = CUSTOM_PALETTES[palette]
+    else:
+        lut = cv2.applyColorMap(GRAY_GRADIENT, palette)
+    if invert:
+        lut = lut[::-1]
+    return np.ascontiguousarray(lut)
+
+
+def read_palette_file(path: str) -> np.ndarray:
+    """Reads an RGB palette from an Adobe .act file, a .npy array or a text
+    file with one "r g b" row per entry. Palettes with other than 256 entries
+    are interpolated to 256."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".act":
+        with open(path, "rb") as f:
+            colors = np.frombuffer(f.read(768), dtype=np.uint8).reshape(-1, 3)
+    elif extension == ".npy":
+        colors = np.load(path)
+    else:
+        colors = np.loadtxt(path, delimiter=None if extension != ".csv" else ",", ndmin=2)
+
+    colors = np.asarray(colors, dtype=np.float32).reshape(-1, 3)
+    if colors.max() <= 1.0:
+        colors = colors * 255
+    if len(colors) != PALETTE_SIZE:
+        positions = np.linspace(0, len(colors) - 1, PALETTE_SIZE)
+        colors = np.stack([np.interp(positions, np.arange(len(colors)), colors[:, channel]) for channel in range(3)], axis=1)
+    rgb = np.clip(np.rint(colors), 0, 255).astype(np.uint8)
+    return np.ascontiguousarray(rgb[:, ::-1]).reshape(PALETTE_SIZE, 1, 3)
+
+
+def load_palette_file(path: str, name: str | None = None) -> str:
+    """Registers a palette file as a custom palette and returns its name."""
+    if name is None:
+        name = os.path.splitext(os.path.basename(path))[0]
+    CUSTOM_PALETTES[name] = read_palette_file(path)
+    return name
+
+
+class PaletteEngine():
+    """Colorizes 8-bit frames with a cached lookup table per (palette, invert)
+    combination, writing into a reusable output buffer."""
+    def __init__(self, cache_size=PALETTE_CACHE_SIZE):
+        self.cache_size = cache_size
+        self.cache: OrderedDict[tuple, np.ndarray] = OrderedDict()
+        self.output: np.ndarray | None = None
+
+    def get_lut(self, palette, invert=False) -> np.ndarray:
+        key = (palette, bool(invert))
+        lut = self.cache.get(key)
+        if lut is None:
+            lut = build_palette_lut(palette, invert)
+            self.cache[key] = lut
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        else:
+            self.cache.move_to_end(key)
+        return lut
+
+    def invalidate(self, palette=None):
+        if palette is None:
+            self.cache.clear()
+            return
+        for key in [key for key in self.cache if key[0] == palette]:
+            del self.cache[key]
+
+    def colorize(self, gray_frame: np.ndarray, palette, invert=False, out: np.ndarray | None = None) -> np.ndarray:
+        """Returns the BGR frame in `out`, or in the engine's output buffer,
+        which is overwritten by the next call."""
+        height, width = gray_frame.shape[:2]
+        if out is None:
+            if self.output is None or self.output.shape[:2] != (height, width):
+                self.output = np.empty((height, width, 3), dtype=np.uint8)
+            out = self.output
+        return cv2.applyColorMap(gray_frame, self.get_lut(palette, invert), out)
+
+    def ruler(self, palette, invert=False) -> np.ndarray:
+        return self.get_lut(palette, invert).reshape(1, PALETTE_SIZE, 3).copy()
@@ -0,0 +1,172 @@
+"""Radiometric temperature conversion.
+
+A `CalibrationModel` maps FFC corrected counts to degrees Celsius at a given
+FPA temperature. Evaluating it per pixel and per frame is wasteful: counts
+are 16-bit and the FPA temperature drifts slowly, so `RadiometricEngine`
+tabulates the model over every count value once per FPA temperature bucket
+and converts frames with a single table lookup. A new table is only built
+when the FPA temperature moves to a bucket that isn't cached.
+"""
+import json
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+import cv2
+import numpy as np
+
+COUNT_LEVELS = 2**16
+FPA_BUCKET_WIDTH = 0.25 # degrees Celsius of FPA temperature per table
+TABLE_CACHE_SIZE = 16 # tables kept, 256 KiB each
+KELVIN = 273.15
+
+
+class CalibrationModel(ABC):
+    """Converts FFC corrected counts to degrees Celsius."""
+    name = "base"
+
+    @abstractmethod
+    def temperature(self, counts: np.ndarray, fpa_temp_celsius: float) -> np.ndarray:
+        """Vectorized over `counts`, returns float32 degrees Celsius."""
+
+    def to_dict(self) -> dict:
+        return {"model": self.name, **vars(self)}
+
+
+class LinearCalibrationModel(CalibrationModel):
+    """`gain` degrees per count above `offset` counts, which reads
+    `reference_celsius`. The offset drifts by `fpa_slope` counts per degree
+    of FPA temperature away from `reference_fpa_celsius`."""
+    name = "linear"
+
+    def __init__(self, gain: float, offset: float, reference_celsius=25.0, fpa_slope=0.0, reference_fpa_celsius=25.0):
+        self.gain = gain
+        self.offset = offset
+        self.reference_celsius = reference_celsius
+        self.fpa_slope = fpa_slope
+        self.reference_fpa_celsius = reference_fpa_celsius
+
+    def temperature(self, counts, fpa_temp_celsius):
+        offset = self.offset + self.fpa_slope * (fpa_temp_celsius - self.reference_fpa_celsius)
+        return ((np.asarray(counts, dtype=np.float64) - offset) * self.gain + self.reference_celsius).astype(np.float32)
+
+
+class PlanckCalibrationModel(CalibrationModel):
+    """The usual microbolometer fit, counts = R / (exp(B / T) - F) + O with T
+    in kelvin, solved for T. The offset O drifts by `fpa_slope` counts per
+    degree of FPA temperature away from `reference_fpa_celsius`."""
+    name = "planck"
+
+    def __init__(self, r: float, b: float, f: float, o: float, fpa_slope=0.0, reference_fpa_celsius=25.0):
+        self.r = r
+        self.b = b
+        self.f = f
+        self.o = o
+        self.fpa_slope = fpa_slope
+        self.reference_fpa_celsius = reference_fpa_celsius
+
+    def temperature(self, counts, fpa_temp_celsius):
+        offset = self.o + self.fpa_slope * (fpa_temp_celsius - self.reference_fpa_celsius)
+        # counts at or below the offset are colder than the fit can tell,
+        # they read as the temperature of the smallest signal
+        signal = np.maximum(np.asarray(counts, dtype=np.float64) - offset, 1e-3)
+        kelvin = self.b / np.log(self.r / signal + self.f)
+        return (kelvin - KELVIN).astype(np.float32)
+
+
+CALIBRATION_MODELS = {
+    LinearCalibrationModel.name: LinearCalibrationModel,
+    PlanckCalibrationModel.name: PlanckCalibrationModel,
+}
+
+
+def calibration_model_from_dict(parameters: dict) -> CalibrationModel:
+    parameters = dict(parameters)
+    model = parameters.pop("model")
+    if model not in CALIBRATION_MODELS:
+        raise ValueError(f"Unknown calibration model {model}")
+    return CALIBRATION_MODELS[model](**parameters)
+
+
+def load_calibration_model(path: str) -> CalibrationModel:
+    """Reads a model saved as JSON, `{"model": "planck", "r": ..., ...}`."""
+    with open(path) as f:
+        return calibration_model_from_dict(json.load(f))
+
+
+def save_calibration_model(model: CalibrationModel, path: str):
+    with open(path, "w") as f:
+        json.dump(model.to_dict(), f, indent=2)
+
+
+class RadiometricEngine():
+    """Converts counts to temperatures through tables cached per FPA
+    temperature bucket.
+
+    Tables are made non-decreasing, which every physical model is over its
+    valid range, so temperatures can be mapped back to counts for a
+    temperature span."""
+    def __init__(self, model: CalibrationModel, bucket_width=FPA_BUCKET_WIDTH, cache_size=TABLE_CACHE_SIZE):
+        self.model = model
+        self.bucket_width = bucket_width
+        self.cache_size = cache_size
+        self.tables: OrderedDict[int, np.ndarray] = OrderedDict()
+        self.tables_built = 0
+        self.counts = np.arange(COUNT_LEVELS, dtype=np.float32)
+        self.indices: np.ndarray | None = None
+
+    def bucket(self, fpa_temp_celsius: float) -> int:
+        return int(round(fpa_temp_celsius / self.bucket_width))
+
+    def table(self, fpa_temp_celsius: float) -> np.ndarray:
+        """The count to temperature table for the bucket of `fpa_temp_celsius`."""
+        bucket = self.bucket(fpa_temp_celsius)
+        table = self.tables.get(bucket)
+        if table is not None:
+            self.tables.move_to_end(bucket)
+            return table
+        table = self.model.temperature(self.counts, bucket * self.bucket_width).astype(np.float32)
+        np.maximum.accumulate(table, out=table)
+        self.tables[bucket] = table
+        self.tables_built += 1
+        if len(self.tables) > self.cache_size:
+            self.tables.popitem(last=False)
+        return table
+
+    def convert(self, frame: np.ndarray, fpa_temp_celsius: float, out: np.ndarray | None = None) -> np.ndarray:
+        """Converts a frame of counts to a float32 frame of temperatures."""
+        table = self.table(fpa_temp_celsius)
+        if frame.dtype != np.uint16:
+            # round and saturate to table indices in one pass
+            if self.indices is None or self.indices.shape != frame.shape:
+                self.indices = np.empty(frame.shape, dtype=np.uint16)
+            cv2.addWeighted(frame, 1, frame, 0, 0, self.indices, dtype=cv2.CV_16U)
+            frame = self.indices
+        return np.take(table, frame, out=out)
+
+    def temperature(self, counts: float, fpa_temp_celsius: float) -> float:
+        """The temperature of a single count value, interpolated between
+        table entries."""
+        table = self.table(fpa_temp_celsius)
+        counts = min(max(float(counts), 0.0), COUNT_LEVELS - 1.0)
+        index = min(int(counts), COUNT_LEVELS - 2)
+        return float(table[index] + (counts - index) * (table[index + 1] - table[index]))
+
+    def temperatures(self, counts: np.ndarray, fpa_temp_celsius: float) -> np.ndarray:
+        """`temperature` for an array of count values."""
+        return np.interp(counts, self.counts, self.table(fpa_temp_celsius)).astype(np.float32)
+
+    def spot(self, frame: np.ndarray, fpa_temp_celsius: float, x: int, y: int, radius=1) -> float:
+        """The temperature of the mean counts around pixel `(x, y)`."""
+        height, width = frame.shape[:2]
+        area = frame[max(0, y - radius):min(height, y + radius + 1), max(0, x - radius):min(width, x + radius + 1)]
+        return self.temperature(float(np.mean(area)), fpa_temp_celsius)
+
+    def counts_for(self, temperature: float, fpa_temp_celsius: float) -> float:
+        """The counts reading `temperature`, the inverse of `temperature`."""
+        table = self.table(fpa_temp_celsius)
+        position = int(np.searchsorted(table, temperature))
+        if position <= 0:
+            return 0.0
+        if position >= COUNT_LEVELS:
+            return float(COUNT_LEVELS - 1)
+        low, high = table[position - 1], table[position]
+        return position - 1 + float((temperature - low) / max(high - low, 1e-12))
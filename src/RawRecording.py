@@ -0,0 +1,288 @@
+"""Raw radiometric recordings.
+
+A recording is a chunked little-endian binary file:
+
+    file header     RAW_HEADER: magic, version, width, height, info record size
+    records         RECORD_HEADER (tag, count, payload size) + payload
+        PARM        device parameters as JSON
+        FRMS        `count` FRAME_INFO_DTYPE records followed by `count` uint16 frames
+        FFCR        one FRAME_INFO_DTYPE record and a float32 FFC reference, `count`
+                    is the number of frames recorded before it
+        INDX        frame offset table, then the FFC offset table
+    footer          RAW_FOOTER: magic, offset of the INDX record, frame count
+
+The index makes every frame an O(1) view into a memory map of the file. A
+file without footer, from an interrupted capture, is indexed by scanning its
+records instead.
+"""
+import json
+import queue
+import struct
+import threading
+import numpy as np
+
+from src.drivers.frame_info import FRAME_INFO_DTYPE
+
+RAW_EXTENSION = ".irraw"
+RAW_MAGIC = b"OIRRAW\x00\x01"
+RAW_FOOTER_MAGIC = b"OIRINDEX"
+RAW_VERSION = 1
+RAW_HEADER = struct.Struct("<8sIIII")
+RAW_FOOTER = struct.Struct("<8sQQ")
+RECORD_HEADER = struct.Struct("<4sIQ")
+
+RECORD_PARAMETERS = b"PARM"
+RECORD_FRAMES = b"FRMS"
+RECORD_FFC = b"FFCR"
+RECORD_INDEX = b"INDX"
+
+# frame offset, info offset
+INDEX_DTYPE = np.dtype([("frame_offset", "<u8"), ("info_offset", "<u8")])
+# frames recorded before the reference, frame offset, info offset
+FFC_INDEX_DTYPE = np.dtype([("frame_number", "<u8"), ("frame_offset", "<u8"), ("info_offset", "<u8")])
+
+DEFAULT_BATCH_SIZE = 32
+DEFAULT_FREE_BATCHES = 4
+
+
+def _json_default(value):
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+class _FrameBatch():
+    def __init__(self, batch_size, frame_shape):
+        self.frames = np.empty((batch_size, *frame_shape), dtype=np.uint16)
+        self.infos = np.zeros(batch_size, dtype=FRAME_INFO_DTYPE)
+        self.count = 0
+
+
+class RawRecorder():
+    """Appends raw frames to a recording file.
+
+    `append` only copies the frame into a preallocated batch, full batches are
+    written by a background thread, so recording is cheap to call from the
+    acquisition thread."""
+    def __init__(self, path: str, width: int, height: int, parameters: dict | None = None,
+                 batch_size=DEFAULT_BATCH_SIZE):
+        self.path = path
+        self.frame_shape = (height, width)
+        self.batch_size = batch_size
+        self.frame_count = 0
+        self.batches_allocated = 0
+
+        self._file = open(path, "wb")
+        self._file.write(RAW_HEADER.pack(RAW_MAGIC, RAW_VERSION, width, height, FRAME_INFO_DTYPE.itemsize))
+        if parameters:
+            self._write_record(RECORD_PARAMETERS, 0, json.dumps(parameters, default=_json_default).encode())
+
+        self._frame_index: list[np.ndarray] = []
+        self._ffc_index: list[tuple] = []
+        self._free_batches: queue.Queue[_FrameBatch] = queue.Queue()
+        for _ in range(DEFAULT_FREE_BATCHES):
+            self._free_batches.put(self._allocate_batch())
+        self._pending: queue.Queue = queue.Queue()
+        self._batch = self._free_batches.get()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="RawRecorder", daemon=True)
+        self._writer.start()
+
+    def _allocate_batch(self):
+        self.batches_allocated += 1
+        return _FrameBatch(self.batch_size, self.frame_shape)
+
+    def append(self, frame: np.ndarray, frame_info):
+        with self._lock:
+            if self._closed:
+                return
+            batch = self._batch
+            np.copyto(batch.frames[batch.count], frame, casting="unsafe")
+            batch.infos[batch.count] = frame_info
+            batch.count += 1
+            self.frame_count += 1
+            if batch.count == self.batch_size:
+                self._flush()
+
+    def add_ffc_frame(self, ffc_frame: np.ndarray, frame_info):
+        with self._lock:
+            if self._closed:
+                return
+            self._flush()
+            info = np.zeros(1, dtype=FRAME_INFO_DTYPE)
+            info[0] = frame_info
+            self._pending.put((RECORD_FFC, self.frame_count, info, np.array(ffc_frame, dtype=np.float32)))
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        # hands the current batch to the writer thread
+        if self._batch.count == 0:
+            return
+        self._pending.put((RECORD_FRAMES, self._batch))
+        try:
+            self._batch = self._free_batches.get_nowait()
+        except queue.Empty:
+            # the disk is behind, grow the pool instead of stalling acquisition
+            self._batch = self._allocate_batch()
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._flush()
+        self._pending.put(None)
+        self._writer.join()
+
+        index_offset = self._file.tell()
+        frame_index = np.concatenate(self._frame_index) if self._frame_index else np.zeros(0, INDEX_DTYPE)
+        ffc_index = np.array(self._ffc_index, dtype=FFC_INDEX_DTYPE)
+        self._write_record(RECORD_INDEX, len(frame_index), frame_index.tobytes() + ffc_index.tobytes())
+        self._file.write(RAW_FOOTER.pack(RAW_FOOTER_MAGIC, index_offset, len(frame_index)))
+        self._file.close()
+
+    def _write_record(self, tag, count, *payload):
+        self._file.write(RECORD_HEADER.pack(tag, count, sum(memoryview(part).nbytes for part in payload)))
+        for part in payload:
+            self._file.write(part)
+
+    def _write_loop(self):
+        while True:
+            item = self._pending.get()
+            if item is None:
+                return
+            if item[0] == RECORD_FRAMES:
+                batch = item[1]
+                count = batch.count
+                infos = batch.infos[:count]
+                frames = batch.frames[:count]
+                payload_offset = self._file.tell() + RECORD_HEADER.size
+                index = np.empty(count, dtype=INDEX_DTYPE)
+                index["info_offset"] = payload_offset + np.arange(count) * infos.itemsize
+                index["frame_offset"] = payload_offset + infos.nbytes + np.arange(count) * frames[0].nbytes
+                self._write_record(RECORD_FRAMES, count, infos, frames)
+                self._frame_index.append(index)
+                batch.count = 0
+                self._free_batches.put(batch)
+            elif item[0] == RECORD_FFC:
+                frame_number, info, ffc_frame = item[1:]
+                payload_offset = self._file.tell() + RECORD_HEADER.size
+                self._ffc_index.append((frame_number, payload_offset + info.nbytes, payload_offset))
+                self._write_record(RECORD_FFC, frame_number, info, ffc_frame)
+
+
+class RawReader():
+    """Memory maps a recording for O(1) access to any frame."""
+    def __init__(self, path: str):
+        self.path = path
+        self.data = np.memmap(path, dtype=np.uint8, mode="r")
+        magic, version, width, height, info_size = RAW_HEADER.unpack_from(self.data, 0)
+        if magic != RAW_MAGIC:
+            raise ValueError(f"{path} is not a raw recording")
+        if info_size != FRAME_INFO_DTYPE.itemsize:
+            raise ValueError(f"{path} has an unsupported frame info record of {info_size} bytes")
+        self.version = version
+        self.frame_width = width
+        self.frame_height = height
+        self.frame_shape = (height, width)
+        self.frame_nbytes = width * height * 2
+        self.parameters: dict = {}
+        # one view per reference, consumers tell references apart by identity
+        self.ffc_frames: dict[int, np.ndarray] = {}
+
+        if not self._read_index():
+            self._scan_records()
+
+        self.frame_offsets = self.frame_index["frame_offset"].astype(np.intp)
+        self.info_offsets = self.frame_index["info_offset"].astype(np.intp)
+
+    def __len__(self):
+        return len(self.frame_index)
+
+    def _read_index(self):
+        if len(self.data) < RAW_HEADER.size + RAW_FOOTER.size:
+            return False
+        magic, index_offset, frame_count = RAW_FOOTER.unpack_from(self.data, len(self.data) - RAW_FOOTER.size)
+        if magic != RAW_FOOTER_MAGIC:
+            return False
+        tag, count, payload_size = RECORD_HEADER.unpack_from(self.data, index_offset)
+        payload_offset = index_offset + RECORD_HEADER.size
+        frame_index_size = frame_count * INDEX_DTYPE.itemsize
+        self.frame_index = np.frombuffer(self.data, INDEX_DTYPE, frame_count, payload_offset)
+        self.ffc_index = np.frombuffer(self.data, FFC_INDEX_DTYPE,
+                                       (payload_size - frame_index_size) // FFC_INDEX_DTYPE.itemsize,
+                                       payload_offset + frame_index_size)
+        self._read_parameters(RAW_HEADER.size, index_offset)
+        return True
+
+    def _read_parameters(self, start, end):
+        if end - start < RECORD_HEADER.size:
+            return
+        tag, count, payload_size = RECORD_HEADER.unpack_from(self.data, start)
+        if tag == RECORD_PARAMETERS:
+            payload_offset = start + RECORD_HEADER.size
+            self.parameters = json.loads(bytes(self.data[payload_offset:payload_offset + payload_size]))
+
+    def _scan_records(self):
+        frame_index = []
+        ffc_index = []
+        offset = RAW_HEADER.size
+        while offset + RECORD_HEADER.size <= len(self.data):
+            tag, count, payload_size = RECORD_HEADER.unpack_from(self.data, offset)
+            payload_offset = offset + RECORD_HEADER.size
+            if payload_offset + payload_size > len(self.data):
+                break # truncated record
+            if tag == RECORD_PARAMETERS:
+                self._read_parameters(offset, payload_offset + payload_size)
+            elif tag == RECORD_FRAMES:
+                index = np.empty(count, dtype=INDEX_DTYPE)
+                index["info_offset"] = payload_offset + np.arange(count) * FRAME_INFO_DTYPE.itemsize
+                index["frame_offset"] = payload_offset + count * FRAME_INFO_DTYPE.itemsize + np.arange(count) * self.frame_nbytes
+                frame_index.append(index)
+            elif tag == RECORD_FFC:
+                ffc_index.append((count, payload_offset + FRAME_INFO_DTYPE.itemsize, payload_offset))
+            elif tag == RECORD_INDEX:
+                break
+            offset = payload_offset + payload_size
+        self.frame_index = np.concatenate(frame_index) if frame_index else np.zeros(0, INDEX_DTYPE)
+        self.ffc_index = np.array(ffc_index, dtype=FFC_INDEX_DTYPE)
+
+    def frame(self, position: int) -> np.ndarray:
+        return np.ndarray(self.frame_shape, np.uint16, self.data, self.frame_offsets[position])
+
+    def frame_info(self, position: int):
+        return np.ndarray(1, FRAME_INFO_DTYPE, self.data, self.info_offsets[position])[0]
+
+    def frames(self, start: int, stop: int) -> np.ndarray:
+        """Returns a (stop - start, height, width) array, a view when the frames
+        are stored contiguously."""
+        offsets = self.frame_offsets[start:stop]
+        if len(offsets) == 0:
+            return np.zeros((0, *self.frame_shape), dtype=np.uint16)
+        if offsets[-1] - offsets[0] == (len(offsets) - 1) * self.frame_nbytes:
+            return np.ndarray((len(offsets), *self.frame_shape), np.uint16, self.data, offsets[0])
+        return np.stack([self.frame(position) for position in range(start, stop)])
+
+    def frame_infos(self) -> np.ndarray:
+        byte_offsets = self.info_offsets[:, None] + np.arange(FRAME_INFO_DTYPE.itemsize)
+        return self.data[byte_offsets].view(FRAME_INFO_DTYPE).reshape(-1)
+
+    def ffc_frame_for(self, position: int):
+        """Returns the FFC reference that was active when frame `position` was
+        recorded, or None."""
+        entry = np.searchsorted(self.ffc_index["frame_number"], position, side="right") - 1
+        if entry < 0:
+            return None
+        ffc_frame = self.ffc_frames.get(entry)
+        if ffc_frame is None:
+            frame_offset = int(self.ffc_index["frame_offset"][entry])
+            ffc_frame = self.ffc_frames[entry] = np.ndarray(self.frame_shape, np.float32, self.data, frame_offset)
+        return ffc_frame
+
+    def close(self):
+        self.frame_index = self.ffc_index = self.data = None
+        self.ffc_frames = {}
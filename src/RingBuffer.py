@@ -0,0 +1,38 @@
+import numpy as np
+
+class RingBuffer():
+    """A fixed-size ring of preallocated frames with a single writer.
+
+    Frames are copied into the next slot on `push`, so the writer never
+    allocates. Readers get views into the slots, which stay valid until the
+    writer wraps around to them again (`capacity - 1` pushes later)."""
+    def __init__(self, capacity: int, frame_shape: tuple, dtype=np.uint16, info_dtype=object):
+        self.capacity = capacity
+        self.frames = np.zeros((capacity, *frame_shape), dtype=dtype)
+        self.infos = np.zeros(capacity, dtype=info_dtype)
+        # total number of frames pushed, the newest frame lives at sequence - 1
+        self.sequence = 0
+
+    def push(self, frame: np.ndarray, info=None):
+        index = self.sequence % self.capacity
+        np.copyto(self.frames[index], frame, casting='unsafe')
+        self.infos[index] = info
+        self.sequence += 1
+
+    def latest(self):
+        sequence = self.sequence
+        if sequence == 0:
+            return None, None, 0
+        index = (sequence - 1) % self.capacity
+        return self.frames[index], self.infos[index], sequence
+
+    def get(self, sequence: int):
+        """Returns the frame pushed as number `sequence` (1-based), or None if
+        it was already overwritten or has not arrived yet."""
+        if sequence <= 0 or sequence > self.sequence or sequence <= self.sequence - self.capacity:
+            return None, None
+        index = (sequence - 1) % self.capacity
+        return self.frames[index], self.infos[index]
+
+    def clear(self):
+        self.sequence = 0
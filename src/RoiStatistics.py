@@ -0,0 +1,199 @@
+import time
+import cv2
+import numpy as np
+
+from src.Radiometry import RadiometricEngine
+
+# (x, y, width, height) in sensor pixels, before rotation and flipping
+ROI_DTYPE = np.dtype([
+    ("x", "<i4"),
+    ("y", "<i4"),
+    ("width", "<i4"),
+    ("height", "<i4"),
+])
+# one record per ROI and frame, temperatures are NaN without calibration
+ROI_STATISTICS_DTYPE = np.dtype([
+    ("roi", "<u2"),
+    ("mean", "<f4"),
+    ("std", "<f4"),
+    ("min", "<f4"),
+    ("max", "<f4"),
+    ("mean_celsius", "<f4"),
+    ("min_celsius", "<f4"),
+    ("max_celsius", "<f4"),
+])
+ROI_LOG_DTYPE = np.dtype([
+    ("frame", "<u8"),
+    ("timestamp", "<f8"), # seconds since the epoch
+    *[(name, ROI_STATISTICS_DTYPE[name]) for name in ROI_STATISTICS_DTYPE.names],
+])
+
+
+class RoiStatistics():
+    """Mean, standard deviation, minimum and maximum of many rectangular
+    ROIs per frame, at a constant cost per ROI.
+
+    Sums come from summed-area tables of the frame and of its squares, built
+    once per frame, four lookups per ROI. For minimum and maximum a ROI is
+    covered by four overlapping windows whose sides are the largest powers
+    of two that fit it, the entries of a 2D sparse table. Only the levels
+    the ROIs use are built, by doubling the window one axis at a time, and
+    levels are shared between ROI sizes within a frame.
+
+    Tables only pay off once the ROIs cover more than a frame between them:
+    below that, ROIs are reduced directly, all of them or those of a size
+    too rare to pay for its levels."""
+    def __init__(self):
+        self.rois = np.zeros(0, dtype=ROI_DTYPE)
+        self.frame_shape: tuple | None = None
+        self.results = np.zeros(0, dtype=ROI_STATISTICS_DTYPE)
+        # (kx, ky, ROI indices, window corners or None to reduce directly)
+        self.levels: list[tuple[int, int, np.ndarray, np.ndarray | None]] = []
+        self.window_levels: dict[tuple[int, int], tuple[np.ndarray, np.ndarray]] = {}
+
+    def __len__(self):
+        return len(self.rois)
+
+    def set_rois(self, rois):
+        """Takes an ROI_DTYPE array or a sequence of (x, y, width, height)."""
+        rois = np.asarray(rois)
+        if rois.dtype != ROI_DTYPE:
+            rois = np.array([tuple(roi) for roi in rois], dtype=ROI_DTYPE)
+        if np.any(rois["width"] <= 0) or np.any(rois["height"] <= 0):
+            raise ValueError("ROIs need a positive width and height")
+        self.rois = rois
+        self.frame_shape = None
+        self.results = np.zeros(len(rois), dtype=ROI_STATISTICS_DTYPE)
+        self.results["roi"] = np.arange(len(rois))
+
+    def prepare(self, frame_shape: tuple):
+        # clip the ROIs to the frame and precompute every lookup index
+        height, width = frame_shape
+        self.frame_shape = frame_shape
+        x1 = np.clip(self.rois["x"], 0, width - 1)
+        y1 = np.clip(self.rois["y"], 0, height - 1)
+        x2 = np.clip(self.rois["x"] + self.rois["width"], x1 + 1, width)
+        y2 = np.clip(self.rois["y"] + self.rois["height"], y1 + 1, height)
+        self.areas = ((x2 - x1) * (y2 - y1)).astype(np.float64)
+        self.bounds = np.stack([x1, y1, x2, y2], axis=1)
+        self.direct = self.areas.sum() < height * width
+
+        # corners in the (height + 1, width + 1) summed-area tables
+        stride = width + 1
+        self.sum_corners = (y2 * stride + x2, y1 * stride + x2, y2 * stride + x1, y1 * stride + x1)
+
+        level_x = np.floor(np.log2(x2 - x1)).astype(int)
+        level_y = np.floor(np.log2(y2 - y1)).astype(int)
+        self.levels = []
+        for kx, ky in sorted(set(zip(level_x.tolist(), level_y.tolist()))):
+            members = np.flatnonzero((level_x == kx) & (level_y == ky))
+            if self.areas[members].sum() < height * width:
+                self.levels.append((kx, ky, members, None))
+                continue
+            # the level holds the windows starting at every fitting position
+            window_x, window_y = 1 << kx, 1 << ky
+            stride = width - window_x + 1
+            left, top = x1[members], y1[members]
+            right, bottom = x2[members] - window_x, y2[members] - window_y
+            corners = np.stack([top * stride + left, top * stride + right,
+                                bottom * stride + left, bottom * stride + right])
+            self.levels.append((kx, ky, members, corners))
+
+    def window_level(self, frame: np.ndarray, kx: int, ky: int) -> tuple[np.ndarray, np.ndarray]:
+        """Minimum and maximum of the 2^kx by 2^ky windows at every position,
+        built from the narrower levels of this frame."""
+        level = self.window_levels.get((kx, ky))
+        if level is not None:
+            return level
+        if ky > 0:
+            minimum, maximum = self.window_level(frame, kx, ky - 1)
+            shift = 1 << (ky - 1)
+            level = cv2.min(minimum[:-shift], minimum[shift:]), cv2.max(maximum[:-shift], maximum[shift:])
+        elif kx > 0:
+            minimum, maximum = self.window_level(frame, kx - 1, 0)
+            shift = 1 << (kx - 1)
+            level = cv2.min(minimum[:, :-shift], minimum[:, shift:]), cv2.max(maximum[:, :-shift], maximum[:, shift:])
+        else:
+            level = frame, frame
+        self.window_levels[(kx, ky)] = level
+        return level
+
+    def compute(self, frame: np.ndarray, radiometry: RadiometricEngine | None = None,
+                fpa_temp_celsius: float | None = None) -> np.ndarray:
+        """Returns a ROI_STATISTICS_DTYPE record per ROI, in an array reused by
+        the next call."""
+        results = self.results
+        if len(self.rois) == 0:
+            return results
+        if frame.shape != self.frame_shape:
+            self.prepare(frame.shape)
+
+        if self.direct:
+            return self.compute_directly(frame, radiometry, fpa_temp_celsius)
+
+        sums, square_sums = cv2.integral2(frame, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+        sums, square_sums = sums.ravel(), square_sums.ravel()
+        a, b, c, d = self.sum_corners
+        mean = (sums[a] - sums[b] - sums[c] + sums[d]) / self.areas
+        mean_square = (square_sums[a] - square_sums[b] - square_sums[c] + square_sums[d]) / self.areas
+        results["mean"] = mean
+        results["std"] = np.sqrt(np.maximum(mean_square - mean * mean, 0))
+
+        self.window_levels = {}
+        minimums, maximums = results["min"], results["max"]
+        for kx, ky, members, corners in self.levels:
+            if corners is None:
+                for index in members:
+                    x1, y1, x2, y2 = self.bounds[index]
+                    minimums[index], maximums[index], _, _ = cv2.minMaxLoc(frame[y1:y2, x1:x2])
+                continue
+            minimum, maximum = self.window_level(frame, kx, ky)
+            minimums[members] = minimum.ravel()[corners].min(axis=0)
+            maximums[members] = maximum.ravel()[corners].max(axis=0)
+        self.window_levels = {}
+        return self.convert(radiometry, fpa_temp_celsius)
+
+    def compute_directly(self, frame: np.ndarray, radiometry: RadiometricEngine | None,
+                         fpa_temp_celsius: float | None) -> np.ndarray:
+        results = self.results
+        for index, (x1, y1, x2, y2) in enumerate(self.bounds):
+            area = frame[y1:y2, x1:x2]
+            mean, std = cv2.meanStdDev(area)
+            minimum, maximum, _, _ = cv2.minMaxLoc(area)
+            results[index] = (index, mean[0, 0], std[0, 0], minimum, maximum, 0, 0, 0)
+        return self.convert(radiometry, fpa_temp_celsius)
+
+    def convert(self, radiometry: RadiometricEngine | None, fpa_temp_celsius: float | None) -> np.ndarray:
+        results = self.results
+        if radiometry is not None and fpa_temp_celsius is not None:
+            results["mean_celsius"] = radiometry.temperatures(results["mean"], fpa_temp_celsius)
+            results["min_celsius"] = radiometry.temperatures(results["min"], fpa_temp_celsius)
+            results["max_celsius"] = radiometry.temperatures(results["max"], fpa_temp_celsius)
+        else:
+            results["mean_celsius"] = results["min_celsius"] = results["max_celsius"] = np.nan
+        return results
+
+
+class RoiLog():
+    """Appends ROI statistics to a flat binary file of ROI_LOG_DTYPE
+    records, read back with `read_roi_log`."""
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, "wb")
+        self.records = np.zeros(0, dtype=ROI_LOG_DTYPE)
+
+    def write(self, frame_number: int, results: np.ndarray, timestamp: float | None = None):
+        if len(self.records) != len(results):
+            self.records = np.zeros(len(results), dtype=ROI_LOG_DTYPE)
+        self.records["frame"] = frame_number
+        self.records["timestamp"] = time.time() if timestamp is None else timestamp
+        for name in ROI_STATISTICS_DTYPE.names:
+            self.records[name] = results[name]
+        self.file.write(self.records.tobytes())
+
+    def close(self):
+        self.file.close()
+
+
+def read_roi_log(path: str) -> np.ndarray:
+    return np.fromfile(path, dtype=ROI_LOG_DTYPE)
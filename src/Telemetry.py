@@ -0,0 +1,176 @@
+import csv
+import logging
+import threading
+import time
+import numpy as np
+
+DEFAULT_WINDOW = 1024 # samples kept per stage
+RATE_WINDOW = 128 # events kept per rate meter
+SINK_INTERVAL = 1.0
+
+logger = logging.getLogger(__name__)
+
+
+class RollingHistogram():
+    """Keeps the last `window` samples of a stage duration, in seconds."""
+    def __init__(self, window=DEFAULT_WINDOW):
+        self.samples = np.zeros(window, dtype=np.float64)
+        self.count = 0
+
+    def add(self, value: float):
+        self.samples[self.count % len(self.samples)] = value
+        self.count += 1
+
+    def values(self) -> np.ndarray:
+        return self.samples[:min(self.count, len(self.samples))]
+
+    def percentiles(self, percentiles=(50, 95, 99)):
+        values = self.values()
+        if len(values) == 0:
+            return [0.0] * len(percentiles)
+        return np.percentile(values, percentiles).tolist()
+
+
+class RateMeter():
+    """Measures how often `tick` is called over its last `window` calls."""
+    def __init__(self, window=RATE_WINDOW):
+        self.timestamps = np.zeros(window, dtype=np.float64)
+        self.count = 0
+
+    def tick(self, timestamp: float | None = None):
+        self.timestamps[self.count % len(self.timestamps)] = time.monotonic() if timestamp is None else timestamp
+        self.count += 1
+
+    def rate(self) -> float:
+        samples = min(self.count, len(self.timestamps))
+        if samples < 2:
+            return 0.0
+        newest = self.timestamps[(self.count - 1) % len(self.timestamps)]
+        oldest = self.timestamps[(self.count - samples) % len(self.timestamps)]
+        # a meter that stopped ticking reads as zero instead of its last rate
+        if time.monotonic() - newest > 2 * (newest - oldest) / (samples - 1) + 1:
+            return 0.0
+        return (samples - 1) / max(newest - oldest, 1e-9)
+
+
+class Telemetry():
+    """Hot-path instrumentation.
+
+    Stages are timed with `started = telemetry.start()` and
+    `telemetry.stop("stage", started)`. When disabled `start` returns 0 and
+    `stop` returns right away, so instrumented code pays two calls per stage."""
+    def __init__(self, enabled=False, window=DEFAULT_WINDOW):
+        self.enabled = enabled
+        self.window = window
+        self.stages: dict[str, RollingHistogram] = {}
+        self.rates: dict[str, RateMeter] = {}
+        self.values: dict[str, float] = {}
+
+    def start(self) -> int:
+        return time.perf_counter_ns() if self.enabled else 0
+
+    def stop(self, stage: str, started: int):
+        if not started:
+            return
+        self.record(stage, (time.perf_counter_ns() - started) / 1e9)
+
+    def record(self, stage: str, seconds: float):
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            histogram = self.stages[stage] = RollingHistogram(self.window)
+        histogram.add(seconds)
+
+    def tick(self, rate: str):
+        if not self.enabled:
+            return
+        meter = self.rates.get(rate)
+        if meter is None:
+            meter = self.rates[rate] = RateMeter()
+        meter.tick()
+
+    def set_value(self, name: str, value: float):
+        if self.enabled:
+            self.values[name] = value
+
+    def reset(self):
+        self.stages = {}
+        self.rates = {}
+        self.values = {}
+
+    def snapshot(self) -> dict:
+        """Returns a flat dictionary: `<rate>_fps`, the plain values, and
+        `<stage>_p50_ms`, `_p95_ms`, `_p99_ms` for each timed stage."""
+        snapshot = {"time": time.time()}
+        for name, meter in list(self.rates.items()):
+            snapshot[f"{name}_fps"] = meter.rate()
+        snapshot.update(self.values)
+        for name, histogram in list(self.stages.items()):
+            p50, p95, p99 = histogram.percentiles()
+            snapshot[f"{name}_p50_ms"] = p50 * 1000
+            snapshot[f"{name}_p95_ms"] = p95 * 1000
+            snapshot[f"{name}_p99_ms"] = p99 * 1000
+        return snapshot
+
+    def summary(self, stages=None) -> str:
+        """A one line summary for status bars."""
+        snapshot = self.snapshot()
+        parts = []
+        if "acquired_fps" in snapshot:
+            parts.append(f"{snapshot['acquired_fps']:.1f}/{snapshot.get('target_fps', 0):.0f} fps")
+        if "displayed_fps" in snapshot:
+            parts.append(f"shown {snapshot['displayed_fps']:.1f} fps")
+        parts.append(f"dropped {snapshot.get('frames_dropped', 0):.0f}")
+        parts.append(f"int_drop {snapshot.get('int_drop', 0):.0f}")
+        if "ffc_stall" in self.stages:
+            parts.append(f"FFC {snapshot['ffc_stall_p50_ms']:.0f} ms")
+        for stage in stages if stages is not None else self.stages:
+            if f"{stage}_p50_ms" in snapshot:
+                parts.append(f"{stage} {snapshot[f'{stage}_p50_ms']:.2f}/{snapshot[f'{stage}_p99_ms']:.2f} ms")
+        return " | ".join(parts)
+
+
+# one row per snapshot key, stages appearing later add rows, not columns
+TELEMETRY_CSV_FIELDS = ["time", "key", "value"]
+
+
+class TelemetrySink():
+    """Periodically writes snapshots to a CSV file, or to the log when no path
+    is given. The CSV is in long format, a `time, key, value` row for every
+    key of a snapshot. Log lines start with `name`, if given."""
+    def __init__(self, telemetry: Telemetry, path: str | None = None, interval=SINK_INTERVAL, name=None):
+        self.telemetry = telemetry
+        self.path = path
+        self.name = name
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="TelemetrySink", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        csv_file = open(self.path, "w", newline="") if self.path else None
+        try:
+            if csv_file is not None:
+                writer = csv.writer(csv_file)
+                writer.writerow(TELEMETRY_CSV_FIELDS)
+            while not self._stop.wait(self.interval):
+                if csv_file is None:
+                    summary = self.telemetry.summary()
+                    logger.info(summary if self.name is None else f"{self.name}: {summary}")
+                    continue
+                snapshot = self.telemetry.snapshot()
+                timestamp = snapshot.pop("time")
+                writer.writerows((timestamp, key, value) for key, value in snapshot.items())
+                csv_file.flush()
+        finally:
+            if csv_file is not None:
+                csv_file.close()
+
+
+TELEMETRY = Telemetry()
@@ -0,0 +1,57 @@
+import numpy as np
+
+DEFAULT_STRENGTH = 0.8
+DEFAULT_MOTION_THRESHOLD = 60.0 # counts, about three times the MAG-160 temporal noise
+
+
+class TemporalDenoiser():
+    """Recursive temporal filter with motion-adaptive per-pixel weights.
+
+    Every pixel moves toward the new frame by `alpha`, which is
+    `1 - strength` while its change stays within `motion_threshold` and
+    ramps up to 1 at twice the threshold, so moving objects don't leave
+    trails. The state and scratch buffers are allocated once per frame size,
+    a frame costs a handful of in-place passes over the pixels."""
+    def __init__(self, strength=DEFAULT_STRENGTH, motion_threshold=DEFAULT_MOTION_THRESHOLD):
+        self.strength = strength
+        self.motion_threshold = motion_threshold
+        self.state: np.ndarray | None = None
+        self.difference: np.ndarray | None = None
+        self.weights: np.ndarray | None = None
+        self.initialized = False
+
+    def reset(self):
+        """Forgets the history, the next frame starts a new average."""
+        self.initialized = False
+
+    def configure(self, strength: float, motion_threshold: float):
+        if (strength, motion_threshold) != (self.strength, self.motion_threshold):
+            self.strength = strength
+            self.motion_threshold = motion_threshold
+            self.reset()
+
+    def denoise(self, frame: np.ndarray) -> np.ndarray:
+        """Filters a float32 frame in place and returns it."""
+        if self.state is None or self.state.shape != frame.shape:
+            self.state = np.empty(frame.shape, dtype=np.float32)
+            self.difference = np.empty(frame.shape, dtype=np.float32)
+            self.weights = np.empty(frame.shape, dtype=np.float32)
+            self.initialized = False
+        if not self.initialized:
+            np.copyto(self.state, frame)
+            self.initialized = True
+            return frame
+
+        # alpha = clip(slope * |change| + offset, minimum_alpha, 1), which is
+        # minimum_alpha at the threshold and 1 at twice the threshold
+        minimum_alpha = 1 - self.strength
+        slope = self.strength / max(self.motion_threshold, 1e-6)
+        np.subtract(frame, self.state, out=self.difference)
+        np.abs(self.difference, out=self.weights)
+        self.weights *= slope
+        self.weights += 2 * minimum_alpha - 1
+        np.clip(self.weights, minimum_alpha, 1, out=self.weights)
+        self.difference *= self.weights
+        self.state += self.difference
+        np.copyto(frame, self.state)
+        return frame
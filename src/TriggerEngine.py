@@ -0,0 +1,320 @@
+"""Event-triggered raw recording.
+
+The engine keeps the last seconds of raw frames in a preallocated ring buffer
+and evaluates its triggers on every frame. When one fires, the frames in the
+ring are written to a new raw recording followed by the frames up to the end
+of the post-trigger window, which a trigger firing again extends. Nothing is
+written between events.
+
+Triggers see the FFC corrected frame downsampled with bilinear sampling,
+which averages 2x2 of every 4x4 block at the default factor, at a seventh of
+the cost of area averaging. Evaluating them costs a small fraction of
+rendering the frame.
+"""
+import math
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+import cv2
+import numpy as np
+
+from src.Radiometry import RadiometricEngine
+from src.RawRecording import RawRecorder, RAW_EXTENSION
+from src.RingBuffer import RingBuffer
+from src.Telemetry import TELEMETRY
+from src.drivers.frame_info import FRAME_INFO_DTYPE
+
+DEFAULT_PRE_TRIGGER_SECONDS = 5.0
+DEFAULT_POST_TRIGGER_SECONDS = 5.0
+DEFAULT_DOWNSAMPLE = 4 # sensor pixels per side of a downsampled pixel
+DEFAULT_MOTION_THRESHOLD = 40.0 # counts of change against the background
+DEFAULT_MOTION_FRACTION = 0.01 # of the downsampled pixels
+DEFAULT_MOTION_LEARNING_RATE = 0.05 # weight of the newest frame in the background
+DOWNSAMPLE_INTERPOLATION = cv2.INTER_LINEAR
+
+
+class Trigger(ABC):
+    """Decides from each downsampled frame whether an event happens.
+
+    `evaluate` gets the corrected frame downsampled `scale` times and
+    returns True to start or extend an event. `reset` is called when the
+    FFC reference changes and frames are no longer comparable."""
+    name = "trigger"
+
+    def reset(self):
+        pass
+
+    @abstractmethod
+    def evaluate(self, frame: np.ndarray, scale: int, radiometry: RadiometricEngine | None,
+                 fpa_temp_celsius: float) -> bool:
+        pass
+
+
+class MotionTrigger(Trigger):
+    """Fires when enough pixels differ from a running average of the
+    previous frames, which follows slow drift of the scene but not objects
+    moving through it."""
+    name = "motion"
+
+    def __init__(self, threshold=DEFAULT_MOTION_THRESHOLD, fraction=DEFAULT_MOTION_FRACTION,
+                 learning_rate=DEFAULT_MOTION_LEARNING_RATE):
+        self.threshold = threshold
+        self.fraction = fraction
+        self.learning_rate = learning_rate
+        self.background: np.ndarray | None = None
+        self.difference: np.ndarray | None = None
+
+    def reset(self):
+        self.background = None
+
+    def evaluate(self, frame, scale, radiometry, fpa_temp_celsius):
+        if self.background is None or self.background.shape != frame.shape:
+            self.background = frame.copy()
+            self.difference = np.empty_like(frame)
+            return False
+        cv2.absdiff(frame, self.background, self.difference)
+        cv2.accumulateWeighted(frame, self.background, self.learning_rate)
+        changed = np.count_nonzero(self.difference > self.threshold)
+        return changed > self.fraction * frame.size
+
+
+class TemperatureTrigger(Trigger):
+    """Fires when the hottest downsampled pixel of an ROI is above a
+    temperature, or the coldest one below it. The temperature is turned into
+    counts once per FPA temperature bucket instead of converting the ROI.
+    Spots smaller than a downsampled pixel are averaged with their
+    surroundings."""
+    name = "temperature"
+
+    def __init__(self, threshold_celsius: float, roi: tuple[int, int, int, int] | None = None, above=True):
+        self.threshold_celsius = threshold_celsius
+        # (x, y, width, height) in sensor pixels, None for the whole frame
+        self.roi = roi
+        self.above = above
+        # (radiometry, FPA bucket, counts) of the last threshold
+        self.threshold_counts: tuple | None = None
+
+    def evaluate(self, frame, scale, radiometry, fpa_temp_celsius):
+        if radiometry is None or fpa_temp_celsius is None:
+            return False
+        if self.roi is not None:
+            x, y, width, height = self.roi
+            frame = frame[y // scale:max(y // scale + 1, (y + height) // scale),
+                          x // scale:max(x // scale + 1, (x + width) // scale)]
+            if frame.size == 0:
+                return False
+        bucket = radiometry.bucket(fpa_temp_celsius)
+        if self.threshold_counts is None or self.threshold_counts[:2] != (radiometry, bucket):
+            self.threshold_counts = radiometry, bucket, radiometry.counts_for(self.threshold_celsius, fpa_temp_celsius)
+        counts = self.threshold_counts[2]
+        minimum, maximum, _, _ = cv2.minMaxLoc(frame)
+        return maximum > counts if self.above else minimum < counts
+
+
+class ExternalTrigger(Trigger):
+    """Fires on the next frame after `fire`, which any thread may call."""
+    name = "external"
+
+    def __init__(self):
+        self.fired = threading.Event()
+
+    def fire(self):
+        self.fired.set()
+
+    def evaluate(self, frame, scale, radiometry, fpa_temp_celsius):
+        if not self.fired.is_set():
+            return False
+        self.fired.clear()
+        return True
+
+
+class TriggerEvent():
+    """A recorded event: the file, the trigger that started it and the
+    number of frames written so far."""
+    def __init__(self, path: str, trigger: str, sequence: int):
+        self.path = path
+        self.trigger = trigger
+        # the frame that fired, as counted by the engine
+        self.sequence = sequence
+        self.pre_trigger_frames = 0
+        self.frame_count = 0
+        self.retriggers = 0
+
+
+class TriggerEngine():
+    """Writes raw recordings of the frames around trigger events.
+
+    `on_frame` is meant to be called from a frame sink in the acquisition
+    thread with the FFC reference in use. Event files are named
+    `{path_prefix}_event{number}.irraw`."""
+    def __init__(self, path_prefix: str, frame_shape: tuple, framerate: float,
+                 pre_trigger_seconds=DEFAULT_PRE_TRIGGER_SECONDS, post_trigger_seconds=DEFAULT_POST_TRIGGER_SECONDS,
+                 downsample=DEFAULT_DOWNSAMPLE, parameters: dict | None = None, triggers=()):
+        self.path_prefix = path_prefix
+        self.frame_shape = tuple(frame_shape[:2])
+        self.parameters = parameters
+        self.pre_trigger_frames = max(0, int(math.ceil(pre_trigger_seconds * framerate)))
+        self.post_trigger_frames = max(1, int(math.ceil(post_trigger_seconds * framerate)))
+        self.telemetry = TELEMETRY
+        self.radiometry: RadiometricEngine | None = None
+
+        # the pre-trigger frames and the frame that fires
+        self.ring_buffer = RingBuffer(self.pre_trigger_frames + 1, self.frame_shape, np.uint16, FRAME_INFO_DTYPE)
+        # (first sequence, reference, frame info) of the references in use
+        # by the frames in the ring, oldest first
+        self.ffc_references: deque[tuple[int, np.ndarray, np.ndarray]] = deque()
+
+        height, width = self.frame_shape
+        self.downsample = downsample
+        self.small_size = (max(1, width // downsample), max(1, height // downsample))
+        self.small_raw: np.ndarray | None = None
+        self.small_reference = np.empty(self.small_size[::-1], dtype=np.float32)
+        self.small_frame = np.empty(self.small_size[::-1], dtype=np.float32)
+        self.reference: np.ndarray | None = None
+
+        self.external = ExternalTrigger()
+        self.triggers: list[Trigger] = [self.external, *triggers]
+
+        self.recorder: RawRecorder | None = None
+        self.recorded_ffc_frame: np.ndarray | None = None
+        self.frames_remaining = 0
+        self.events: list[TriggerEvent] = []
+        self.frames_evaluated = 0
+
+        self._lock = threading.Lock()
+        self._closing: list[threading.Thread] = []
+        self._closed = False
+
+    def add_trigger(self, trigger: Trigger):
+        self.triggers = [*self.triggers, trigger]
+
+    def remove_trigger(self, trigger: Trigger):
+        self.triggers = [t for t in self.triggers if t is not trigger]
+
+    def fire(self):
+        """Starts or extends an event from outside the pipeline."""
+        self.external.fire()
+
+    @property
+    def recording_event(self):
+        return self.recorder is not None
+
+    def downsample_frame(self, frame: np.ndarray, ffc_frame: np.ndarray) -> np.ndarray:
+        """The FFC corrected frame, downsampled `downsample` times. The
+        reference is sampled like the frames so fixed pattern offsets
+        cancel."""
+        if ffc_frame is not self.reference:
+            self.reference = ffc_frame
+            cv2.resize(np.asarray(ffc_frame, dtype=np.float32), self.small_size, self.small_reference,
+                       interpolation=DOWNSAMPLE_INTERPOLATION)
+            # corrected frames keep the mean level of the reference
+            self.small_reference -= np.float32(np.mean(ffc_frame))
+            for trigger in self.triggers:
+                trigger.reset()
+        self.small_raw = cv2.resize(frame, self.small_size, self.small_raw, interpolation=DOWNSAMPLE_INTERPOLATION)
+        np.subtract(self.small_raw, self.small_reference, out=self.small_frame, dtype=np.float32)
+        return self.small_frame
+
+    def evaluate(self, frame: np.ndarray, frame_info, ffc_frame: np.ndarray | None, performing_ffc=False) -> str | None:
+        """The name of the first trigger that fires on the frame, or None.
+        Every trigger sees every frame, so their state stays current. Only
+        the external trigger is evaluated during FFC, when the shutter
+        covers the scene."""
+        if performing_ffc or ffc_frame is None:
+            return self.external.name if self.external.evaluate(None, self.downsample, None, None) else None
+        small_frame = self.downsample_frame(frame, ffc_frame)
+        fpa_temp_celsius = float(frame_info["fpa_temp_celsius"])
+        fired = None
+        for trigger in self.triggers:
+            if trigger.evaluate(small_frame, self.downsample, self.radiometry, fpa_temp_celsius) and fired is None:
+                fired = trigger.name
+        self.frames_evaluated += 1
+        return fired
+
+    def on_frame(self, frame: np.ndarray, frame_info, ffc_frame: np.ndarray | None, performing_ffc=False):
+        with self._lock:
+            if self._closed:
+                return
+            started = self.telemetry.start()
+            ring_buffer = self.ring_buffer
+            ring_buffer.push(frame, frame_info)
+            self.track_ffc_reference(ring_buffer.sequence, ffc_frame, frame_info)
+            fired = self.evaluate(frame, frame_info, ffc_frame, performing_ffc)
+            self.telemetry.stop("trigger", started)
+
+            if self.recorder is None:
+                if fired is not None:
+                    self.start_event(fired)
+                return
+            started = self.telemetry.start()
+            self.record(frame, frame_info)
+            event = self.events[-1]
+            if fired is not None:
+                self.frames_remaining = self.post_trigger_frames
+                event.retriggers += 1
+            else:
+                self.frames_remaining -= 1
+                if self.frames_remaining <= 0:
+                    self.end_event()
+            self.telemetry.stop("record", started)
+
+    def track_ffc_reference(self, sequence: int, ffc_frame: np.ndarray | None, frame_info):
+        references = self.ffc_references
+        if ffc_frame is not None and (not references or references[-1][1] is not ffc_frame):
+            info = np.zeros((), dtype=FRAME_INFO_DTYPE)
+            info[()] = frame_info
+            references.append((sequence, ffc_frame, info))
+        # keep the reference of the oldest frame in the ring
+        oldest = sequence - self.ring_buffer.capacity + 1
+        while len(references) > 1 and references[1][0] <= oldest:
+            references.popleft()
+
+    def record(self, frame: np.ndarray, frame_info, sequence: int | None = None):
+        # adds the reference first when the frame was corrected with a new one
+        reference = None
+        for first_sequence, ffc_frame, info in self.ffc_references:
+            if sequence is not None and first_sequence > sequence:
+                break
+            reference = ffc_frame, info
+        if reference is not None and reference[0] is not self.recorded_ffc_frame:
+            self.recorded_ffc_frame = reference[0]
+            self.recorder.add_ffc_frame(*reference)
+        self.recorder.append(frame, frame_info)
+        self.events[-1].frame_count += 1
+
+    def start_event(self, trigger: str):
+        ring_buffer = self.ring_buffer
+        path = f"{self.path_prefix}_event{len(self.events) + 1}{RAW_EXTENSION}"
+        height, width = self.frame_shape
+        self.recorder = RawRecorder(path, width, height, self.parameters)
+        self.recorded_ffc_frame = None
+        event = TriggerEvent(path, trigger, ring_buffer.sequence)
+        self.events.append(event)
+
+        first = max(1, ring_buffer.sequence - ring_buffer.capacity + 1)
+        for sequence in range(first, ring_buffer.sequence + 1):
+            frame, frame_info = ring_buffer.get(sequence)
+            self.record(frame, frame_info, sequence)
+        event.pre_trigger_frames = event.frame_count - 1
+        self.frames_remaining = self.post_trigger_frames
+
+    def end_event(self):
+        # the index is written by another thread, acquisition doesn't wait
+        recorder, self.recorder = self.recorder, None
+        self.recorded_ffc_frame = None
+        self.frames_remaining = 0
+        self._closing = [thread for thread in self._closing if thread.is_alive()]
+        thread = threading.Thread(target=recorder.close, name="TriggerEventClose", daemon=True)
+        thread.start()
+        self._closing.append(thread)
+
+    def close(self):
+        """Ends the event in progress and waits until every event file is
+        complete."""
+        with self._lock:
+            self._closed = True
+            if self.recorder is not None:
+                self.end_event()
+        for thread in self._closing:
+            thread.join()
+        self._closing = []
@@ -0,0 +1,148 @@
+import logging
+import threading
+from collections import deque
+import cv2
+import numpy as np
+
+BACKPRESSURE_BLOCK = "block" # wait for the encoder, stalls the caller
+BACKPRESSURE_DROP_OLDEST = "drop_oldest" # replace the oldest queued frame
+BACKPRESSURE_DROP_NEWEST = "drop_newest" # discard the submitted frame
+
+# codec fourcc -> container extension
+VIDEO_CODECS = {
+    "XVID": ".avi",
+    "MJPG": ".avi",
+    "mp4v": ".mp4",
+    "avc1": ".mp4",
+}
+
+DEFAULT_QUEUE_SIZE = 32
+
+logger = logging.getLogger(__name__)
+
+
+class VideoEncoder():
+    """Encodes frames to a video file on a background thread.
+
+    `submit` copies the frame into a preallocated buffer and returns right
+    away; scaling and encoding happen on the worker. When the bounded queue
+    is full the backpressure policy decides what happens. Once closing, or
+    after the worker failed with `error`, frames are refused."""
+    def __init__(self, path: str, framerate: float, frame_size: tuple, codec="XVID", scale=1.0,
+                 queue_size=DEFAULT_QUEUE_SIZE, backpressure=BACKPRESSURE_DROP_OLDEST,
+                 interpolation=cv2.INTER_CUBIC):
+        width, height = frame_size
+        self.path = path
+        self.frame_size = (width, height)
+        self.output_size = (int(round(width * scale)), int(round(height * scale)))
+        self.interpolation = interpolation
+        self.queue_size = queue_size
+        self.backpressure = backpressure
+
+        self.frames_queued = 0
+        self.frames_dropped = 0
+        self.frames_encoded = 0
+        self.error: Exception | None = None
+
+        self.video_writer = cv2.VideoWriter(path, cv2.VideoWriter.fourcc(*codec), framerate, self.output_size)
+        if not self.video_writer.isOpened():
+            raise RuntimeError(f"Could not open {path} for writing with codec {codec}")
+
+        # one buffer more than the queue holds, for the frame being encoded
+        self._free_buffers = [np.empty((height, width, 3), dtype=np.uint8) for _ in range(queue_size + 1)]
+        self._queue: deque[np.ndarray] = deque()
+        self._condition = threading.Condition()
+        self._closing = False
+        self._worker = threading.Thread(target=self._encode_loop, name="VideoEncoder", daemon=True)
+        self._worker.start()
+
+    @property
+    def queue_depth(self):
+        return len(self._queue)
+
+    def submit(self, frame: np.ndarray) -> bool:
+        """Queues a copy of a BGR frame, returns False if it was dropped."""
+        with self._condition:
+            if self._closing:
+                return False
+            if len(self._queue) >= self.queue_size:
+                if self.backpressure == BACKPRESSURE_DROP_NEWEST:
+                    self.frames_dropped += 1
+                    return False
+                if self.backpressure == BACKPRESSURE_DROP_OLDEST:
+                    self._free_buffers.append(self._queue.popleft())
+                    self.frames_dropped += 1
+            while not self._closing and (len(self._queue) >= self.queue_size or not self._free_buffers):
+                self._condition.wait()
+            if self._closing:
+                # closed while waiting, the worker may already be gone
+                self.frames_dropped += 1
+                return False
+            buffer = self._free_buffers.pop()
+
+        if frame.shape[:2] != buffer.shape[:2]:
+            cv2.resize(frame, self.frame_size, buffer, interpolation=cv2.INTER_NEAREST)
+        else:
+            np.copyto(buffer, frame)
+
+        with self._condition:
+            if self._closing:
+                self._free_buffers.append(buffer)
+                self.frames_dropped += 1
+                return False
+            self._queue.append(buffer)
+            self.frames_queued += 1
+            self._condition.notify_all()
+        return True
+
+    def close(self, drain=True):
+        """Stops the worker and finalizes the file. With `drain` every queued
+        frame is encoded first, otherwise they are dropped."""
+        with self._condition:
+            if self._closing:
+                return
+            self._closing = True
+            if not drain:
+                self.frames_dropped += len(self._queue)
+                self._free_buffers.extend(self._queue)
+                self._queue.clear()
+            self._condition.notify_all()
+        self._worker.join()
+        self.video_writer.release()
+
+    def _encode_loop(self):
+        try:
+            self._encode_frames()
+        except Exception as error:
+            # refuse further frames and release the submitters waiting for room
+            logger.error("Encoding %s failed: %s", self.path, error)
+            with self._condition:
+                self.error = error
+                self._closing = True
+                self.frames_dropped += len(self._queue)
+                self._free_buffers.extend(self._queue)
+                self._queue.clear()
+                self._condition.notify_all()
+
+    def _encode_frames(self):
+        scaled_frame = None
+        if self.output_size != self.frame_size:
+            scaled_frame = np.empty((self.output_size[1], self.output_size[0], 3), dtype=np.uint8)
+        while True:
+            with self._condition:
+                while not self._queue and not self._closing:
+                    self._condition.wait()
+                if not self._queue:
+                    return
+                buffer = self._queue.popleft()
+
+            if scaled_frame is not None:
+                cv2.resize(buffer, self.output_size, scaled_frame, interpolation=self.interpolation)
+                self.video_writer.write(scaled_frame)
+            else:
+                self.video_writer.write(buffer)
+
+            with self._condition:
+                self._free_buffers.append(buffer)
+                self.frames_encoded += 1
+                self._condition.notify_all()
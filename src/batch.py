@@ -0,0 +1,294 @@
+"""Processes captures without the GUI.
+
+Reads a raw recording (`.irraw`), a `.npy` capture or a sequence of 16-bit
+images, runs the Compositor stages on every frame across a pool of worker
+processes and writes a PNG sequence or a video:
+
+    python -m src.batch capture.irraw --output frames/
+    python -m src.batch capture.irraw --output capture.avi --palette COLORMAP_JET
+
+Frames are handed out in ordered chunks. Stages that keep state between
+frames, the temporal denoiser and the span smoothing, are primed on the
+frames before each chunk. By default the priming is long enough for the
+state a chunk starts from to fade below `WARMUP_RESIDUAL`, so chunked output
+matches a sequential run.
+"""
+import argparse
+import glob
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+import cv2
+import numpy as np
+
+from src.Calibrator import Calibrator
+from src.Compositor import Compositor
+from src.Palette import load_palette_file
+from src.Radiometry import load_calibration_model
+from src.RawRecording import RawReader, RAW_EXTENSION
+from src.VideoEncoder import VideoEncoder, VIDEO_CODECS, BACKPRESSURE_BLOCK
+from src.settings import GeneralSettings, COLORMAPS, AGC_MODES
+
+IMAGE_EXTENSIONS = (".png", ".tif", ".tiff", ".pgm")
+DEFAULT_CHUNK_SIZE = 64
+WARMUP_RESIDUAL = 2**-12 # of the initial state left in the stateful stages after priming
+DEFAULT_FRAMERATE = 25
+
+
+class NpySource():
+    """A capture saved as `.npy` arrays, see `ReplayCamera.save_capture`."""
+    def __init__(self, path: str):
+        stem = path[:-len(".npy")]
+        self.frames = np.load(path, mmap_mode="r")
+        ffc_path = stem + ".ffc.npy"
+        self.ffc_frame = np.load(ffc_path) if os.path.exists(ffc_path) else None
+        self.parameters = {}
+
+    def __len__(self):
+        return len(self.frames)
+
+    def frame(self, position: int) -> np.ndarray:
+        return self.frames[position]
+
+    def ffc_frame_for(self, position: int):
+        return self.ffc_frame
+
+    def frame_info(self, position: int):
+        return None
+
+
+class ImageSequenceSource():
+    """A directory or glob pattern of single channel 16-bit images."""
+    def __init__(self, path: str):
+        if os.path.isdir(path):
+            paths = [os.path.join(path, name) for name in os.listdir(path)]
+        else:
+            paths = glob.glob(path)
+        self.paths = sorted(p for p in paths if p.lower().endswith(IMAGE_EXTENSIONS))
+        if not self.paths:
+            raise ValueError(f"No images found in {path}")
+        self.parameters = {}
+
+    def __len__(self):
+        return len(self.paths)
+
+    def frame(self, position: int) -> np.ndarray:
+        frame = cv2.imread(self.paths[position], cv2.IMREAD_UNCHANGED)
+        if frame is None:
+            raise ValueError(f"Could not read {self.paths[position]}")
+        if frame.ndim == 3:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return frame
+
+    def ffc_frame_for(self, position: int):
+        return None
+
+    def frame_info(self, position: int):
+        return None
+
+
+def open_source(path: str):
+    if path.endswith(RAW_EXTENSION):
+        return RawReader(path)
+    if path.endswith(".npy"):
+        return NpySource(path)
+    return ImageSequenceSource(path)
+
+
+def read_mask(path: str) -> np.ndarray:
+    mask = np.load(path) if path.endswith(".npy") else cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    if mask is None:
+        raise ValueError(f"Could not read {path}")
+    return (mask > 0).astype(np.uint8)
+
+
+# Worker processes
+
+_worker = {}
+
+
+def init_worker(source_path: str, settings: GeneralSettings, blind_pixel_mask_path: str | None,
+                palette_path: str | None, ffc_path: str | None, calibration_path: str | None = None):
+    if palette_path is not None:
+        load_palette_file(palette_path, settings.color_palette)
+    calibrator = Calibrator()
+    if blind_pixel_mask_path is not None:
+        calibrator.set_blind_pixel_mask(read_mask(blind_pixel_mask_path))
+    compositor = Compositor()
+    compositor.settings = settings
+    compositor.calibrator = calibrator
+    if calibration_path is not None:
+        compositor.set_calibration_model(load_calibration_model(calibration_path))
+    _worker["compositor"] = compositor
+    _worker["source"] = open_source(source_path)
+    _worker["ffc_frame"] = np.load(ffc_path).astype(np.float32) if ffc_path is not None else None
+
+
+def process_chunk(start: int, stop: int, warmup: int, output_directory: str | None):
+    """Renders frames `start` to `stop`, after priming the stateful stages on
+    up to `warmup` frames before them. Writes PNGs when given a directory,
+    otherwise returns the frames."""
+    compositor: Compositor = _worker["compositor"]
+    source = _worker["source"]
+    compositor.temporal_denoiser.reset()
+    compositor.auto_gain.reset()
+
+    frames = []
+    for position in range(max(0, start - warmup), stop):
+        raw_frame = source.frame(position)
+        ffc_frame = _worker["ffc_frame"]
+        if ffc_frame is None:
+            ffc_frame = source.ffc_frame_for(position)
+        if ffc_frame is None:
+            # frames before the first recorded reference, only --ffc is kept
+            # for every frame
+            ffc_frame = _worker.get("zero_ffc_frame")
+            if ffc_frame is None or ffc_frame.shape != raw_frame.shape:
+                ffc_frame = _worker["zero_ffc_frame"] = np.zeros(raw_frame.shape, dtype=np.float32)
+        frame_info = source.frame_info(position)
+        fpa_temp_celsius = float(frame_info["fpa_temp_celsius"]) if frame_info is not None else None
+        color_frame = compositor.render(raw_frame, ffc_frame, fpa_temp_celsius)
+        if position < start:
+            continue
+        if output_directory is not None:
+            cv2.imwrite(os.path.join(output_directory, f"frame_{position:06d}.png"), color_frame)
+        else:
+            frames.append(color_frame.copy())
+    return stop - start, frames
+
+
+# Parent process
+
+def warmup_frames(settings: GeneralSettings, residual=WARMUP_RESIDUAL) -> int:
+    """Frames to prime a chunk with so that less than `residual` of the state
+    it started from is left. The span smoothing keeps `1 - agc_smoothing` of
+    its state per frame, the denoiser at most `denoise_strength`."""
+    decay = 0.0
+    if not settings.manual_span and settings.agc_smoothing < 1:
+        decay = 1 - settings.agc_smoothing
+    if settings.temporal_denoise:
+        decay = max(decay, settings.denoise_strength)
+    if decay <= 0:
+        return 0
+    return int(math.ceil(math.log(residual) / math.log(decay)))
+
+
+def run_batch(source_path: str, output: str, settings: GeneralSettings | None = None, workers: int | None = None,
+              chunk_size=DEFAULT_CHUNK_SIZE, warmup: int | None = None, start=0, stop=None,
+              framerate=None, codec=None, blind_pixel_mask_path=None, palette_path=None, ffc_path=None,
+              calibration_path=None):
+    """Processes frames `start` to `stop` of a capture. `output` is a
+    directory for PNGs or a video file path. `warmup` defaults to
+    `warmup_frames(settings)`. Returns `(frames, seconds)`."""
+    settings = settings if settings is not None else GeneralSettings()
+    source = open_source(source_path)
+    stop = len(source) if stop is None else min(stop, len(source))
+    framerate = framerate or source.parameters.get("fps") or DEFAULT_FRAMERATE
+    if isinstance(source, RawReader):
+        source.close()
+
+    extension = os.path.splitext(output)[1]
+    output_directory = None
+    if extension in (".avi", ".mp4", ".mkv"):
+        codec = codec or next((c for c, e in VIDEO_CODECS.items() if e == extension), "MJPG")
+    else:
+        output_directory = output
+        os.makedirs(output_directory, exist_ok=True)
+    if warmup is None:
+        warmup = warmup_frames(settings)
+
+    chunks = [(chunk_start, min(chunk_start + chunk_size, stop)) for chunk_start in range(start, stop, chunk_size)]
+    workers = workers or os.cpu_count()
+    started = time.perf_counter()
+    processed = 0
+    video_encoder = None
+    with ProcessPoolExecutor(workers, initializer=init_worker,
+                             initargs=(source_path, settings, blind_pixel_mask_path, palette_path, ffc_path,
+                                       calibration_path)) as executor:
+        # a bounded window of chunks in flight, collected in order
+        pending = deque()
+        chunk_iterator = iter(chunks)
+        for chunk_start, chunk_stop in chunk_iterator:
+            pending.append(executor.submit(process_chunk, chunk_start, chunk_stop, warmup, output_directory))
+            if len(pending) >= 2 * workers:
+                break
+        while pending:
+            count, frames = pending.popleft().result()
+            next_chunk = next(chunk_iterator, None)
+            if next_chunk is not None:
+                pending.append(executor.submit(process_chunk, *next_chunk, warmup, output_directory))
+            for frame in frames:
+                if video_encoder is None:
+                    video_encoder = VideoEncoder(output, framerate, (frame.shape[1], frame.shape[0]), codec,
+                                                 backpressure=BACKPRESSURE_BLOCK)
+                if not video_encoder.submit(frame):
+                    raise RuntimeError(f"Could not encode {output}") from video_encoder.error
+            processed += count
+    if video_encoder is not None:
+        video_encoder.close(drain=True)
+    return processed, time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Process infrared captures without the GUI")
+    parser.add_argument("source", help=f"a {RAW_EXTENSION} recording, a .npy capture, or a directory or glob of 16-bit images")
+    parser.add_argument("--output", required=True, help="directory for a PNG sequence, or a .avi/.mp4/.mkv video")
+    parser.add_argument("--workers", type=int, help="worker processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--start", type=int, default=0)
+    parser.add_argument("--stop", type=int)
+    parser.add_argument("--framerate", type=float, help="video framerate (default: the recorded one)")
+    parser.add_argument("--codec", help="video fourcc")
+    parser.add_argument("--palette", default="COLORMAP_INFERNO", help="an OpenCV colormap name or a palette file")
+    parser.add_argument("--invert", action="store_true")
+    parser.add_argument("--rotation", type=int, choices=range(4), default=0, help="quarter turns")
+    parser.add_argument("--flip", type=int, choices=range(4), default=0, help="1 vertical, 2 horizontal, 3 both")
+    parser.add_argument("--crop", type=int, nargs=4, metavar=("X", "Y", "WIDTH", "HEIGHT"),
+                        help="region of the sensor to keep, before rotation")
+    parser.add_argument("--span", type=float, nargs=2, metavar=("LOW", "HIGH"), help="manual span in counts")
+    parser.add_argument("--temperature-span", type=float, nargs=2, metavar=("LOW", "HIGH"),
+                        help="span in degrees Celsius, needs --calibration")
+    parser.add_argument("--calibration", help="radiometric calibration model JSON")
+    parser.add_argument("--agc-mode", choices=AGC_MODES, default=GeneralSettings.agc_mode)
+    parser.add_argument("--denoise", action="store_true", help="temporal noise reduction")
+    parser.add_argument("--blind-pixel-mask", help="blind pixel mask image or .npy")
+    parser.add_argument("--ffc", help="FFC reference .npy, overrides the recorded ones")
+    args = parser.parse_args(argv)
+
+    settings = GeneralSettings()
+    palette_path = None
+    if os.path.exists(args.palette):
+        palette_path = args.palette
+        settings.color_palette = os.path.splitext(os.path.basename(args.palette))[0]
+    elif args.palette in COLORMAPS:
+        settings.color_palette = COLORMAPS[args.palette]
+    else:
+        parser.error(f"Unknown palette {args.palette}")
+    settings.invert_colors = args.invert
+    settings.rotation = args.rotation
+    settings.flip = args.flip
+    settings.crop = args.crop
+    settings.agc_mode = args.agc_mode
+    settings.temporal_denoise = args.denoise
+    if args.span:
+        settings.manual_span = True
+        settings.span_range = list(args.span)
+    if args.temperature_span:
+        if not args.calibration:
+            parser.error("--temperature-span needs --calibration")
+        settings.temperature_span = True
+        settings.temperature_span_range = list(args.temperature_span)
+
+    frames, seconds = run_batch(args.source, args.output, settings, args.workers, args.chunk_size,
+                                start=args.start, stop=args.stop, framerate=args.framerate, codec=args.codec,
+                                blind_pixel_mask_path=args.blind_pixel_mask, palette_path=palette_path, ffc_path=args.ffc,
+                                calibration_path=args.calibration)
+    print(f"{frames} frames in {seconds:.2f} s, {frames / max(seconds, 1e-9):.1f} fps")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
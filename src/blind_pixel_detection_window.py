@@ -1,111 +1,152 @@
-import os
-import traceback
-import sys
 import cv2
 
-from PyQt5.uic import loadUiType
 from PyQt5.QtWidgets import (
-    QMainWindow,
     QDialog,
     QPushButton,
     QLabel,
     QCheckBox,
-    QComboBox,
     QSlider,
-    QDoubleSpinBox,
-    QGroupBox,
+    QSpinBox,
+    QProgressBar,
     QDialogButtonBox,
-    QStatusBar,
-)
-from PyQt5.QtGui import (
-    QPixmap,
-    QImage,
 )
 from PyQt5.QtCore import (
     Qt,
+    QTimer,
 )
 import numpy as np
 
+from src.BlindPixelDetector import PIXEL_DEAD, PIXEL_STUCK, PIXEL_NOISY
 from src.Calibrator import Calibrator
+from src.forms import load_form
 from src.utils import matlike_to_pixmap
 
-FORM_CLASS, _ = loadUiType(os.path.join(
-    os.path.dirname(__file__), '../ui/blind_pixel_detection_window.ui'))
+FORM_CLASS = load_form("blind_pixel_detection_window")
+
+CAPTURE_POLL_MS = 50
+# BGR colors of the pixel classes on the mask canvas, later ones win
+CLASS_COLORS = [
+    (PIXEL_NOISY, (0, 255, 255)),
+    (PIXEL_STUCK, (255, 0, 0)),
+    (PIXEL_DEAD, (0, 0, 255)),
+]
 
 class BlindPixelDetectionWindow(QDialog, FORM_CLASS):
     captureFrameButton: QPushButton
+    resetButton: QPushButton
+    frameCountSpinBox: QSpinBox
+    captureProgressBar: QProgressBar
     buttonBox: QDialogButtonBox
     toleranceLabel: QLabel
     blindPixelToleranceSlider: QSlider
+    checkBox: QCheckBox
 
     frameCanvas1: QLabel
     frameCanvas2: QLabel
     maskCanvas: QLabel
-    
+
     def __init__(self, parent=None):
         super(BlindPixelDetectionWindow, self).__init__(parent)
         self.setupUi(self)
         self.calibrator: Calibrator = None
-        self.blind_pixel_mask = None
+        # the mask in use when the dialog opened, restored on cancel
+        self.previous_mask = None
+        self.capture_timer = QTimer(self)
+        self.capture_timer.timeout.connect(self.update_capture_progress)
 
         self.blindPixelToleranceSlider.valueChanged.connect(self.blind_pixel_tolerance_changed)
 
     def set_calibrator(self, calibrator: Calibrator):
         self.calibrator = calibrator
-        self.captureFrameButton.clicked.connect(self.capture_frame_event)
+        self.captureFrameButton.clicked.connect(self.capture_scene_event)
+        self.resetButton.clicked.connect(self.reset_event)
+        self.checkBox.stateChanged.connect(self.show_mask)
         self.blindPixelToleranceSlider.setValue(int(self.calibrator.blind_pixel_detection_tolerance * 1000))
 
-    def capture_frame_event(self):
+    def showEvent(self, event):
+        self.previous_mask = self.calibrator.blind_pixel_mask
+        self.show_mask()
+        super().showEvent(event)
+
+    def capture_scene_event(self):
+        frame_count = self.frameCountSpinBox.value()
+        self.calibrator.capture_blind_pixel_scene(frame_count)
+        self.captureProgressBar.setRange(0, frame_count)
+        self.captureProgressBar.setValue(0)
+        self.captureFrameButton.setEnabled(False)
+        self.capture_timer.start(CAPTURE_POLL_MS)
+
+    def update_capture_progress(self):
+        self.captureProgressBar.setValue(self.captureProgressBar.maximum() - self.calibrator.frames_to_capture)
+        if self.calibrator.capturing_blind_pixel_scene:
+            return
+        self.capture_timer.stop()
+        self.captureFrameButton.setEnabled(True)
         self.calibrator.blind_pixel_detection()
-        if len(self.calibrator.blind_pixel_detection_frames) == 1:
-            frame1 = cv2.cvtColor(cv2.normalize(
-                self.calibrator.blind_pixel_detection_frames[0], 
-                None, 0, 255, cv2.NORM_MINMAX, dtype=cv2.CV_8U),
-                cv2.COLOR_GRAY2BGR)
-            pixmap1 = matlike_to_pixmap(frame1)
-            pixmap1 = pixmap1.scaled(self.frameCanvas1.size(), Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.FastTransformation)
-            self.frameCanvas1.setPixmap(pixmap1)
-        if len(self.calibrator.blind_pixel_detection_frames) == 2:
-            frame2 = cv2.cvtColor(cv2.normalize(
-                self.calibrator.blind_pixel_detection_frames[1], 
-                None, 0, 255, cv2.NORM_MINMAX, dtype=cv2.CV_8U),
-                cv2.COLOR_GRAY2BGR)
-            pixmap2 = matlike_to_pixmap(frame2)
-            pixmap2 = pixmap2.scaled(self.frameCanvas1.size(), Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.FastTransformation)
-            self.frameCanvas2.setPixmap(pixmap2)
-
-            mask_frame = cv2.cvtColor(cv2.normalize(
-                self.calibrator.blind_pixel_mask, 
-                None, 0, 255, cv2.NORM_MINMAX, dtype=cv2.CV_8U),
-                cv2.COLOR_GRAY2BGR)
-            diff_pixmap = matlike_to_pixmap(mask_frame)
-            diff_pixmap = diff_pixmap.scaled(self.maskCanvas.size(), Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.FastTransformation)
-            self.maskCanvas.setPixmap(diff_pixmap)
+        scenes = self.calibrator.blind_pixel_detector.scenes
+        self.show_frame(self.frameCanvas1, scenes[0].mean)
+        if len(scenes) > 1:
+            self.show_frame(self.frameCanvas2, scenes[-1].mean)
+        self.show_mask()
+
+    def reset_event(self):
+        self.capture_timer.stop()
+        self.captureFrameButton.setEnabled(True)
+        self.captureProgressBar.setValue(0)
+        self.calibrator.clear_blind_pixel_detection_frames()
+        self.calibrator.set_blind_pixel_mask(self.previous_mask)
+        self.frameCanvas1.setText("Scene 1")
+        self.frameCanvas2.setText("Scene 2")
+        self.show_mask()
+
+    def show_frame(self, canvas: QLabel, frame: np.ndarray):
+        frame = cv2.cvtColor(cv2.normalize(frame, None, 0, 255, cv2.NORM_MINMAX, dtype=cv2.CV_8U), cv2.COLOR_GRAY2BGR)
+        pixmap = matlike_to_pixmap(frame)
+        pixmap = pixmap.scaled(canvas.size(), Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.FastTransformation)
+        canvas.setPixmap(pixmap)
+
+    def show_mask(self):
+        detector = self.calibrator.blind_pixel_detector
+        mask = self.calibrator.blind_pixel_mask
+        if detector.analyzed:
+            classes = detector.classify()
+        elif mask is not None:
+            classes = (mask > 0).astype(np.uint8) * PIXEL_DEAD
+        else:
+            self.maskCanvas.setText("Blind Pixel Mask")
+            return
+
+        if detector.analyzed and not self.checkBox.isChecked():
+            background = detector.scenes[-1].mean
+            mask_frame = cv2.cvtColor(cv2.normalize(background, None, 0, 255, cv2.NORM_MINMAX, dtype=cv2.CV_8U),
+                                      cv2.COLOR_GRAY2BGR)
+        else:
+            mask_frame = np.zeros((*classes.shape, 3), dtype=np.uint8)
+        for pixel_class, color in CLASS_COLORS:
+            mask_frame[(classes & pixel_class) != 0] = color
+
+        pixmap = matlike_to_pixmap(mask_frame)
+        pixmap = pixmap.scaled(self.maskCanvas.size(), Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.FastTransformation)
+        self.maskCanvas.setPixmap(pixmap)
 
     def blind_pixel_tolerance_changed(self, value: int) -> None:
         tolerance = value / 1000.0
+        self.toleranceLabel.setText(f"Tolerance: {tolerance*100:.1f}%")
+        if self.calibrator is None:
+            return
         self.calibrator.set_blind_pixel_detection_tolerance(tolerance)
-        self.toleranceLabel.setText(f"Tolerance: {tolerance/10:.1f}")
-
-        diff_frame = cv2.cvtColor(cv2.normalize(
-            self.calibrator.frame_difference, 
-            None, 0, 255, cv2.NORM_MINMAX, dtype=cv2.CV_8U),
-            cv2.COLOR_GRAY2BGR)
-        
-        # Colorize to red
-        blind_pixel_mask = np.zeros_like(diff_frame)
-        blind_pixel_mask[:, :, 2] = self.calibrator.blind_pixel_mask
-        mask_frame = blind_pixel_mask
-        
-        diff_pixmap = matlike_to_pixmap(mask_frame)
-        diff_pixmap = diff_pixmap.scaled(self.maskCanvas.size(), Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.FastTransformation)
-        self.maskCanvas.setPixmap(diff_pixmap)
-        
-    def acceptEvent(self, event):
-        print("saveEvent")
-        self.calibrator.blind_pixel_mask = self.blind_pixel_mask
-        self.acceptEvent(event)
-
-    def cancelEvent(self, event):
-        print("cancelEvent")
-        self.reject()
\ No newline at end of file
+        self.show_mask()
+
+    def accept(self):
+        self.calibrator.clear_blind_pixel_detection_frames()
+        try:
+            self.calibrator.save_blind_pixel_mask()
+        except ValueError:
+            # devices without a serial number keep the mask for this session
+            pass
+        super().accept()
+
+    def reject(self):
+        self.calibrator.clear_blind_pixel_detection_frames()
+        self.calibrator.set_blind_pixel_mask(self.previous_mask)
+        super().reject()
@@ -1,8 +1,10 @@
+import array
 import datetime
 import json
+import os
 import struct
-from time import sleep
 import time
+from concurrent.futures import Future
 import numpy as np
 import usb.core
 import usb.util
@@ -10,11 +12,13 @@ from PyQt5.QtCore import (
     Qt,
     QTimer,
 )
-from PyQt5.QtTest import QTest
 
-from src.drivers.base import BaseDriver
+from src.drivers.base import BaseDriver, FRAME_INFO_DTYPE
+from src.drivers.acquisition import AcquisitionThread
+from src.drivers.commands import CommandChannel
+from src.drivers.ffc import FfcStateMachine
+from src.settings import CACHE_DIRECTORY
 from src.utils import (
-    bytes_to_int,
     get_endpoint,
     SHUTTER_TYPE_MONO_STABLE,
     SHUTTER_TRIGGERS,
@@ -47,6 +51,14 @@ RESPONSE_CODES = {
     "CaliHandledAck"    : 0x5BB5B560,
     "SendLifeTime"      : 0x5BB5B561,
 }
+# responses matched to the commands that request data, other commands take
+# the next response
+COMMAND_RESPONSES = {
+    COMMAND_CODES["GetParameter1"]  : RESPONSE_CODES["SendParameter1"],
+    COMMAND_CODES["GetParameter2"]  : RESPONSE_CODES["SendParameter2"],
+    COMMAND_CODES["GetCaliInfo"]    : RESPONSE_CODES["SendCaliInfo"],
+    COMMAND_CODES["GetLifeTime"]    : RESPONSE_CODES["SendLifeTime"],
+}
 ENDPOINT_ADDRESSES = {
     "command_out"       : 0x03,
     "calibration_out"   : 0x05,
@@ -60,17 +72,84 @@ DEVICE_CODE = 0x03
 IMG_START_CODE = 0x1BB1B11B
 IMG_END_CODE = 0x1BB1B11C
 CMD_TIMEOUT = 800
+IMG_TIMEOUT = 200
+CALIBRATION_MIN_SIZE = 65536
+CALIBRATION_MAX_SIZE = 104857600
+CALIBRATION_BLOCK_SIZE = 16384
+CALIBRATION_CACHE_DIRECTORY = os.path.join(CACHE_DIRECTORY, "calibration")
+PARAMETER_CACHE_DIRECTORY = os.path.join(CACHE_DIRECTORY, "parameters")
+
+# Response layouts, all little-endian after the 4 byte response code
+PARAMETER1_STRUCT = struct.Struct("<4xI3sBIIIIIIIIIIII")
+PARAMETER1_FIELDS = (
+    "serial_number", "hardware_version", "device_type", "firmware_version",
+    "fpa_serial_number", "fpa_width", "fpa_height", "fps", "reserved_1",
+    "fpa_gain", "fpa_flip", "inter_frame", "inter_line", "gfid", "gsk",
+)
+PARAMETER2_STRUCT = struct.Struct("<4xIIIHHIIIIIIIfII")
+PARAMETER2_FIELDS = (
+    "base_line_acc", "denoise_level", "reserved_2", "reserved_3", "fpa_temp_fix",
+    "shutter_close_speed", "shutter_open_speed", "ffc_trigger_frame",
+    "ffc_trigger_temperature", "enlarge_range", "laser_pos",
+    "at_zero_error_point", "at_error_slope", "reserved_4", "reserved_5",
+)
+CALIBRATION_INFO_STRUCT = struct.Struct("<IIIQ")
+CALIBRATION_INFO_FIELDS = ("command", "size", "reserved_1", "timestamp")
+
+# Trailer appended by the camera after the pixel data of every frame packet
+FRAME_TAIL_DTYPE = np.dtype([
+    ("code", "<u4"),
+    ("frame_index", "<u4"),
+    ("fpa_temp", "<u4"),
+    ("int_drop", "<u4"),
+    ("reserved", "<u4", (3,)),
+])
+FRAME_TAIL_SIZE = FRAME_TAIL_DTYPE.itemsize
+
+
+def find_devices() -> list:
+    """All attached MAG-160 cores, as pyusb devices for `Mag160Core`."""
+    return list(usb.core.find(find_all=True, idVendor=VID, idProduct=PID))
+
+
+def parse_parameter1(response) -> dict:
+    parameters = dict(zip(PARAMETER1_FIELDS, PARAMETER1_STRUCT.unpack_from(bytes(response))))
+    parameters["hardware_version"] = int.from_bytes(parameters["hardware_version"], "little")
+    return parameters
+
+
+def parse_parameter2(response) -> dict:
+    return dict(zip(PARAMETER2_FIELDS, PARAMETER2_STRUCT.unpack_from(bytes(response))))
+
+
+def parse_calibration_info(response) -> dict:
+    calibration_info = dict(zip(CALIBRATION_INFO_FIELDS, CALIBRATION_INFO_STRUCT.unpack_from(bytes(response))))
+    calibration_info["date"] = datetime.datetime.fromtimestamp(calibration_info["timestamp"]).isoformat()
+    return calibration_info
 
 
 class Mag160Core(BaseDriver):
-    def __init__(self):
+    def __init__(self, device: "usb.core.Device | None" = None, threaded_acquisition=True):
+        """Drives `device`, one of `find_devices()`, or the first core found
+        when None."""
         super().__init__()
+        self.device = device
         self.driver_name = "MAG-160 Core"
         self.shutter_type = SHUTTER_TYPE_MONO_STABLE
         self.supported_shutter_triggers = [SHUTTER_TRIGGER_MANUAL, SHUTTER_TRIGGER_TEMPERATURE, SHUTTER_TRIGGER_TIME_INTERVAL]
+        self.threaded_acquisition = threaded_acquisition
+        self.acquisition_thread: AcquisitionThread | None = None
+        self.read_timer: QTimer | None = None
+        self.calibration_info: dict | None = None
+        self.calibration_data: np.ndarray | None = None
+        self.calibration_cache_directory = CALIBRATION_CACHE_DIRECTORY
+        self.parameter_cache_directory = PARAMETER_CACHE_DIRECTORY
+        self.commands = CommandChannel(self.write_command, self.read_response)
+        self.transfer_started: Future | None = None
 
     def connect(self):
-        self.device = usb.core.find(idVendor=VID, idProduct=PID)
+        if self.device is None:
+            self.device = usb.core.find(idVendor=VID, idProduct=PID)
         if self.device is None:
             raise ValueError("Device not found")
         
@@ -87,183 +166,243 @@ class Mag160Core(BaseDriver):
         self.caliout_endpoint = get_endpoint(device_interface, ENDPOINT_ADDRESSES["calibration_out"])
         self.imgin_endpoint = get_endpoint(device_interface, ENDPOINT_ADDRESSES["image_in"])
 
+        self.commands.telemetry = self.telemetry
+        self.commands.start()
+        try:
+            self.start_session()
+        except Exception:
+            # leave the interface free for the next connect attempt
+            self.commands.stop()
+            usb.util.release_interface(self.device, 0)
+            raise
+        return self.device
+
+    def start_session(self):
+        """Reads the parameters and calibration info and starts the image
+        transfer, once the command channel is running."""
         self.device_info = self.get_parameters()
         self.frame_width = self.device_info["fpa_width"]
         self.frame_height = self.device_info["fpa_height"]
         self.frame_dims = self.frame_width, self.frame_height
         self.framerate = self.device_info["fps"]
         self.frame_packet_size = (self.frame_width*self.frame_height*2) + 1024
+        self.allocate_frame_buffers()
 
-        self.ffc_frame = np.zeros((self.frame_height, self.frame_width), dtype=np.uint16)
-        self.last_ffc_time = 0
-        self.last_ffc_temp = 0
+        self.ffc_frame = np.zeros((self.frame_height, self.frame_width), dtype=np.float32)
+        # queued behind the parameter requests
+        calibration_info = self.submit_command(COMMAND_CODES["GetCaliInfo"])
+        self.ffc = FfcStateMachine(self.set_shutter, self.set_ffc_reference, self.framerate,
+                                   telemetry=self.telemetry)
 
-        self.get_calibration_info()
-        self.send_command(COMMAND_CODES["StartTransferImg"], 2000)
+        self.calibration_info = parse_calibration_info(calibration_info.result())
+        # frames arrive once the camera handled it, until then image reads time out
+        self.transfer_started = self.submit_command(COMMAND_CODES["StartTransferImg"], 2000)
 
         # start asynchronous frame read
-        self.read_timer = QTimer()
-        self.read_timer.timeout.connect(self.read)
-        self.read_timer.start(1000//self.framerate)
-
-        self.ffc_timer = QTimer()
-        self.ffc_timer.timeout.connect(self.set_ffc_frame)
-        self.ffc_timer.start(1000//self.framerate)
-
-        return self.device
+        if self.threaded_acquisition:
+            self.acquisition_thread = AcquisitionThread(
+                self.grab_frame,
+                (self.frame_height, self.frame_width),
+                np.uint16,
+                self.read,
+                info_dtype=FRAME_INFO_DTYPE,
+                telemetry=self.telemetry,
+            )
+            self.acquisition_thread.start()
+        else:
+            self.read_timer = QTimer()
+            self.read_timer.timeout.connect(self.read)
+            self.read_timer.start(1000//self.framerate)
     
     def read(self):
-        self.frame_buffer, self.frame_info = self.get_image_data()
+        if self.acquisition_thread is not None:
+            frame, frame_info = self.acquisition_thread.latest()
+            if frame is None:
+                return
+            self.frame_buffer, self.frame_info = frame, frame_info
+        else:
+            frame = self.grab_frame()
+            if frame is None:
+                return
+            self.frame_buffer, self.frame_info = frame
         self.frame_ready.emit()
         # print(f'n: {self.frame_info["frame_index"]:010d}, Cam temp: {self.frame_info["cam_temp_celsius"]:.1f}, FPA temp: {self.frame_info["fpa_temp_celsius"]:.1f}', end='\r')
     
     def set_ffc_frame(self, force=False):
-        ffc_temp_diff = self.frame_info["fpa_temp_celsius"] - self.last_ffc_temp
-        if force or ffc_temp_diff > 0.3 or ffc_temp_diff < -0.3:
-            self.performing_ffc = True
-            self.set_shutter(1)
-            QTest.qWait(410)
-            self.ffc_frame = self.frame_buffer.copy()
-            self.last_ffc_temp = self.frame_info["fpa_temp_celsius"]
-            self.last_ffc_timestamp = time.time()
-            self.ffc_frame_ready.emit()
-            self.set_shutter(0)
-            QTest.qWait(140)
-            self.performing_ffc = False
-        
-    
+        # the temperature trigger runs on every new frame, see grab_frame
+        if force:
+            self.ffc.request()
+
+    def set_ffc_reference(self, reference, frame_info):
+        self.ffc_frame = reference
+        self.ffc_frame_ready.emit()
+
+    def grab_frame(self):
+        try:
+            frame, frame_info = self.get_image_data()
+        except usb.core.USBTimeoutError:
+            return None
+        self.ffc.on_frame(frame, frame_info)
+        self.performing_ffc = self.ffc.performing
+        self.notify_frame_sinks(frame, frame_info)
+        return frame, frame_info
+
     def close(self):
-        self.read_timer.stop()
-        self.ffc_timer.stop()
-        self.send_command(COMMAND_CODES["StopTransferImg"], 2000, None)
+        if self.acquisition_thread is not None:
+            self.acquisition_thread.stop()
+            self.acquisition_thread = None
+        if self.read_timer is not None:
+            self.read_timer.stop()
+        self.submit_command(COMMAND_CODES["StopTransferImg"], 2000, read_response=False).result()
+        self.commands.stop()
         usb.util.release_interface(self.device, 0)
-    
-    def send_command(self, command_data, timeout=CMD_TIMEOUT, read_delay_ms=0):
-        command_bytes = bytearray()
+
+    def write_command(self, payload: bytes, timeout: int):
+        return self.device.write(self.cmdout_endpoint.bEndpointAddress, payload, timeout)
+
+    def read_response(self, timeout: int):
+        return self.device.read(self.cmdin_endpoint.bEndpointAddress, 64, timeout)
+
+    def submit_command(self, command_data, timeout=CMD_TIMEOUT, read_response=True) -> Future:
+        """Queues a command, a code or a list of words, on the command channel
+        and returns a Future of its response."""
         if not isinstance(command_data, list):
-            command_bytes = command_data.to_bytes(4, 'little')
-        else:
-            for data in (command_data):
-                command_bytes.extend(((data)).to_bytes(4, 'little'))
-        # pprint_bytes(command_bytes)
-        bytes_sent = self.device.write(self.cmdout_endpoint.bEndpointAddress, command_bytes, timeout)
-        if read_delay_ms is not None:
-            sleep(read_delay_ms / 1000)
-            response = self.device.read(self.cmdin_endpoint.bEndpointAddress, 64, timeout)
-            return response
-    
-    def get_parameters(self):
-        # print(f'get parameters')
-        params1 = self.send_command(COMMAND_CODES["GetParameter1"])
-        parameters = {
-            # "command_code": bytes_to_int(params1[0:4]),
-            "serial_number": bytes_to_int(params1[4:8]),
-            "hardware_version": bytes_to_int(params1[8:11]), # 3 bytes
-            "device_type": params1[11], # byte.
-            "firmware_version": bytes_to_int(params1[12:16]),
-            "fpa_serial_number": bytes_to_int(params1[16:20]),
-            "fpa_width": bytes_to_int(params1[20:24]),
-            "fpa_height": bytes_to_int(params1[24:28]),
-            "fps": bytes_to_int(params1[28:32]),
-            "reserved_1": bytes_to_int(params1[32:36]),
-            "fpa_gain": bytes_to_int(params1[36:40]), 
-            "fpa_flip": bytes_to_int(params1[40:44]),
-            "inter_frame": bytes_to_int(params1[44:48]),
-            "inter_line": bytes_to_int(params1[48:52]),
-            "gfid": bytes_to_int(params1[52:56]),
-            "gsk": bytes_to_int(params1[56:60]),
-        }
-
-        params2 = self.send_command(COMMAND_CODES["GetParameter2"])
-        parameters = {
-            **parameters,
-            # "command_code": bytes_to_int(params2[0:4]),
-            "base_line_acc": bytes_to_int(params2[4:8]),
-            "denoise_level": bytes_to_int(params2[8:12]),
-            "reserved_2": bytes_to_int(params2[12:16]),
-            "reserved_3": bytes_to_int(params2[16:18]),  # Short
-            "fpa_temp_fix": bytes_to_int(params2[18:20]),  # Short
-            "shutter_close_speed": bytes_to_int(params2[20:24]),
-            "shutter_open_speed": bytes_to_int(params2[24:28]),
-            "ffc_trigger_frame": bytes_to_int(params2[28:32]),
-            "ffc_trigger_temperature": bytes_to_int(params2[32:36]),
-            "enlarge_range": bytes_to_int(params2[36:40]),
-            "laser_pos": bytes_to_int(params2[40:44]),
-            "at_zero_error_point": bytes_to_int(params2[44:48]),
-            "at_error_slope": struct.unpack('f', params2[48:52])[0],  # Float
-            "reserved_4": bytes_to_int(params2[52:56]),
-            "reserved_5": bytes_to_int(params2[56:60]),
-        }
-        # print(f"Camera parameters: {json.dumps(parameters, indent=4)}")
+            command_data = [command_data]
+        command = command_data[0]
+        if command in (COMMAND_CODES["SetParameter1"], COMMAND_CODES["SetParameter2"]):
+            self.clear_cached_parameters()
+        payload = struct.pack(f"<{len(command_data)}I", *command_data)
+        return self.commands.submit(payload, COMMAND_RESPONSES.get(command), timeout, read_response)
+
+    def send_command(self, command_data, timeout=CMD_TIMEOUT, read_response=True):
+        """Sends a command and waits for its response."""
+        return self.submit_command(command_data, timeout, read_response).result()
+
+    def parameter_cache_path(self, serial_number: int) -> str:
+        return os.path.join(self.parameter_cache_directory, f"{serial_number}.json")
+
+    def clear_cached_parameters(self):
+        if self.device_info is not None and "serial_number" in self.device_info:
+            path = self.parameter_cache_path(self.device_info["serial_number"])
+            if os.path.exists(path):
+                os.remove(path)
+
+    def get_parameters(self, use_cache=True):
+        """Parameter1 identifies the camera, so it is always read. Parameter2
+        only changes through SetParameter2 and comes from the cache of known
+        cameras."""
+        parameters = parse_parameter1(self.send_command(COMMAND_CODES["GetParameter1"]))
+        path = self.parameter_cache_path(parameters["serial_number"])
+        if use_cache and os.path.exists(path):
+            with open(path) as f:
+                cached = json.load(f)
+            if {key: cached[key] for key in PARAMETER1_FIELDS} == parameters:
+                return cached
+
+        parameters.update(parse_parameter2(self.send_command(COMMAND_CODES["GetParameter2"])))
+        os.makedirs(self.parameter_cache_directory, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(parameters, f, indent=4)
         return parameters
-    
+
     def get_calibration_info(self, save_file=False):
-        # print(f'get calibration info')
-        cali_info = self.send_command(COMMAND_CODES["GetCaliInfo"])
-        calibration_info = {
-            "command": bytes_to_int(cali_info[0:4]),
-            "size": bytes_to_int(cali_info[4:8]),
-            "reserved_1": bytes_to_int(cali_info[8:12]),
-            "date": datetime.datetime.fromtimestamp(bytes_to_int(cali_info[12:20])).isoformat(), 
-        }
-        if 65536 > calibration_info["size"] > 104857600:
-            raise ValueError("Calibration file size is invalid")
-        
+        self.calibration_info = parse_calibration_info(self.send_command(COMMAND_CODES["GetCaliInfo"]))
         if save_file:
+            self.load_calibration_file()
+        return self.calibration_info
+
+    def calibration_cache_path(self) -> str:
+        """The cached calibration file of this camera, named after its serial
+        number and calibration date, which change together with the data."""
+        name = f"{self.device_info['serial_number']}_{self.calibration_info['timestamp']}.dat"
+        return os.path.join(self.calibration_cache_directory, name)
+
+    def load_calibration_file(self, progress=None) -> np.ndarray:
+        """Returns the calibration file as a read-only memory map of its
+        cached copy, downloading it first when it isn't cached.
+
+        `progress` is called with `(bytes_received, size)` after every block."""
+        if self.calibration_info is None:
+            self.get_calibration_info()
+        size = self.calibration_info["size"]
+        if not CALIBRATION_MIN_SIZE <= size <= CALIBRATION_MAX_SIZE:
+            raise ValueError(f"Calibration file size {size} is invalid")
+        path = self.calibration_cache_path()
+        if not os.path.exists(path) or os.path.getsize(path) != size:
+            self.download_calibration_file(path, size, progress)
+        elif progress is not None:
+            progress(size, size)
+        self.calibration_data = np.memmap(path, dtype=np.uint8, mode="r")
+        return self.calibration_data
+
+    def download_calibration_file(self, path: str, size: int, progress=None):
+        """Streams the calibration file from the camera into a memory-mapped
+        file, block by block through one reused USB buffer. The file only
+        appears under `path` once complete."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        partial_path = f"{path}.{os.getpid()}.partial"
+        data = np.memmap(partial_path, dtype=np.uint8, mode="w+", shape=(size,))
+        block = array.array("B", bytes(CALIBRATION_BLOCK_SIZE))
+        block_view = np.frombuffer(block, dtype=np.uint8)
+        try:
             self.send_command(COMMAND_CODES["GetCaliFile"])
-            cali_data = bytearray()
-            remain = cali_info["size"]
-            while remain > 0:
-                cali_data_block = self.device.read(self.calibration_in_endpoint.bEndpointAddress, 
-                                                   min(remain, 16384), 
-                                                   CMD_TIMEOUT)
-                cali_data+=cali_data_block
-                remain -= 16384
-            with open(f"calibration_data.dat", "wb") as f:
-                f.write(cali_data)
+            received = 0
+            while received < size:
+                bytes_read = self.device.read(self.calibration_in_endpoint.bEndpointAddress, block, CMD_TIMEOUT)
+                if bytes_read <= 0:
+                    raise IOError(f"Calibration download stopped at {received} of {size} bytes")
+                bytes_read = min(bytes_read, size - received)
+                data[received:received + bytes_read] = block_view[:bytes_read]
+                received += bytes_read
+                if progress is not None:
+                    progress(received, size)
+            data.flush()
+            del data
+            os.replace(partial_path, path)
+        except BaseException:
+            del data
+            os.remove(partial_path)
+            raise
+
+    def allocate_frame_buffers(self):
+        # USB transfers land in these reusable packets, the decoded frame and
+        # its info record are views into them
+        self.header_packet = usb.util.create_buffer(self.frame_packet_size)
+        self.content_packet = usb.util.create_buffer(self.frame_packet_size)
+        self.content_array = np.frombuffer(self.content_packet, dtype=np.uint8)
+        self.frame_view = np.frombuffer(
+            self.content_packet, dtype=np.uint16, count=self.frame_width*self.frame_height
+            ).reshape((self.frame_height, self.frame_width))
+        self.frame_info_record = np.zeros(1, dtype=FRAME_INFO_DTYPE)
 
     def get_image_data(self):
-        header_block = self.device.read(self.imgin_endpoint.bEndpointAddress, self.frame_packet_size, 200)
-        content_block = self.device.read(self.imgin_endpoint.bEndpointAddress, self.frame_packet_size, 200)
-        img_block = content_block[0:-28]
-        tail_block = content_block[-28:]
-        # header_info = {
-        #     "code": bytes_to_int(header_block[0:4]),
-        #     "frame_index": bytes_to_int(header_block[4:8]),
-        #     "reserved": [bytes_to_int(header_block[8:12]), 
-        #                     bytes_to_int(header_block[12:16]),
-        #                     bytes_to_int(header_block[16:20]),
-        #                     bytes_to_int(header_block[20:24])],
-        #     "send_bytes": bytes_to_int(header_block[24:28]),
-        # }
-        frame_info = {
-            "code": bytes_to_int(tail_block[0:4]),
-            "frame_index": bytes_to_int(tail_block[4:8]),
-            "fpa_temp": bytes_to_int(tail_block[8:12]),
-            "int_drop": bytes_to_int(tail_block[12:16]),
-            # "reserved": [bytes_to_int(tail_block[16:20]), 
-            #                 bytes_to_int(tail_block[20:24]),
-            #                 bytes_to_int(tail_block[24:28])],
-        }
-        cam_temp = frame_info["fpa_temp"] - 500
-        fixed_fpa_temp = frame_info["fpa_temp"] + self.device_info["fpa_temp_fix"]
-        fixed_cam_temp = cam_temp + self.device_info["fpa_temp_fix"]
-        other_info = {
-            "cam_temp_celsius": fixed_cam_temp / 1000,
-            "fpa_temp_celsius": fixed_fpa_temp / 1000,
-        }
-        all_info = {
-            **frame_info,
-            **other_info,
-        }
-        image_array = np.frombuffer(img_block, dtype=np.uint16).reshape((self.frame_height, self.frame_width)).astype(np.float32)
-        return image_array, all_info
-    
+        """Reads one frame packet into the reusable packet buffers.
+
+        Returns a uint16 view of the pixel data and a `FRAME_INFO_DTYPE`
+        record. Both are overwritten by the next call, copy them to keep them."""
+        self.device.read(self.imgin_endpoint.bEndpointAddress, self.header_packet, IMG_TIMEOUT)
+        bytes_read = self.device.read(self.imgin_endpoint.bEndpointAddress, self.content_packet, IMG_TIMEOUT)
+        started = self.telemetry.start()
+        tail = self.content_array[bytes_read - FRAME_TAIL_SIZE:bytes_read].view(FRAME_TAIL_DTYPE)[0]
+
+        frame_info = self.frame_info_record[0]
+        frame_info["code"] = tail["code"]
+        frame_info["frame_index"] = tail["frame_index"]
+        frame_info["fpa_temp"] = tail["fpa_temp"]
+        frame_info["int_drop"] = tail["int_drop"]
+        fixed_fpa_temp = int(tail["fpa_temp"]) + self.device_info["fpa_temp_fix"]
+        frame_info["fpa_temp_celsius"] = fixed_fpa_temp / 1000
+        frame_info["cam_temp_celsius"] = (fixed_fpa_temp - 500) / 1000
+        frame_info["timestamp"] = time.time()
+        self.telemetry.stop("decode", started)
+        return self.frame_view, frame_info
 
-    def set_shutter(self, state):
+    def set_shutter(self, state) -> Future:
+        """Returns without waiting for the camera, it is called from the
+        acquisition thread during flat field correction."""
         state = not state
         command_data = [
             COMMAND_CODES["SetShutterState"],
             state
         ]
-        return self.send_command(command_data)
\ No newline at end of file
+        return self.submit_command(command_data)
@@ -0,0 +1,149 @@
+import os
+import time
+import numpy as np
+
+from src.drivers.base import BaseDriver, FRAME_INFO_DTYPE
+from src.drivers.acquisition import AcquisitionThread
+from src.RawRecording import RawReader, RAW_EXTENSION
+from src.utils import SHUTTER_TYPE_NONE
+
+
+def capture_paths(path: str):
+    """Returns the frame, frame info and FFC reference paths of a capture
+    saved as `.npy` arrays."""
+    stem = path[:-len(".npy")] if path.endswith(".npy") else path
+    return stem + ".npy", stem + ".info.npy", stem + ".ffc.npy"
+
+
+def save_capture(path: str, frames: np.ndarray, frame_infos: np.ndarray | None = None, ffc_frame: np.ndarray | None = None):
+    frames_path, infos_path, ffc_path = capture_paths(path)
+    np.save(frames_path, np.asarray(frames, dtype=np.uint16))
+    if frame_infos is not None:
+        np.save(infos_path, np.asarray(frame_infos, dtype=FRAME_INFO_DTYPE))
+    if ffc_frame is not None:
+        np.save(ffc_path, np.asarray(ffc_frame, dtype=np.float32))
+
+
+class ReplayCamera(BaseDriver):
+    """Serves the frames of a raw recording (`RAW_EXTENSION`) or of a capture
+    saved as `.npy` arrays. The frames are memory mapped, so captures larger
+    than memory can be replayed, either at the recorded speed or as fast as
+    the consumers go."""
+    def __init__(self, path: str, framerate=25, realtime=True, loop=True, threaded_acquisition=True):
+        super().__init__()
+        self.driver_name = "Replay"
+        self.shutter_type = SHUTTER_TYPE_NONE
+        self.supported_shutter_triggers = []
+        self.path = path
+        self.framerate = framerate
+        self.realtime = realtime
+        self.loop = loop
+        self.threaded_acquisition = threaded_acquisition
+
+        self.acquisition_thread: AcquisitionThread | None = None
+        self.position = 0
+        self.next_frame_time = 0
+
+    def connect(self):
+        self.recording: RawReader | None = None
+        if self.path.endswith(RAW_EXTENSION):
+            self.recording = RawReader(self.path)
+            self.frame_count = len(self.recording)
+            self.frame_height, self.frame_width = self.recording.frame_shape
+            self.frame_infos = self.recording.frame_infos()
+            self.ffc_frame = self.recording.ffc_frame_for(0)
+            parameters = self.recording.parameters
+        else:
+            frames_path, infos_path, ffc_path = capture_paths(self.path)
+            self.frames = np.load(frames_path, mmap_mode="r")
+            self.frame_count, self.frame_height, self.frame_width = self.frames.shape
+            if os.path.exists(infos_path):
+                self.frame_infos = np.load(infos_path, mmap_mode="r")
+            else:
+                self.frame_infos = np.zeros(self.frame_count, dtype=FRAME_INFO_DTYPE)
+                self.frame_infos["frame_index"] = np.arange(self.frame_count)
+            if os.path.exists(ffc_path):
+                self.ffc_frame = np.load(ffc_path)
+            parameters = {}
+        if self.ffc_frame is None:
+            self.ffc_frame = np.zeros((self.frame_height, self.frame_width), dtype=np.float32)
+        self.frame_dims = self.frame_width, self.frame_height
+
+        # replay at the recorded speed when the frames carry timestamps
+        timestamps = self.frame_infos["timestamp"]
+        self.frame_intervals = None
+        if self.frame_count > 1 and np.all(timestamps > 0):
+            self.frame_intervals = np.clip(np.diff(timestamps, prepend=timestamps[0]), 0, 1)
+            self.framerate = (self.frame_count - 1) / max(timestamps[-1] - timestamps[0], 1e-6)
+        if parameters.get("fps"):
+            self.framerate = parameters["fps"]
+
+        self.device_info = {
+            **parameters,
+            "fpa_width": self.frame_width,
+            "fpa_height": self.frame_height,
+            "fps": self.framerate,
+            "frame_count": self.frame_count,
+        }
+        self.next_frame_time = time.monotonic()
+
+        if self.threaded_acquisition:
+            self.acquisition_thread = AcquisitionThread(
+                self.grab_frame,
+                (self.frame_height, self.frame_width),
+                np.uint16,
+                self.read,
+                info_dtype=FRAME_INFO_DTYPE,
+                telemetry=self.telemetry,
+            )
+            self.acquisition_thread.start()
+        return self
+
+    def close(self):
+        if self.acquisition_thread is not None:
+            self.acquisition_thread.stop()
+            self.acquisition_thread = None
+
+    def read(self):
+        if self.acquisition_thread is not None:
+            frame, frame_info = self.acquisition_thread.latest()
+        else:
+            frame, frame_info = self.grab_frame() or (None, None)
+        if frame is None:
+            return
+        self.frame_buffer, self.frame_info = frame, frame_info
+        self.frame_ready.emit()
+
+    def seek(self, position: int):
+        self.position = position % self.frame_count
+
+    def grab_frame(self):
+        if self.position >= self.frame_count:
+            if not self.loop:
+                time.sleep(0.01)
+                return None
+            self.position = 0
+
+        if self.realtime and self.framerate:
+            delay = self.next_frame_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            if self.frame_intervals is not None:
+                frame_interval = self.frame_intervals[(self.position + 1) % self.frame_count]
+            else:
+                frame_interval = 1 / self.framerate
+            self.next_frame_time = max(self.next_frame_time, time.monotonic() - 1) + frame_interval
+
+        frame, frame_info = self.get_image_data()
+        self.notify_frame_sinks(frame, frame_info)
+        self.position += 1
+        return frame, frame_info
+
+    def get_image_data(self):
+        if self.recording is None:
+            return self.frames[self.position], self.frame_infos[self.position]
+        ffc_frame = self.recording.ffc_frame_for(self.position)
+        if ffc_frame is not None and ffc_frame is not self.ffc_frame:
+            self.ffc_frame = ffc_frame
+            self.ffc_frame_ready.emit()
+        return self.recording.frame(self.position), self.frame_infos[self.position]
@@ -0,0 +1,165 @@
+import time
+import numpy as np
+
+from src.drivers.base import BaseDriver, FRAME_INFO_DTYPE
+from src.drivers.acquisition import AcquisitionThread
+from src.drivers.ffc import FfcStateMachine
+from src.Radiometry import LinearCalibrationModel
+from src.utils import (
+    SHUTTER_TYPE_MONO_STABLE,
+    SHUTTER_TRIGGER_MANUAL,
+    SHUTTER_TRIGGER_TEMPERATURE,
+)
+
+
+class SyntheticCamera(BaseDriver):
+    """A camera that generates parameterized scenes instead of reading a
+    sensor: a background gradient, moving hot spots, fixed-pattern noise,
+    temporal noise and dead pixels. It has a simulated shutter so FFC works
+    the same way as on real hardware."""
+    def __init__(self, width=160, height=120, framerate=25, realtime=True,
+                 gradient=2000.0, hot_spots=3, hot_spot_amplitude=4000.0, hot_spot_size=8.0,
+                 fixed_pattern_noise=200.0, temporal_noise=20.0, dead_pixels=10,
+                 base_level=8000.0, fpa_temp_celsius=30.0, fpa_temp_drift=0.0, seed=0,
+                 threaded_acquisition=True):
+        super().__init__()
+        self.driver_name = "Synthetic Camera"
+        self.shutter_type = SHUTTER_TYPE_MONO_STABLE
+        self.supported_shutter_triggers = [SHUTTER_TRIGGER_MANUAL, SHUTTER_TRIGGER_TEMPERATURE]
+        self.frame_width = width
+        self.frame_height = height
+        self.framerate = framerate
+        self.realtime = realtime
+        self.threaded_acquisition = threaded_acquisition
+
+        self.gradient = gradient
+        self.hot_spots = hot_spots
+        self.hot_spot_amplitude = hot_spot_amplitude
+        self.hot_spot_size = hot_spot_size
+        self.fixed_pattern_noise = fixed_pattern_noise
+        self.temporal_noise = temporal_noise
+        self.dead_pixels = dead_pixels
+        self.base_level = base_level
+        self.fpa_temp_celsius = fpa_temp_celsius
+        self.fpa_temp_drift = fpa_temp_drift # degrees per second
+        self.seed = seed
+        # the scene spans base_level and up, read as 25 degrees and up
+        self.calibration_model = LinearCalibrationModel(gain=0.01, offset=base_level, reference_celsius=25.0)
+
+        self.acquisition_thread: AcquisitionThread | None = None
+        self.shutter_closed = False
+        self.frame_index = 0
+        self.next_frame_time = 0
+
+    def connect(self):
+        self.device_info = {
+            "serial_number": self.seed,
+            "fpa_width": self.frame_width,
+            "fpa_height": self.frame_height,
+            "fps": self.framerate,
+        }
+        self.frame_dims = self.frame_width, self.frame_height
+        self.rng = np.random.default_rng(self.seed)
+
+        shape = (self.frame_height, self.frame_width)
+        rows, cols = np.mgrid[0:self.frame_height, 0:self.frame_width].astype(np.float32)
+        self.rows = rows[:, 0]
+        self.cols = cols[0]
+        self.background = (self.base_level + self.gradient * cols / max(1, self.frame_width - 1)).astype(np.float32)
+        self.fixed_pattern = self.rng.normal(0, self.fixed_pattern_noise, shape).astype(np.float32)
+        self.dead_pixel_mask = np.zeros(shape, dtype=bool)
+        self.dead_pixel_mask.flat[self.rng.choice(self.frame_width*self.frame_height, self.dead_pixels, replace=False)] = True
+        self.hot_spot_phases = self.rng.uniform(0, 2*np.pi, (self.hot_spots, 2)).astype(np.float32)
+        self.hot_spot_speeds = self.rng.uniform(0.2, 1.0, (self.hot_spots, 2)).astype(np.float32)
+
+        self.scene = np.empty(shape, dtype=np.float32)
+        self.frame_view = np.empty(shape, dtype=np.uint16)
+        self.frame_info_record = np.zeros(1, dtype=FRAME_INFO_DTYPE)
+        self.ffc_frame = np.zeros(shape, dtype=np.float32)
+        self.ffc = FfcStateMachine(self.set_shutter, self.set_ffc_reference, self.framerate,
+                                   telemetry=self.telemetry)
+        self.start_time = time.monotonic()
+        self.next_frame_time = self.start_time
+
+        if self.threaded_acquisition:
+            self.acquisition_thread = AcquisitionThread(
+                self.grab_frame,
+                shape,
+                np.uint16,
+                self.read,
+                info_dtype=FRAME_INFO_DTYPE,
+                telemetry=self.telemetry,
+            )
+            self.acquisition_thread.start()
+        return self
+
+    def close(self):
+        if self.acquisition_thread is not None:
+            self.acquisition_thread.stop()
+            self.acquisition_thread = None
+
+    def read(self):
+        if self.acquisition_thread is not None:
+            frame, frame_info = self.acquisition_thread.latest()
+            if frame is None:
+                return
+            self.frame_buffer, self.frame_info = frame, frame_info
+        else:
+            self.frame_buffer, self.frame_info = self.grab_frame()
+        self.frame_ready.emit()
+
+    def grab_frame(self):
+        if self.realtime and self.framerate:
+            delay = self.next_frame_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self.next_frame_time = max(self.next_frame_time, time.monotonic() - 1) + 1 / self.framerate
+
+        frame, frame_info = self.get_image_data()
+        self.ffc.on_frame(frame, frame_info)
+        self.performing_ffc = self.ffc.performing
+        self.notify_frame_sinks(frame, frame_info)
+        return frame, frame_info
+
+    def get_image_data(self):
+        """Renders the next frame into reusable buffers, like the real driver
+        both are overwritten by the next call."""
+        elapsed = self.frame_index / self.framerate if self.framerate else 0
+        scene = self.scene
+        if self.shutter_closed:
+            scene.fill(self.base_level)
+        else:
+            np.copyto(scene, self.background)
+            for phase, speed in zip(self.hot_spot_phases, self.hot_spot_speeds):
+                center_col = (0.5 + 0.4 * np.sin(phase[0] + speed[0] * elapsed)) * self.frame_width
+                center_row = (0.5 + 0.4 * np.sin(phase[1] + speed[1] * elapsed)) * self.frame_height
+                spot_cols = np.exp(-((self.cols - center_col) / self.hot_spot_size)**2)
+                spot_rows = np.exp(-((self.rows - center_row) / self.hot_spot_size)**2)
+                scene += self.hot_spot_amplitude * np.outer(spot_rows, spot_cols)
+        scene += self.fixed_pattern
+        if self.temporal_noise:
+            scene += self.rng.standard_normal(scene.shape, dtype=np.float32) * self.temporal_noise
+        np.clip(scene, 0, 65535, out=scene)
+        np.copyto(self.frame_view, scene, casting="unsafe")
+        self.frame_view[self.dead_pixel_mask] = 0
+
+        fpa_temp_celsius = self.fpa_temp_celsius + self.fpa_temp_drift * elapsed
+        frame_info = self.frame_info_record[0]
+        frame_info["frame_index"] = self.frame_index
+        frame_info["fpa_temp"] = int(fpa_temp_celsius * 1000)
+        frame_info["fpa_temp_celsius"] = fpa_temp_celsius
+        frame_info["cam_temp_celsius"] = fpa_temp_celsius - 0.5
+        frame_info["timestamp"] = time.time()
+        self.frame_index += 1
+        return self.frame_view, frame_info
+
+    def set_ffc_frame(self, force=False):
+        if force:
+            self.ffc.request()
+
+    def set_ffc_reference(self, reference, frame_info):
+        self.ffc_frame = reference
+        self.ffc_frame_ready.emit()
+
+    def set_shutter(self, state):
+        self.shutter_closed = bool(state)
@@ -0,0 +1,115 @@
+import threading
+from typing import Callable
+from PyQt5.QtCore import (
+    Qt,
+    QObject,
+    pyqtSignal,
+    pyqtSlot,
+)
+
+from src.RingBuffer import RingBuffer
+from src.Telemetry import TELEMETRY
+
+DEFAULT_RING_CAPACITY = 8
+
+
+class FrameDispatcher(QObject):
+    """Lives in the GUI thread and turns frame notifications coming from the
+    acquisition thread into calls of `on_frame` in the GUI thread."""
+    frame_arrived = pyqtSignal()
+
+    def __init__(self, on_frame: Callable[[], None]):
+        super().__init__()
+        self.on_frame = on_frame
+        self.frame_arrived.connect(self.dispatch, Qt.ConnectionType.QueuedConnection)
+
+    @pyqtSlot()
+    def dispatch(self):
+        self.on_frame()
+
+
+class AcquisitionThread():
+    """Reads frames from a driver in a background thread as fast as the sensor
+    delivers them and stores them in a fixed-size ring buffer.
+
+    `grab_frame` blocks until a frame arrives and returns a `(frame, info)`
+    tuple, or None when the read timed out. Only one notification is queued
+    to the GUI thread at a time, so a busy GUI always gets the newest frame
+    and never slows capture down."""
+    def __init__(self, grab_frame: Callable, frame_shape: tuple, dtype,
+                 on_frame: Callable[[], None], capacity=DEFAULT_RING_CAPACITY, info_dtype=object, telemetry=TELEMETRY):
+        self.grab_frame = grab_frame
+        self.ring_buffer = RingBuffer(capacity, frame_shape, dtype, info_dtype)
+        self.dispatcher = FrameDispatcher(self._dispatch)
+        self.on_frame = on_frame
+        self.telemetry = telemetry
+
+        self.frames_acquired = 0
+        self.frames_dropped = 0
+        self.frames_skipped = 0
+        self.last_frame_index = None
+        self.last_dispatched_sequence = 0
+
+        self._running = threading.Event()
+        self._dispatch_pending = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._running.set()
+        self._thread = threading.Thread(target=self._run, name="AcquisitionThread", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        self._running.clear()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    @property
+    def running(self):
+        return self._running.is_set()
+
+    def latest(self):
+        frame, info, sequence = self.ring_buffer.latest()
+        return frame, info
+
+    def _run(self):
+        while self._running.is_set():
+            started = self.telemetry.start()
+            result = self.grab_frame()
+            if result is None:
+                continue
+            frame, info = result
+            self.ring_buffer.push(frame, info)
+            self._count_drops(info)
+            self.frames_acquired += 1
+            self.telemetry.stop("acquisition", started)
+            self.telemetry.tick("acquired")
+
+            if not self._dispatch_pending.is_set():
+                self._dispatch_pending.set()
+                self.dispatcher.frame_arrived.emit()
+
+    def _count_drops(self, info):
+        # the sensor numbers every frame, so gaps in the index are lost frames
+        frame_index = int(info["frame_index"])
+        if self.last_frame_index is not None and frame_index > self.last_frame_index + 1:
+            self.frames_dropped += frame_index - self.last_frame_index - 1
+            self.telemetry.set_value("frames_dropped", self.frames_dropped)
+        self.last_frame_index = frame_index
+        if self.telemetry.enabled:
+            # frames the camera itself reports as dropped
+            self.telemetry.set_value("int_drop", int(info["int_drop"]))
+
+    def _dispatch(self):
+        self._dispatch_pending.clear()
+        sequence = self.ring_buffer.sequence
+        if sequence == self.last_dispatched_sequence:
+            return
+        if self.last_dispatched_sequence:
+            self.frames_skipped += sequence - self.last_dispatched_sequence - 1
+            self.telemetry.set_value("frames_skipped", self.frames_skipped)
+        self.last_dispatched_sequence = sequence
+        self.on_frame()
@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
 from numpy import ndarray
+from src.drivers.frame_info import FRAME_INFO_DTYPE
+from src.Telemetry import TELEMETRY
 from src.utils import Signal
 
 class BaseDriver(ABC):
@@ -14,9 +16,15 @@ class BaseDriver(ABC):
         self.frame_buffer: ndarray = None
         self.frame_info = None
         self.ffc_frame: ndarray = None
+        # a radiometric CalibrationModel, when the device is calibrated
+        self.calibration_model = None
         self.performing_ffc = False
         self.frame_ready = Signal()
         self.ffc_frame_ready = Signal()
+        # callables receiving (frame, frame_info) for every acquired frame, in
+        # the acquisition thread, before any frame is skipped for display
+        self.frame_sinks = []
+        self.telemetry = TELEMETRY
 
     @abstractmethod
     def connect(self):
@@ -29,3 +37,13 @@ class BaseDriver(ABC):
     @abstractmethod
     def read(self):
         pass
+
+    def add_frame_sink(self, sink):
+        self.frame_sinks = [*self.frame_sinks, sink]
+
+    def remove_frame_sink(self, sink):
+        self.frame_sinks = [s for s in self.frame_sinks if s != sink]
+
+    def notify_frame_sinks(self, frame: ndarray, frame_info):
+        for sink in self.frame_sinks:
+            sink(frame, frame_info)
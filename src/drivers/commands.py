@@ -0,0 +1,101 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable
+
+from src.Telemetry import TELEMETRY
+
+DEFAULT_COMMAND_TIMEOUT = 800 # ms
+
+
+def response_code(response) -> int:
+    """The code in the first little-endian word of a response."""
+    return int.from_bytes(bytes(response[:4]), "little")
+
+
+class CommandChannel():
+    """Sends commands to a device from a background thread, one at a time
+    and in the order they were submitted, so callers never block on USB.
+
+    `submit` returns a Future resolved with the response, or with None when
+    no response is read. When an expected response code is given, responses
+    with another code, like the late answer to a command that timed out, are
+    discarded until the expected one arrives or the timeout runs out.
+
+    `write(payload, timeout_ms)` and `read(timeout_ms)` do the transfers and
+    raise on errors, which are set on the Future of the failed command."""
+    def __init__(self, write: Callable[[bytes, int], object], read: Callable[[int], object], name="CommandChannel"):
+        self.write = write
+        self.read = read
+        self.name = name
+        self.telemetry = TELEMETRY
+        self.responses_discarded = 0
+
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        """Cancels the commands still queued and stops the thread once the
+        command in flight is done."""
+        if self._thread is None:
+            return
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is not None:
+                request[0].cancel()
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def submit(self, payload: bytes, expected_response: int | None = None,
+               timeout=DEFAULT_COMMAND_TIMEOUT, read_response=True) -> Future:
+        if self._thread is None:
+            raise RuntimeError(f"{self.name} is not running")
+        future = Future()
+        self._queue.put((future, bytes(payload), expected_response, timeout, read_response))
+        return future
+
+    def _run(self):
+        while True:
+            request = self._queue.get()
+            if request is None:
+                return
+            future, payload, expected_response, timeout, read_response = request
+            if not future.set_running_or_notify_cancel():
+                continue
+            started = self.telemetry.start()
+            try:
+                result = self._transfer(payload, expected_response, timeout, read_response)
+            except BaseException as error:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+            self.telemetry.stop("command", started)
+
+    def _transfer(self, payload: bytes, expected_response: int | None, timeout: int, read_response: bool):
+        deadline = time.monotonic() + timeout / 1000
+        self.write(payload, timeout)
+        if not read_response:
+            return None
+        while True:
+            remaining = max(1, int((deadline - time.monotonic()) * 1000))
+            response = self.read(remaining)
+            if expected_response is None or response_code(response) == expected_response:
+                return response
+            self.responses_discarded += 1
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"No response {expected_response:#010x} to command {response_code(payload):#010x}")
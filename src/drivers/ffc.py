@@ -0,0 +1,97 @@
+import math
+import time
+from typing import Callable
+import numpy as np
+
+from src.Telemetry import TELEMETRY
+
+FFC_IDLE = 0
+FFC_CLOSING = 1 # shutter closed, waiting for it to settle
+FFC_ACCUMULATING = 2 # shutter settled, averaging frames into the reference
+FFC_OPENING = 3 # shutter open again, waiting for it to settle
+
+DEFAULT_CLOSE_SETTLE_MS = 410
+DEFAULT_OPEN_SETTLE_MS = 140
+DEFAULT_AVERAGED_FRAMES = 4
+DEFAULT_TEMPERATURE_THRESHOLD = 0.3
+
+
+def settle_frames(settle_ms: float, framerate: float) -> int:
+    return max(1, math.ceil(settle_ms * framerate / 1000))
+
+
+class FfcStateMachine():
+    """Flat field correction driven by incoming frames.
+
+    `on_frame` must be called for every new frame. It never blocks: the
+    shutter is closed, a number of frames is skipped while it settles, the
+    next `averaged_frames` frames are averaged into the reference and the
+    shutter is opened again. The temperature trigger is evaluated on the
+    `frame_info` of each idle frame."""
+    def __init__(self, set_shutter: Callable[[int], object], on_reference: Callable[[np.ndarray, object], None],
+                 framerate: float, averaged_frames=DEFAULT_AVERAGED_FRAMES,
+                 close_settle_ms=DEFAULT_CLOSE_SETTLE_MS, open_settle_ms=DEFAULT_OPEN_SETTLE_MS, telemetry=TELEMETRY):
+        self.set_shutter = set_shutter
+        self.on_reference = on_reference
+        self.averaged_frames = averaged_frames
+        self.close_settle_frames = settle_frames(close_settle_ms, framerate)
+        self.open_settle_frames = settle_frames(open_settle_ms, framerate)
+
+        self.temperature_trigger = True
+        self.temperature_threshold = DEFAULT_TEMPERATURE_THRESHOLD
+        self.last_ffc_temp = 0
+        self.last_ffc_timestamp = 0
+        self.last_ffc_duration = 0
+
+        self.telemetry = telemetry
+        self.state = FFC_IDLE
+        self.requested = False
+        self.frames_in_state = 0
+        self.started_at = 0
+        self.accumulator: np.ndarray | None = None
+
+    @property
+    def performing(self):
+        return self.state != FFC_IDLE
+
+    def request(self):
+        self.requested = True
+
+    def on_frame(self, frame: np.ndarray, frame_info):
+        self.frames_in_state += 1
+
+        if self.state == FFC_IDLE:
+            ffc_temp_diff = frame_info["fpa_temp_celsius"] - self.last_ffc_temp
+            if self.requested or (self.temperature_trigger and abs(ffc_temp_diff) > self.temperature_threshold):
+                self.requested = False
+                self.started_at = time.monotonic()
+                self.set_shutter(1)
+                self._enter(FFC_CLOSING)
+
+        elif self.state == FFC_CLOSING:
+            if self.frames_in_state >= self.close_settle_frames:
+                if self.accumulator is None or self.accumulator.shape != frame.shape:
+                    self.accumulator = np.zeros(frame.shape, dtype=np.float32)
+                self.accumulator.fill(0)
+                self._enter(FFC_ACCUMULATING)
+
+        elif self.state == FFC_ACCUMULATING:
+            self.accumulator += frame
+            if self.frames_in_state >= self.averaged_frames:
+                reference = self.accumulator / self.frames_in_state
+                self.last_ffc_temp = float(frame_info["fpa_temp_celsius"])
+                self.last_ffc_timestamp = time.time()
+                self.on_reference(reference, frame_info)
+                self.set_shutter(0)
+                self._enter(FFC_OPENING)
+
+        elif self.state == FFC_OPENING:
+            if self.frames_in_state >= self.open_settle_frames:
+                self.last_ffc_duration = time.monotonic() - self.started_at
+                if self.telemetry.enabled:
+                    self.telemetry.record("ffc_stall", self.last_ffc_duration)
+                self._enter(FFC_IDLE)
+
+    def _enter(self, state):
+        self.state = state
+        self.frames_in_state = 0
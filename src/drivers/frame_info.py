@@ -0,0 +1,12 @@
+import numpy as np
+
+# Per-frame metadata record shared by all drivers
+FRAME_INFO_DTYPE = np.dtype([
+    ("code", "<u4"),
+    ("frame_index", "<u4"),
+    ("fpa_temp", "<u4"),
+    ("int_drop", "<u4"),
+    ("cam_temp_celsius", "<f4"),
+    ("fpa_temp_celsius", "<f4"),
+    ("timestamp", "<f8"), # seconds since the epoch
+])
@@ -0,0 +1,77 @@
+"""Loads the Qt Designer forms in `ui/`.
+
+Compiling a `.ui` file at runtime with `loadUiType` parses the XML and
+generates code on every start. Instead each form is compiled once with
+`pyuic5`'s compiler into `src/compiled_ui/`, tagged with a hash of its
+`.ui` file, and imported from there while the hash matches. When the
+compiled module can't be written the form falls back to `loadUiType`.
+
+Run `python -m src.forms` to compile every form ahead of time, for
+example when installing to a read-only location.
+"""
+import hashlib
+import importlib.util
+import io
+import os
+import sys
+
+UI_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ui")
+COMPILED_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "compiled_ui")
+DIGEST_PREFIX = "# ui digest: "
+
+
+def ui_digest(ui_path: str) -> str:
+    with open(ui_path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def compiled_path(name: str) -> str:
+    return os.path.join(COMPILED_DIRECTORY, f"{name}.py")
+
+
+def compile_form(name: str) -> str:
+    """Compiles `ui/<name>.ui` and returns the path of the module."""
+    from PyQt5.uic import compileUi
+    ui_path = os.path.join(UI_DIRECTORY, f"{name}.ui")
+    code = io.StringIO()
+    with open(ui_path) as ui_file:
+        compileUi(ui_file, code, from_imports=False)
+    path = compiled_path(name)
+    os.makedirs(COMPILED_DIRECTORY, exist_ok=True)
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, "w") as f:
+        f.write(f"{DIGEST_PREFIX}{ui_digest(ui_path)}\n")
+        f.write(code.getvalue())
+    os.replace(temporary_path, path)
+    return path
+
+
+def is_current(name: str) -> bool:
+    try:
+        with open(compiled_path(name)) as f:
+            first_line = f.readline().strip()
+    except OSError:
+        return False
+    return first_line == DIGEST_PREFIX + ui_digest(os.path.join(UI_DIRECTORY, f"{name}.ui"))
+
+
+def load_form(name: str):
+    """Returns the form class of `ui/<name>.ui`."""
+    if not is_current(name):
+        try:
+            compile_form(name)
+        except OSError:
+            from PyQt5.uic import loadUiType
+            return loadUiType(os.path.join(UI_DIRECTORY, f"{name}.ui"))[0]
+
+    spec = importlib.util.spec_from_file_location(f"src.compiled_ui.{name}", compiled_path(name))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return next(value for key, value in vars(module).items() if key.startswith("Ui_"))
+
+
+if __name__ == "__main__":
+    for file_name in sorted(os.listdir(UI_DIRECTORY)):
+        if file_name.endswith(".ui"):
+            print(compile_form(file_name[:-len(".ui")]))
+    sys.exit(0)
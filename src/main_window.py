@@ -1,9 +1,7 @@
-import os
 import traceback
 import sys
 import cv2
 
-from PyQt5.uic import loadUiType
 from PyQt5.QtWidgets import (
     QMainWindow,
     QPushButton,
@@ -15,33 +13,40 @@ from PyQt5.QtWidgets import (
     QGroupBox,
     QStatusBar,
 )
-from PyQt5.QtGui import QPixmap
 from PyQt5.QtCore import (
     Qt,
+    QTimer,
 )
 
-from src.blind_pixel_detection_window import BlindPixelDetectionWindow
 from src.Compositor import Compositor
+from src.Palette import CUSTOM_PALETTES
 from src.Calibrator import Calibrator
-from src.drivers.MAG160Core import Mag160Core
+from src.FrameCanvas import FrameCanvas
+from src.drivers.base import BaseDriver
+from src.forms import load_form
+from src.Telemetry import TELEMETRY
 from src.utils import (
     GeneralSettings,
     COLORMAPS,
     SHUTTER_TRIGGERS,
     matlike_to_pixmap,
+    signals_blocked,
 )
 
-FORM_CLASS, _ = loadUiType(os.path.join(
-    os.path.dirname(__file__), '../ui/main_window.ui'))
+STATUS_INTERVAL_MS = 1000
+STATUS_STAGES = ["ffc", "denoise", "blind_pixel", "span", "transform", "colorize", "radiometry", "render", "paint"]
+
+FORM_CLASS = load_form("main_window")
 
 class MainWindow(QMainWindow, FORM_CLASS):
-    canvasLabel: QLabel
+    frameCanvas: FrameCanvas
 
     captureButton: QPushButton
     recordButton: QPushButton
 
     triggerFfcButton: QPushButton
     freezeViewportCheckBox: QCheckBox
+    temporalDenoiseCheckBox: QCheckBox
     ffcModeComboBox: QComboBox
 
     manualSpanGroupBox: QGroupBox
@@ -63,32 +68,37 @@ class MainWindow(QMainWindow, FORM_CLASS):
 
     statusbar: QStatusBar
 
-    def __init__(self):
+    def __init__(self, device: BaseDriver | None = None):
         super(MainWindow, self).__init__()
         self.setupUi(self)
 
-        self.blind_pixel_detection_window = BlindPixelDetectionWindow(self)
+        # built on first use, most sessions never open it
+        self.blind_pixel_detection_window = None
 
         self.settings = GeneralSettings()
+        self.telemetry = TELEMETRY
+        self.telemetry.enabled = True
 
-        self.selected_camera = Mag160Core()
+        if device is None:
+            from src.drivers.MAG160Core import Mag160Core
+            device = Mag160Core()
+        self.selected_camera = device
         self.selected_camera.connect()
 
         self.calibrator = Calibrator()
         self.calibrator.settings = self.settings
-        self.calibrator.current_device = self.selected_camera
-        self.blind_pixel_detection_window.set_calibrator(self.calibrator)
+        self.calibrator.assign_device(self.selected_camera)
 
         self.compositor = Compositor()
         self.compositor.settings = self.settings
         self.compositor.assign_device(self.selected_camera)
         self.compositor.calibrator = self.calibrator
 
-        blank_canvas = QPixmap(640, 480)
-        blank_canvas.fill(Qt.black)
-        self.canvasLabel.setPixmap(blank_canvas)
+        self.frameCanvas.telemetry = self.telemetry
+        self.palette_ruler_key = None
 
         self.freezeViewportCheckBox.stateChanged.connect(self.set_settings_from_form)
+        self.temporalDenoiseCheckBox.stateChanged.connect(self.set_settings_from_form)
         self.manualSpanGroupBox.toggled.connect(self.set_settings_from_form)
         self.sliderRangeMinimumDoubleSpinBox.valueChanged.connect(self.span_range_event)
         self.sliderRangeMaximumDoubleSpinBox.valueChanged.connect(self.span_range_event)
@@ -106,31 +116,69 @@ class MainWindow(QMainWindow, FORM_CLASS):
         self.triggerFfcButton.clicked.connect(lambda: self.selected_camera.set_ffc_frame(True))
         self.selected_camera.frame_ready.connect(self.update_frame)
 
-        self.blindPixelDetectionButton.clicked.connect(self.blind_pixel_detection_window.show)
+        self.blindPixelDetectionButton.clicked.connect(self.show_blind_pixel_detection_window)
+
+        self.telemetry.set_value("target_fps", self.selected_camera.framerate)
+        self.status_timer = QTimer(self)
+        self.status_timer.timeout.connect(self.update_status)
+        self.status_timer.start(STATUS_INTERVAL_MS)
 
         self.update_fields()
 
     def update_frame(self):
         frame = self.compositor.read()
-        pixmap = matlike_to_pixmap(frame)
-        pixmap = pixmap.scaled(self.canvasLabel.size(), Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.FastTransformation)
-        self.canvasLabel.setPixmap(pixmap)
+        started = self.telemetry.start()
+        self.frameCanvas.set_frame(frame)
+        self.telemetry.stop("render", started)
 
         if not self.settings.manual_span:
-            self.spanStartSlider.setValue(int(self.compositor.last_frame_properties.min_value*10))
-            self.spanStartDoubleSpinBox.setValue(self.compositor.last_frame_properties.min_value)
-            self.spanEndSlider.setValue(int(self.compositor.last_frame_properties.max_value*10))
-            self.spanEndDoubleSpinBox.setValue(self.compositor.last_frame_properties.max_value)
+            self.show_automatic_span(self.compositor.last_frame_properties.min_value,
+                                     self.compositor.last_frame_properties.max_value)
+
+    def show_automatic_span(self, span_start: float, span_end: float):
+        # set from code, the span handlers would write the settings back and
+        # redraw for every widget
+        with signals_blocked(self.spanStartSlider, self.spanStartDoubleSpinBox,
+                             self.spanEndSlider, self.spanEndDoubleSpinBox):
+            self.spanStartSlider.setValue(int(span_start*10))
+            self.spanStartDoubleSpinBox.setValue(span_start)
+            self.spanEndSlider.setValue(int(span_end*10))
+            self.spanEndDoubleSpinBox.setValue(span_end)
+        self.settings.span_range[0] = self.spanStartDoubleSpinBox.value()
+        self.settings.span_range[1] = self.spanEndDoubleSpinBox.value()
+
+    def show_blind_pixel_detection_window(self):
+        if self.blind_pixel_detection_window is None:
+            from src.blind_pixel_detection_window import BlindPixelDetectionWindow
+            self.blind_pixel_detection_window = BlindPixelDetectionWindow(self)
+            self.blind_pixel_detection_window.set_calibrator(self.calibrator)
+        self.blind_pixel_detection_window.show()
+
+    def update_status(self):
+        message = self.telemetry.summary(STATUS_STAGES)
+        properties = self.compositor.last_frame_properties
+        if properties.spot_temperature is not None:
+            message = (f"spot {properties.spot_temperature:.1f} °C | "
+                       f"span {properties.min_temperature:.1f} to {properties.max_temperature:.1f} °C | {message}")
+        self.statusbar.showMessage(message)
 
     def update_palette_ruler(self):
+        self.palette_ruler_key = (self.settings.color_palette, self.settings.invert_colors)
         frame = self.compositor.get_palette_ruler()
         pixmap = matlike_to_pixmap(frame)
         pixmap = pixmap.scaled(self.paletteRulerLabel.size(), Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.FastTransformation)
         self.paletteRulerLabel.setPixmap(pixmap)
 
+    def load_palette(self, path: str):
+        name = self.compositor.load_palette(path)
+        if self.colorPaletteComboBox.findText(name) < 0:
+            self.colorPaletteComboBox.addItem(name)
+        self.colorPaletteComboBox.setCurrentText(name)
+
     def update_fields(self):
         self.colorPaletteComboBox.clear()
         self.colorPaletteComboBox.addItems(COLORMAPS.keys())
+        self.colorPaletteComboBox.addItems([name for name in CUSTOM_PALETTES if name not in COLORMAPS])
         
         self.sliderRangeMinimumDoubleSpinBox.setValue(self.settings.slider_range[0])
         self.sliderRangeMaximumDoubleSpinBox.setValue(self.settings.slider_range[1])
@@ -145,6 +193,7 @@ class MainWindow(QMainWindow, FORM_CLASS):
     def set_settings_from_form(self):
         self.settings.freeze_on_ffc = self.freezeViewportCheckBox.isChecked()
         self.settings.ffc_mode = self.ffcModeComboBox.currentText()
+        self.settings.temporal_denoise = self.temporalDenoiseCheckBox.isChecked()
 
         self.settings.manual_span = self.manualSpanGroupBox.isChecked()
         self.settings.span_range[0] = self.spanStartDoubleSpinBox.value()
@@ -152,23 +201,28 @@ class MainWindow(QMainWindow, FORM_CLASS):
         # self.settings.slider_range[0] = self.sliderRangeMinimumDoubleSpinBox.value()
         # self.settings.slider_range[1] = self.sliderRangeMaximumDoubleSpinBox.value()
         
-        self.settings.color_palette = COLORMAPS[self.colorPaletteComboBox.currentText()]
+        # custom palettes are looked up by name
+        palette = self.colorPaletteComboBox.currentText()
+        self.settings.color_palette = COLORMAPS.get(palette, palette)
         self.settings.invert_colors = self.invertPaletteCheckBox.isChecked()
         self.settings.rotation = self.rotateComboBox.currentIndex()
         self.settings.flip = self.flipComboBox.currentIndex()
 
-        self.update_palette_ruler()
+        if (self.settings.color_palette, self.settings.invert_colors) != self.palette_ruler_key:
+            self.update_palette_ruler()
 
     def span_slider_event(self):
         span_start = self.spanStartSlider.value()/10
         span_end = self.spanEndSlider.value()/10
-        self.spanStartDoubleSpinBox.setValue(span_start)
-        self.spanEndDoubleSpinBox.setValue(span_end)
+        with signals_blocked(self.spanStartDoubleSpinBox, self.spanEndDoubleSpinBox):
+            self.spanStartDoubleSpinBox.setValue(span_start)
+            self.spanEndDoubleSpinBox.setValue(span_end)
         self.set_settings_from_form()
 
     def span_spinbox_event(self):
-        self.spanStartSlider.setValue(int(self.spanStartDoubleSpinBox.value()*10))
-        self.spanEndSlider.setValue(int(self.spanEndDoubleSpinBox.value()*10))
+        with signals_blocked(self.spanStartSlider, self.spanEndSlider):
+            self.spanStartSlider.setValue(int(self.spanStartDoubleSpinBox.value()*10))
+            self.spanEndSlider.setValue(int(self.spanEndDoubleSpinBox.value()*10))
         self.set_settings_from_form()
 
     def span_range_event(self):
@@ -188,6 +242,11 @@ class MainWindow(QMainWindow, FORM_CLASS):
             self.recordButton.setText("Stop Recording")
             self.transformGroupBox.setEnabled(False)
 
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self.palette_ruler_key is not None:
+            self.update_palette_ruler()
+
     def closeEvent(self, event):
         # self.selected_camera.close()
         ...
\ No newline at end of file
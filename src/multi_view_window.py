@@ -0,0 +1,104 @@
+import math
+
+from PyQt5.QtWidgets import (
+    QMainWindow,
+    QPushButton,
+    QComboBox,
+    QGroupBox,
+    QGridLayout,
+    QVBoxLayout,
+    QStatusBar,
+)
+from PyQt5.QtCore import QTimer
+
+from src.Compositor import RECORDING_FORMAT_VIDEO, RECORDING_FORMAT_RAW, RECORDING_FORMAT_TRIGGERED
+from src.DeviceManager import DeviceManager, DevicePipeline
+from src.FrameCanvas import FrameCanvas
+from src.forms import load_form
+from src.settings import COLORMAPS
+
+STATUS_INTERVAL_MS = 1000
+
+FORM_CLASS = load_form("multi_view_window")
+
+class MultiViewWindow(QMainWindow, FORM_CLASS):
+    """Shows every device of a DeviceManager in a grid of tiles."""
+    recordButton: QPushButton
+    recordingFormatComboBox: QComboBox
+    triggerFfcButton: QPushButton
+    colorPaletteComboBox: QComboBox
+    tileLayout: QGridLayout
+    statusbar: QStatusBar
+
+    def __init__(self, device_manager: DeviceManager):
+        super(MultiViewWindow, self).__init__()
+        self.setupUi(self)
+        self.device_manager = device_manager
+        self.canvases: dict[int, FrameCanvas] = {}
+
+        self.recordingFormatComboBox.addItems([RECORDING_FORMAT_VIDEO, RECORDING_FORMAT_RAW, RECORDING_FORMAT_TRIGGERED])
+        self.colorPaletteComboBox.addItems(COLORMAPS.keys())
+        self.colorPaletteComboBox.setCurrentIndex(
+            list(COLORMAPS.values()).index(self.device_manager.settings.color_palette))
+        self.colorPaletteComboBox.currentIndexChanged.connect(self.palette_event)
+        self.recordButton.clicked.connect(self.record_button_event)
+        self.triggerFfcButton.clicked.connect(self.trigger_ffc_event)
+
+        self.update_tiles()
+        self.device_manager.on_frame = self.update_frame
+
+        self.status_timer = QTimer(self)
+        self.status_timer.timeout.connect(self.update_status)
+        self.status_timer.start(STATUS_INTERVAL_MS)
+
+    def update_tiles(self):
+        """Lays the devices out in a grid as close to square as possible."""
+        while self.tileLayout.count():
+            self.tileLayout.takeAt(0).widget().deleteLater()
+        self.canvases = {}
+        pipelines = list(self.device_manager)
+        columns = max(1, math.ceil(math.sqrt(len(pipelines))))
+        for index, pipeline in enumerate(pipelines):
+            tile = QGroupBox(f"{pipeline.device.driver_name} {pipeline.serial_number}")
+            tile_layout = QVBoxLayout(tile)
+            canvas = FrameCanvas(tile)
+            canvas.telemetry = pipeline.telemetry
+            tile_layout.addWidget(canvas)
+            self.tileLayout.addWidget(tile, index // columns, index % columns)
+            self.canvases[pipeline.serial_number] = canvas
+
+    def update_frame(self, pipeline: DevicePipeline):
+        canvas = self.canvases.get(pipeline.serial_number)
+        frame = pipeline.latest_frame()
+        if canvas is not None and frame is not None:
+            canvas.set_frame(frame)
+
+    def update_status(self):
+        parts = []
+        for pipeline in self.device_manager:
+            snapshot = pipeline.telemetry.snapshot()
+            parts.append(f"{pipeline.serial_number}: {snapshot.get('acquired_fps', 0):.1f}/"
+                         f"{snapshot.get('target_fps', 0):.0f} fps, render {snapshot.get('render_p50_ms', 0):.2f} ms")
+        self.statusbar.showMessage(" | ".join(parts))
+
+    def palette_event(self):
+        self.device_manager.settings.color_palette = COLORMAPS[self.colorPaletteComboBox.currentText()]
+
+    def trigger_ffc_event(self):
+        for pipeline in self.device_manager:
+            pipeline.device.set_ffc_frame(True)
+
+    def record_button_event(self):
+        if self.device_manager.recording:
+            self.device_manager.stop_recording()
+            self.recordButton.setText("Record All")
+            self.recordingFormatComboBox.setEnabled(True)
+        else:
+            self.device_manager.start_recording(self.recordingFormatComboBox.currentText())
+            self.recordButton.setText("Stop Recording")
+            self.recordingFormatComboBox.setEnabled(False)
+
+    def closeEvent(self, event):
+        self.status_timer.stop()
+        self.device_manager.on_frame = None
+        super().closeEvent(event)
@@ -0,0 +1,436 @@
+"""Streams frames to network clients without the Qt GUI.
+
+A client connects over TCP and sends one JSON line with its subscription,
+for example `{"format": "jpeg", "decimation": 2, "roi": [0, 0, 80, 60]}`.
+The server answers with one JSON line, the accepted subscription or an
+`error`, followed by a stream of frame messages: a `FRAME_HEADER`, the
+`FRAME_INFO_DTYPE` record of the frame and the payload.
+
+Run headless with `python -m src.server --synthetic --port 5600`.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+
+from src.drivers.base import BaseDriver, FRAME_INFO_DTYPE
+from src.Palette import PaletteEngine, CUSTOM_PALETTES
+from src.RingBuffer import RingBuffer
+from src.utils import COLORMAPS
+
+FORMAT_RAW = "raw" # little-endian uint16 counts
+FORMAT_COLOR = "color" # BGR uint8
+FORMAT_JPEG = "jpeg" # colorized, JPEG encoded
+
+FORMAT_CODES = {FORMAT_RAW: 0, FORMAT_COLOR: 1, FORMAT_JPEG: 2}
+
+# magic, format code, channels, reserved, width, height, sequence, payload size
+FRAME_HEADER = struct.Struct("<4sBBHIIQI")
+FRAME_MAGIC = b"IRFS"
+
+DEFAULT_PORT = 5600
+DEFAULT_PALETTE = "COLORMAP_INFERNO"
+DEFAULT_JPEG_QUALITY = 85
+SERVER_RING_CAPACITY = 4
+MAX_SUBSCRIPTION_SIZE = 4096
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription():
+    """What a client wants to receive. Clients with equal `variant` share
+    one encoded message per frame."""
+    def __init__(self, format=FORMAT_RAW, decimation=1, roi=None, palette=DEFAULT_PALETTE,
+                 quality=DEFAULT_JPEG_QUALITY):
+        if format not in FORMAT_CODES:
+            raise ValueError(f"Unknown format {format!r}")
+        if int(decimation) < 1:
+            raise ValueError("decimation must be at least 1")
+        if roi is not None:
+            roi = tuple(int(value) for value in roi)
+            if len(roi) != 4 or roi[2] <= 0 or roi[3] <= 0 or roi[0] < 0 or roi[1] < 0:
+                raise ValueError("roi must be [x, y, width, height]")
+        if palette not in COLORMAPS and palette not in CUSTOM_PALETTES:
+            raise ValueError(f"Unknown palette {palette!r}")
+        self.format = format
+        self.decimation = int(decimation)
+        self.roi = roi
+        self.palette = palette
+        self.quality = int(quality)
+
+    @classmethod
+    def from_json(cls, line: bytes):
+        options = json.loads(line) if line.strip() else {}
+        if not isinstance(options, dict):
+            raise ValueError("The subscription must be a JSON object")
+        return cls(**options)
+
+    def to_dict(self):
+        return {
+            "format": self.format,
+            "decimation": self.decimation,
+            "roi": list(self.roi) if self.roi is not None else None,
+            "palette": self.palette,
+            "quality": self.quality,
+        }
+
+    @property
+    def variant(self):
+        if self.format == FORMAT_RAW:
+            return self.format, self.roi
+        return self.format, self.roi, self.palette, self.quality if self.format == FORMAT_JPEG else None
+
+
+class ClientConnection():
+    """One connected client. Holds at most one message waiting to be sent, so
+    a slow client skips frames instead of queueing them."""
+    def __init__(self, writer: asyncio.StreamWriter, subscription: Subscription):
+        self.writer = writer
+        self.subscription = subscription
+        self.next_sequence = 0
+        self.pending: bytes | None = None
+        self.wakeup = asyncio.Event()
+
+        self.frames_sent = 0
+        self.frames_skipped = 0
+        self.closed = False
+
+    def close(self):
+        """Ends `send_loop`, the connection is closed by its handler."""
+        self.closed = True
+        self.wakeup.set()
+
+    def offer(self, message: bytes):
+        if self.pending is not None:
+            self.frames_skipped += 1
+        self.pending = message
+        self.wakeup.set()
+
+    async def send_loop(self):
+        while True:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            if self.closed:
+                return
+            message, self.pending = self.pending, None
+            if message is None:
+                continue
+            self.writer.write(message)
+            await self.writer.drain()
+            self.frames_sent += 1
+
+
+class FrameServer():
+    """Serves the frames of a driver to any number of TCP clients.
+
+    `publish` is meant to be registered as a frame sink: it copies the frame
+    into a small ring buffer in the acquisition thread and wakes the server's
+    event loop, which runs in its own thread. Every frame is encoded once per
+    distinct subscription variant, and only if a client will receive it.
+    Encoding runs on a worker thread so the event loop keeps sending, and
+    colorized variants are FFC corrected like the viewer's frames."""
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT):
+        self.host = host
+        self.port = port
+        self.palette_engine = PaletteEngine()
+        self.clients: list[ClientConnection] = []
+        self.ring_buffer: RingBuffer | None = None
+        # the reference of the newest frame, and the one its mean belongs to
+        self.ffc_frame: np.ndarray | None = None
+        self.ffc_reference: np.ndarray | None = None
+        self.ffc_reference_mean = np.float32(0)
+
+        self.frames_published = 0
+        self.frames_encoded = 0
+
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.server: asyncio.base_events.Server | None = None
+        self._started = threading.Event()
+        self._error: Exception | None = None
+        self._broadcast_pending = threading.Event()
+        self._broadcast_task: asyncio.Task | None = None
+        self._encoder: ThreadPoolExecutor | None = None
+        self._thread: threading.Thread | None = None
+        self._device: BaseDriver | None = None
+
+    # Lifecycle
+
+    def start(self):
+        """Starts the event loop thread and returns once the server listens.
+        With port 0 the assigned port is stored in `port`."""
+        if self._thread is not None:
+            return self
+        # one thread, the palette engine and the FFC mean aren't shared
+        self._encoder = ThreadPoolExecutor(1, thread_name_prefix="FrameServerEncode")
+        self._thread = threading.Thread(target=self._run, name="FrameServer", daemon=True)
+        self._thread.start()
+        self._started.wait()
+        if self._error is not None:
+            self._thread.join()
+            self._thread = None
+            self._encoder.shutdown()
+            raise self._error
+        return self
+
+    def stop(self):
+        if self._device is not None:
+            self.detach()
+        if self._thread is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self._thread = None
+        self._encoder.shutdown()
+
+    def attach(self, device: BaseDriver):
+        self._device = device
+        device.add_frame_sink(self.publish)
+
+    def detach(self):
+        self._device.remove_frame_sink(self.publish)
+        self._device = None
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        try:
+            self.loop.run_until_complete(self._listen())
+        except OSError as error:
+            self._error = error
+            self.loop.close()
+            return
+        finally:
+            self._started.set()
+        self.loop.run_forever()
+        self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+        self.loop.close()
+
+    async def _listen(self):
+        self.server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def _close(self):
+        self.server.close()
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.server.wait_closed()
+
+    # Acquisition thread
+
+    def publish(self, frame: np.ndarray, frame_info):
+        if not self.clients:
+            return
+        if self.ring_buffer is None or self.ring_buffer.frames.shape[1:] != frame.shape:
+            self.ring_buffer = RingBuffer(SERVER_RING_CAPACITY, frame.shape, frame.dtype, FRAME_INFO_DTYPE)
+        self.ring_buffer.push(frame, frame_info)
+        self.ffc_frame = self._device.ffc_frame if self._device is not None else None
+        self.frames_published += 1
+        # one wakeup at a time, the loop always takes the newest frame
+        if not self._broadcast_pending.is_set():
+            self._broadcast_pending.set()
+            self.loop.call_soon_threadsafe(self._broadcast)
+
+    # Event loop thread
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        peer = writer.get_extra_info("peername")
+        try:
+            line = await reader.readuntil(b"\n")
+            if len(line) > MAX_SUBSCRIPTION_SIZE:
+                raise ValueError("Subscription too long")
+            subscription = Subscription.from_json(line)
+            if subscription.roi is not None and self.ring_buffer is not None:
+                clip_roi(subscription.roi, self.ring_buffer.frames.shape[1:])
+        except (ValueError, TypeError, asyncio.IncompleteReadError, asyncio.LimitOverrunError) as error:
+            writer.write(json.dumps({"error": str(error)}).encode() + b"\n")
+            writer.close()
+            return
+
+        writer.write(json.dumps(subscription.to_dict()).encode() + b"\n")
+        client = ClientConnection(writer, subscription)
+        self.clients = [*self.clients, client]
+        logger.info("Client %s subscribed to %s", peer, subscription.to_dict())
+        try:
+            await client.send_loop()
+        except ConnectionError:
+            pass
+        finally:
+            self.clients = [c for c in self.clients if c is not client]
+            writer.close()
+            logger.info("Client %s left after %d frames, %d skipped", peer, client.frames_sent, client.frames_skipped)
+
+    def _broadcast(self):
+        self._broadcast_pending.clear()
+        # the running broadcast picks up the newest frame when it is done
+        if self._broadcast_task is None or self._broadcast_task.done():
+            self._broadcast_task = self.loop.create_task(self._broadcast_latest())
+
+    async def _broadcast_latest(self):
+        sent = None
+        while True:
+            self._broadcast_pending.clear()
+            frame, frame_info, sequence = self.ring_buffer.latest()
+            if frame is None or sequence == sent:
+                return
+            await self._send(frame, frame_info, sequence)
+            sent = sequence
+
+    async def _send(self, frame: np.ndarray, frame_info, sequence: int):
+        receivers: dict[tuple, list[ClientConnection]] = {}
+        for client in self.clients:
+            if sequence >= client.next_sequence:
+                receivers.setdefault(client.subscription.variant, []).append(client)
+        if not receivers:
+            return
+
+        ffc_frame = self.ffc_frame
+        messages = await asyncio.gather(*[
+            self.loop.run_in_executor(self._encoder, self.encode, frame, frame_info, sequence,
+                                      clients[0].subscription, ffc_frame)
+            for clients in receivers.values()], return_exceptions=True)
+
+        # the acquisition thread may have wrapped around onto the slot while
+        # encoding, the newer frame is already scheduled
+        if sequence <= self.ring_buffer.sequence - self.ring_buffer.capacity + 1:
+            return
+        for clients, message in zip(receivers.values(), messages):
+            if isinstance(message, Exception):
+                # only the clients of the failing variant are dropped
+                logger.warning("Dropping %d client(s) of %s: %s", len(clients), clients[0].subscription.to_dict(), message)
+                for client in clients:
+                    client.close()
+                continue
+            for client in clients:
+                client.next_sequence = sequence + client.subscription.decimation
+                client.offer(message)
+
+    def correct_ffc(self, frame: np.ndarray, ffc_frame: np.ndarray | None) -> np.ndarray:
+        """The frame relative to the FFC reference, as `Compositor.correct_ffc`
+        makes it. `ffc_frame` is cropped like the frame."""
+        if ffc_frame is None:
+            return frame
+        corrected_frame = np.subtract(frame, ffc_frame, dtype=np.float32)
+        corrected_frame += self.ffc_reference_mean
+        return corrected_frame
+
+    def encode(self, frame: np.ndarray, frame_info, sequence: int, subscription: Subscription,
+               ffc_frame: np.ndarray | None = None) -> bytes:
+        if ffc_frame is not None and ffc_frame.shape != frame.shape:
+            ffc_frame = None
+        if ffc_frame is not None and ffc_frame is not self.ffc_reference:
+            self.ffc_reference = ffc_frame
+            self.ffc_reference_mean = np.float32(np.mean(ffc_frame))
+        if subscription.roi is not None:
+            x, y, width, height = clip_roi(subscription.roi, frame.shape)
+            frame = frame[y:y + height, x:x + width]
+            if ffc_frame is not None:
+                ffc_frame = ffc_frame[y:y + height, x:x + width]
+        height, width = frame.shape[:2]
+
+        if subscription.format == FORMAT_RAW:
+            channels = 1
+            payload = np.ascontiguousarray(frame, dtype="<u2").tobytes()
+        else:
+            corrected_frame = self.correct_ffc(frame, ffc_frame)
+            gray_frame = cv2.normalize(corrected_frame, None, 0, 255, cv2.NORM_MINMAX, dtype=cv2.CV_8U)
+            color_frame = self.palette_engine.colorize(gray_frame, COLORMAPS.get(subscription.palette, subscription.palette))
+            channels = 3
+            if subscription.format == FORMAT_JPEG:
+                _, encoded = cv2.imencode(".jpg", color_frame, [cv2.IMWRITE_JPEG_QUALITY, subscription.quality])
+                payload = encoded.tobytes()
+            else:
+                payload = color_frame.tobytes()
+
+        self.frames_encoded += 1
+        header = FRAME_HEADER.pack(FRAME_MAGIC, FORMAT_CODES[subscription.format], channels, 0,
+                                   width, height, sequence, len(payload))
+        return header + np.asarray(frame_info, dtype=FRAME_INFO_DTYPE).tobytes() + payload
+
+
+def clip_roi(roi: tuple[int, int, int, int], frame_shape: tuple) -> tuple[int, int, int, int]:
+    """`roi` clipped to the frame, a ValueError when nothing is left."""
+    frame_height, frame_width = frame_shape[:2]
+    x, y, width, height = roi
+    width = min(width, frame_width - x)
+    height = min(height, frame_height - y)
+    if width <= 0 or height <= 0:
+        raise ValueError(f"roi {list(roi)} lies outside the {frame_width}x{frame_height} frame")
+    return x, y, width, height
+
+
+# Client side
+
+async def subscribe(host: str, port: int, **options):
+    """Connects and subscribes, returns `(reader, writer, subscription)` with
+    the subscription as accepted by the server."""
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(json.dumps(options).encode() + b"\n")
+    await writer.drain()
+    response = json.loads(await reader.readuntil(b"\n"))
+    if "error" in response:
+        writer.close()
+        raise ValueError(response["error"])
+    return reader, writer, response
+
+
+async def receive_frame(reader: asyncio.StreamReader):
+    """Reads one frame message, returns `(frame, frame_info, sequence)`."""
+    header = await reader.readexactly(FRAME_HEADER.size)
+    magic, format_code, channels, _, width, height, sequence, payload_size = FRAME_HEADER.unpack(header)
+    if magic != FRAME_MAGIC:
+        raise ValueError("Not a frame message")
+    frame_info = np.frombuffer(await reader.readexactly(FRAME_INFO_DTYPE.itemsize), dtype=FRAME_INFO_DTYPE)[0]
+    payload = await reader.readexactly(payload_size)
+    if format_code == FORMAT_CODES[FORMAT_RAW]:
+        frame = np.frombuffer(payload, dtype="<u2").reshape(height, width)
+    elif format_code == FORMAT_CODES[FORMAT_COLOR]:
+        frame = np.frombuffer(payload, dtype=np.uint8).reshape(height, width, channels)
+    else:
+        frame = cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_COLOR)
+    return frame, frame_info, sequence
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Open Infrared Viewer frame server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--synthetic", action="store_true", help="use a synthetic camera instead of the MAG-160 Core")
+    source.add_argument("--replay", metavar="PATH", help="replay a recorded raw capture")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    if args.synthetic:
+        from src.drivers.SyntheticCamera import SyntheticCamera
+        device = SyntheticCamera()
+    elif args.replay:
+        from src.drivers.ReplayCamera import ReplayCamera
+        device = ReplayCamera(args.replay)
+    else:
+        from src.drivers.MAG160Core import Mag160Core
+        device = Mag160Core()
+
+    device.connect()
+    server = FrameServer(args.host, args.port).start()
+    server.attach(device)
+    logger.info("Serving %s on %s:%d", device.driver_name, args.host, server.port)
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        device.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Settings and constants shared by the GUI and the headless tools. This
+module must not import Qt."""
+import os
+from dataclasses import dataclass
+
+# per-device data kept between sessions: calibration files, parameters, masks
+CACHE_DIRECTORY = os.path.join(os.path.expanduser("~"), ".cache", "open-infrared-viewer")
+
+SHUTTER_TYPE_NONE = 0 # "No Shutter"
+SHUTTER_TYPE_MONO_STABLE = 1 # "Mono Stable Shutter"
+SHUTTER_TYPE_BI_STABLE = 2 # "Bi Stable Shutter"
+
+SHUTTER_TYPES = dict([(name, value) for name, value in locals().items() if name.startswith('SHUTTER_TYPE')])
+
+SHUTTER_TRIGGER_NONE = 0 # "No Shutter Trigger"
+SHUTTER_TRIGGER_MANUAL = 2 # "Manual Shutter Trigger"
+SHUTTER_TRIGGER_TEMPERATURE = 3 # "Temperature Shutter Trigger"
+SHUTTER_TRIGGER_TIME_INTERVAL = 4 # "Time Interval Shutter Trigger"
+
+SHUTTER_TRIGGERS = dict([(name, value) for name, value in locals().items() if name.startswith('SHUTTER_TRIGGER')])
+
+AGC_MODE_LINEAR = "linear" # linear span between two percentiles
+AGC_MODE_PLATEAU = "plateau" # plateau histogram equalization
+
+AGC_MODES = [AGC_MODE_LINEAR, AGC_MODE_PLATEAU]
+
+# OpenCV colormap ids, in the order dir(cv2) lists them. A static table
+# spares the scan of the cv2 namespace at startup.
+COLORMAPS = {
+    "COLORMAP_GRAY": None,
+    "COLORMAP_AUTUMN": 0,
+    "COLORMAP_BONE": 1,
+    "COLORMAP_CIVIDIS": 17,
+    "COLORMAP_COOL": 8,
+    "COLORMAP_DEEPGREEN": 21,
+    "COLORMAP_HOT": 11,
+    "COLORMAP_HSV": 9,
+    "COLORMAP_INFERNO": 14,
+    "COLORMAP_JET": 2,
+    "COLORMAP_MAGMA": 13,
+    "COLORMAP_OCEAN": 5,
+    "COLORMAP_PARULA": 12,
+    "COLORMAP_PINK": 10,
+    "COLORMAP_PLASMA": 15,
+    "COLORMAP_RAINBOW": 4,
+    "COLORMAP_SPRING": 7,
+    "COLORMAP_SUMMER": 6,
+    "COLORMAP_TURBO": 20,
+    "COLORMAP_TWILIGHT": 18,
+    "COLORMAP_TWILIGHT_SHIFTED": 19,
+    "COLORMAP_VIRIDIS": 16,
+    "COLORMAP_WINTER": 3,
+}
+
+@dataclass
+class GeneralSettings:
+    ffc_mode = SHUTTER_TRIGGER_TEMPERATURE
+    freeze_on_ffc = False
+    manual_span = False
+    slider_range = [0, 2 * 2**15]
+    span_range = [0, 2 * 2**15]
+    color_palette = 0
+    invert_colors = False
+    rotation = 0
+    flip = 0
+    crop = None # (x, y, width, height) in sensor pixels, None for the whole frame
+    temporal_denoise = False
+    denoise_strength = 0.8 # 0 disables the averaging, toward 1 averages longer
+    denoise_motion_threshold = 60.0 # counts of change treated as motion
+    agc_mode = AGC_MODE_LINEAR
+    agc_low_percentile = 0.5
+    agc_high_percentile = 99.5
+    agc_smoothing = 0.2 # weight of the newest span, 1 follows every frame
+    agc_plateau = 4.0 # histogram clip level, in mean bins
+    temperature_span = False # span the view over temperature_span_range when calibrated
+    temperature_span_range = [20.0, 40.0] # degrees Celsius
+    spot_position = None # (x, y) in sensor pixels of the spot meter, None for the center
+    trigger_pre_seconds = 5.0 # kept before an event when recording triggered
+    trigger_post_seconds = 5.0 # recorded after the last trigger of an event
+    trigger_motion_threshold = 40.0 # counts of change that are motion, None disables
+    trigger_temperature = None # degrees Celsius that start an event, None disables
+    trigger_temperature_roi = None # (x, y, width, height) in sensor pixels, None for the whole frame
+
+    show_other_palettes = False
+
+@dataclass
+class FrameProperties:
+     min_value = 0
+     max_value = 0
+     min_temperature = None # degrees Celsius, when calibrated
+     max_temperature = None
+     spot_temperature = None
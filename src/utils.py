@@ -1,6 +1,5 @@
-from dataclasses import dataclass
+from contextlib import contextmanager
 import cv2
-from matplotlib import pyplot as plt
 import numpy as np
 import usb.core
 import usb.util
@@ -14,21 +13,24 @@ from PyQt5.QtCore import (
     pyqtSignal,
 )
 
-SHUTTER_TYPE_NONE = 0 # "No Shutter"
-SHUTTER_TYPE_MONO_STABLE = 1 # "Mono Stable Shutter"
-SHUTTER_TYPE_BI_STABLE = 2 # "Bi Stable Shutter"
-
-SHUTTER_TYPES = dict([(name, value) for name, value in locals().items() if name.startswith('SHUTTER_TYPE')])
-
-SHUTTER_TRIGGER_NONE = 0 # "No Shutter Trigger"
-SHUTTER_TRIGGER_MANUAL = 2 # "Manual Shutter Trigger"
-SHUTTER_TRIGGER_TEMPERATURE = 3 # "Temperature Shutter Trigger"
-SHUTTER_TRIGGER_TIME_INTERVAL = 4 # "Time Interval Shutter Trigger"
-
-SHUTTER_TRIGGERS = dict([(name, value) for name, value in locals().items() if name.startswith('SHUTTER_TRIGGER')])
-
-COLORMAPS = {"COLORMAP_GRAY": None}
-COLORMAPS = {**COLORMAPS, **dict([(name, getattr(cv2, name)) for name in dir(cv2) if name.startswith('COLORMAP')])}
+# the Qt-free settings, kept importable from here
+from src.settings import (
+    SHUTTER_TYPE_NONE,
+    SHUTTER_TYPE_MONO_STABLE,
+    SHUTTER_TYPE_BI_STABLE,
+    SHUTTER_TYPES,
+    SHUTTER_TRIGGER_NONE,
+    SHUTTER_TRIGGER_MANUAL,
+    SHUTTER_TRIGGER_TEMPERATURE,
+    SHUTTER_TRIGGER_TIME_INTERVAL,
+    SHUTTER_TRIGGERS,
+    AGC_MODE_LINEAR,
+    AGC_MODE_PLATEAU,
+    AGC_MODES,
+    COLORMAPS,
+    GeneralSettings,
+    FrameProperties,
+)
 
 def get_endpoint(device_interface, ep_addr):
     return usb.util.find_descriptor(
@@ -39,25 +41,6 @@ def get_endpoint(device_interface, ep_addr):
 def bytes_to_int(data):
     return int.from_bytes(data, byteorder='little')
 
-@dataclass
-class GeneralSettings:
-    ffc_mode = SHUTTER_TRIGGER_TEMPERATURE
-    freeze_on_ffc = False
-    manual_span = False
-    slider_range = [0, 2 * 2**15]
-    span_range = [0, 2 * 2**15]
-    color_palette = 0
-    invert_colors = False
-    rotation = 0
-    flip = 0
-
-    show_other_palettes = False
-
-@dataclass
-class FrameProperties:
-     min_value = 0
-     max_value = 0
-     
 class Signal(QObject):
     """A PyQt signal wrapper that provides a simple interface for emitting and 
     connecting signals."""
@@ -86,7 +69,21 @@ def matlike_to_pixmap(frame: np.ndarray) -> QPixmap:
         return pixmap
 
 
+@contextmanager
+def signals_blocked(*widgets: QObject):
+    """Blocks the signals of `widgets` while setting them from code, so the
+    handlers meant for the user don't run."""
+    previous = [widget.blockSignals(True) for widget in widgets]
+    try:
+        yield
+    finally:
+        for widget, blocked in zip(widgets, previous):
+            widget.blockSignals(blocked)
+
+
 def show_image(array):
+    # debugging aid, matplotlib is slow to import
+    from matplotlib import pyplot as plt
     plt.imshow(array, cmap='gray')
     plt.colorbar()
     plt.title('Image')
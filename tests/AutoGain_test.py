@@ -0,0 +1,44 @@
+import numpy as np
+
+from src.AutoGain import AutoGain
+from src.utils import AGC_MODE_PLATEAU
+
+def make_frame(seed=0):
+    rng = np.random.default_rng(seed)
+    rows, cols = np.mgrid[0:120, 0:160]
+    return (8000 + 10 * cols + rng.normal(0, 20, (120, 160))).astype(np.float32)
+
+def test_hot_pixels_do_not_blow_out_the_span():
+    frame = make_frame()
+    frame[10, 10] = 60000
+    frame[20, 20] = 0
+    output, low, high = AutoGain().apply(frame, low_percentile=1, high_percentile=99)
+    assert 8000 <= low < 8100 and 9400 < high <= 9700
+    assert output.dtype == np.uint8 and output.shape == frame.shape
+    assert output[10, 10] == 255 and output[20, 20] == 0
+    # the scene keeps most of the output range
+    assert np.percentile(output, 99) - np.percentile(output, 1) > 240
+
+def test_span_is_smoothed_over_time():
+    auto_gain = AutoGain()
+    frame = make_frame()
+    _, low, high = auto_gain.apply(frame, smoothing=0.25)
+    _, shifted_low, shifted_high = auto_gain.apply(frame + 1000, smoothing=0.25)
+    assert abs(shifted_low - (low + 250)) < 2
+    assert abs(shifted_high - (high + 250)) < 2
+
+def test_manual_span_and_plateau_equalization():
+    frame = make_frame()
+    output, low, high = AutoGain().apply(frame, manual_span=(8500, 8600))
+    assert (low, high) == (8500, 8600)
+    assert output[:, :40].max() == 0 and output[:, -40:].min() == 255
+
+    # a mostly flat scene with a small warm object
+    flat = np.full((120, 160), 8000, dtype=np.float32) + np.random.default_rng(0).normal(0, 5, (120, 160)).astype(np.float32)
+    flat[50:60, 50:60] = 9000
+    linear, _, _ = AutoGain().apply(flat, low_percentile=0, high_percentile=100)
+    equalized, _, _ = AutoGain().apply(flat, mode=AGC_MODE_PLATEAU, low_percentile=0, high_percentile=100)
+    # equalization spreads the background noise over many more levels
+    background = (slice(0, 40), slice(0, 160))
+    assert np.ptp(equalized[background]) > 4 * np.ptp(linear[background])
+    assert equalized[55, 55] == 255
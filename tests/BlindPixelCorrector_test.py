@@ -0,0 +1,52 @@
+import cv2
+import numpy as np
+
+from src.BlindPixelCorrector import BlindPixelCorrector
+from src.Calibrator import Calibrator
+
+HEIGHT, WIDTH = 120, 160
+
+def make_scene():
+    rows, cols = np.mgrid[0:HEIGHT, 0:WIDTH]
+    scene = 8000 + 20 * cols + 10 * rows + 50 * np.sin(cols / 9) * np.cos(rows / 7)
+    return scene.astype(np.float32)
+
+def make_mask(seed=1):
+    rng = np.random.default_rng(seed)
+    mask = np.zeros((HEIGHT, WIDTH), dtype=np.uint8)
+    mask[rng.integers(0, HEIGHT, 40), rng.integers(0, WIDTH, 40)] = 255
+    mask[51:53, 124:127] = 255
+    mask[0, 0] = 255
+    return mask
+
+def test_correction_matches_inpaint():
+    scene = make_scene()
+    mask = make_mask()
+    frame = scene.copy()
+    frame[mask > 0] = 0
+
+    inpainted = cv2.inpaint(frame, mask, 3, cv2.INPAINT_TELEA)
+    corrected = BlindPixelCorrector(mask).correct(frame.copy())
+
+    tolerance = 0.01 * (scene.max() - scene.min())
+    assert np.abs(corrected - inpainted).max() < tolerance
+    assert np.abs(corrected - scene).max() < tolerance
+    # good pixels are never touched
+    assert np.array_equal(corrected[mask == 0], frame[mask == 0])
+
+def test_isolated_by_large_cluster():
+    mask = np.zeros((HEIGHT, WIDTH), dtype=np.uint8)
+    mask[40:60, 40:60] = 1
+    frame = np.full((HEIGHT, WIDTH), 100, dtype=np.float32)
+    frame[mask > 0] = 0
+    corrected = BlindPixelCorrector(mask).correct(frame)
+    assert np.allclose(corrected, 100)
+
+def test_calibrator_rebuilds_only_on_mask_change():
+    calibrator = Calibrator()
+    assert calibrator.blind_pixel_corrector is None
+    calibrator.set_blind_pixel_mask(make_mask())
+    corrector = calibrator.blind_pixel_corrector
+    assert corrector is not None and corrector.pixel_count == np.count_nonzero(make_mask())
+    calibrator.set_blind_pixel_mask(np.zeros((HEIGHT, WIDTH), dtype=np.uint8))
+    assert calibrator.blind_pixel_corrector is None
@@ -0,0 +1,77 @@
+import numpy as np
+
+from src.BlindPixelDetector import BlindPixelDetector, PixelStatistics, PIXEL_DEAD, PIXEL_STUCK, PIXEL_NOISY
+from src.Calibrator import Calibrator
+from src.drivers.SyntheticCamera import SyntheticCamera
+
+HEIGHT, WIDTH = 120, 160
+DEAD, STUCK, NOISY = (10, 20), (30, 40), (50, 60)
+
+def scene_frames(rng, level, count):
+    for _ in range(count):
+        frame = level + rng.normal(0, 10, (HEIGHT, WIDTH))
+        frame[DEAD] = 500 + rng.normal(0, 10)
+        frame[STUCK] = 700
+        frame[NOISY] = level + rng.normal(0, 200)
+        yield frame.astype(np.float32)
+
+def test_running_statistics_match_the_frames():
+    rng = np.random.default_rng(0)
+    frames = rng.normal(1000, 20, (50, 12, 16)).astype(np.float32)
+    statistics = PixelStatistics((12, 16))
+    for frame in frames:
+        statistics.add(frame)
+    assert statistics.count == 50
+    assert np.allclose(statistics.mean, frames.mean(axis=0, dtype=np.float64))
+    assert np.allclose(statistics.variance, frames.var(axis=0, ddof=1, dtype=np.float64))
+
+def test_pixels_are_classified_by_criterion(monkeypatch):
+    rng = np.random.default_rng(1)
+    detector = BlindPixelDetector()
+    for level in (1000, 2000):
+        detector.start_scene((HEIGHT, WIDTH))
+        for frame in scene_frames(rng, level, 40):
+            detector.add(frame)
+
+    classes = detector.classify()
+    assert classes[DEAD] == PIXEL_DEAD
+    assert classes[STUCK] == PIXEL_DEAD | PIXEL_STUCK
+    assert classes[NOISY] == PIXEL_NOISY
+    assert np.count_nonzero(classes) == 3
+
+    # moving the tolerance only compares again
+    monkeypatch.setattr(detector, "analyze", None)
+    assert np.count_nonzero(detector.mask(dead_tolerance=1.5) == 255) == HEIGHT * WIDTH
+    assert np.count_nonzero(detector.mask(dead_tolerance=0.05)) == 3
+
+def test_masks_are_saved_per_device_and_resolution(tmp_path):
+    camera = SyntheticCamera(realtime=False, threaded_acquisition=False, hot_spots=0)
+    camera.connect()
+    calibrator = Calibrator()
+    calibrator.blind_pixel_mask_directory = str(tmp_path)
+    calibrator.assign_device(camera)
+    assert calibrator.blind_pixel_mask is None
+
+    calibrator.capture_blind_pixel_scene(16)
+    for _ in range(100):
+        if not calibrator.capturing_blind_pixel_scene:
+            break
+        camera.grab_frame()
+    assert calibrator.blind_pixel_detector.frame_count == 16
+    assert calibrator.capture_blind_pixel_frame not in camera.frame_sinks
+    calibrator.blind_pixel_detection()
+    # the synthetic dead pixels read 0 on every frame
+    assert np.array_equal(calibrator.blind_pixel_mask > 0, camera.dead_pixel_mask)
+    calibrator.save_blind_pixel_mask()
+
+    restarted = Calibrator()
+    restarted.blind_pixel_mask_directory = str(tmp_path)
+    restarted.assign_device(camera)
+    assert np.array_equal(restarted.blind_pixel_mask > 0, camera.dead_pixel_mask)
+    assert restarted.blind_pixel_corrector.pixel_count == camera.dead_pixels
+
+    for other_camera in (SyntheticCamera(seed=1, threaded_acquisition=False),
+                         SyntheticCamera(width=320, height=240, threaded_acquisition=False)):
+        other_camera.connect()
+        restarted.assign_device(other_camera)
+        assert restarted.blind_pixel_mask is None
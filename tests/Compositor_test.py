@@ -1,5 +1,75 @@
-import src.Compositor
+import cv2
+import numpy as np
+import pytest
+
+from src.Calibrator import Calibrator
+from src.Compositor import Compositor
+from src.drivers.SyntheticCamera import SyntheticCamera
+
+def make_compositor(width=160, height=120):
+    camera = SyntheticCamera(width=width, height=height, realtime=False, threaded_acquisition=False)
+    camera.connect()
+    compositor = Compositor()
+    compositor.calibrator = Calibrator()
+    compositor.assign_device(camera)
+    return compositor, camera
+
+def make_blind_pixel_mask(width=160, height=120):
+    mask = np.zeros((height, width), dtype=np.uint8)
+    mask[12, 72] = 1
+    mask[51:53, 124:127] = 1
+    mask[59:62, 80] = 1
+    return mask
+
+def reference_read(compositor, raw_frame, ffc_frame):
+    # the pipeline as it was written before it was split into stages
+    corrected_frame = (raw_frame.astype(np.float32) - ffc_frame + np.mean(ffc_frame)).astype(np.float32)
+    mask = compositor.calibrator.blind_pixel_mask
+    corrected_frame = cv2.inpaint(corrected_frame, mask, 3, cv2.INPAINT_TELEA)
+    corrected_frame = np.clip(corrected_frame, corrected_frame.min(), corrected_frame.max())
+    normalized_frame = cv2.normalize(corrected_frame, None, 0, 255, cv2.NORM_MINMAX, dtype=cv2.CV_8U)
+    color_frame = cv2.cvtColor(normalized_frame, cv2.COLOR_GRAY2BGR)
+    return cv2.applyColorMap(color_frame, compositor.settings.color_palette)
 
 def test_init():
-    compositor = src.Compositor()
-    assert compositor.test == True
\ No newline at end of file
+    compositor = Compositor()
+    assert compositor.test == True
+
+def test_read_pipeline():
+    compositor, camera = make_compositor()
+    compositor.calibrator.set_blind_pixel_mask(make_blind_pixel_mask())
+    # a full min-max span, as the reference has
+    compositor.settings.agc_low_percentile = 0
+    compositor.settings.agc_high_percentile = 100
+    compositor.settings.agc_smoothing = 1
+    for _ in range(20):
+        camera.read()
+    color_frame = compositor.read()
+    assert color_frame.shape == (120, 160, 3)
+    assert color_frame.dtype == np.uint8
+
+    expected = reference_read(compositor, camera.frame_buffer, camera.ffc_frame)
+    # blind pixel replacement differs slightly from inpaint
+    difference = np.abs(color_frame.astype(int) - expected).max(axis=2)
+    assert np.mean(difference == 0) > 0.99
+    assert compositor.last_frame_properties.min_value < compositor.last_frame_properties.max_value
+
+def test_read_rotates_and_flips():
+    compositor, camera = make_compositor()
+    camera.read()
+    compositor.settings.rotation = 1
+    compositor.settings.flip = 2
+    assert compositor.read().shape == (160, 120, 3)
+
+def test_failed_recording_start_can_be_retried(tmp_path):
+    compositor, camera = make_compositor()
+    compositor.recording_name = str(tmp_path / "missing" / "output")
+    with pytest.raises(RuntimeError):
+        compositor.start_recording()
+    assert not compositor.recording and compositor.video_encoder is None
+
+    compositor.recording_name = str(tmp_path / "output")
+    compositor.start_recording()
+    assert compositor.recording and compositor.video_encoder is not None
+    compositor.stop_recording()
+    camera.close()
@@ -0,0 +1,115 @@
+import os
+import time
+import numpy as np
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import QApplication
+
+from src.Compositor import RECORDING_FORMAT_RAW, RECORDING_FORMAT_TRIGGERED
+from src.DeviceManager import DeviceManager
+from src.RawRecording import RawReader
+from src.drivers.SyntheticCamera import SyntheticCamera
+
+app = QApplication.instance() or QApplication([])
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        app.processEvents()
+        time.sleep(0.005)
+    return condition()
+
+def open_cameras(count):
+    device_manager = DeviceManager()
+    for seed in range(count):
+        device_manager.add_device(SyntheticCamera(framerate=100, seed=seed))
+    return device_manager
+
+def test_every_device_gets_its_own_pipeline():
+    device_manager = open_cameras(3)
+    shown = []
+    device_manager.on_frame = lambda pipeline: shown.append(pipeline.serial_number)
+    try:
+        assert sorted(device_manager.pipelines) == [0, 1, 2]
+        assert wait_for(lambda: all(pipeline.frames_rendered >= 5 for pipeline in device_manager))
+        assert wait_for(lambda: set(shown) == {0, 1, 2})
+
+        pipelines = list(device_manager)
+        assert len({id(pipeline.compositor) for pipeline in pipelines}) == 3
+        assert len({id(pipeline.calibrator) for pipeline in pipelines}) == 3
+        assert all(pipeline.telemetry.snapshot()["rendered_fps"] > 0 for pipeline in pipelines)
+        # the driver's helpers record into the pipeline's telemetry from the start
+        for pipeline in pipelines:
+            assert pipeline.device.ffc.telemetry is pipeline.telemetry
+            assert pipeline.device.acquisition_thread.telemetry is pipeline.telemetry
+            assert pipeline.telemetry.snapshot()["acquired_fps"] > 0
+        frames = [pipeline.latest_frame() for pipeline in pipelines]
+        assert frames[0].shape == (120, 160, 3)
+        # different seeds, different scenes
+        assert not np.array_equal(frames[0], frames[1])
+    finally:
+        device_manager.close()
+    assert len(device_manager) == 0
+
+def test_devices_with_the_same_serial_number_are_rejected():
+    device_manager = open_cameras(1)
+    try:
+        with pytest.raises(ValueError):
+            device_manager.add_device(SyntheticCamera(seed=0))
+        assert len(device_manager) == 1
+    finally:
+        device_manager.close()
+
+def test_recording_all_devices_writes_a_file_each(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    device_manager = open_cameras(2)
+    try:
+        device_manager.start_recording(RECORDING_FORMAT_RAW)
+        time.sleep(0.3)
+        device_manager.stop_recording()
+    finally:
+        device_manager.close()
+
+    for serial_number in (0, 1):
+        reader = RawReader(str(tmp_path / f"output_{serial_number}.irraw"))
+        assert len(reader) > 5
+        reader.close()
+
+def test_triggered_recording_writes_only_events(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    device_manager = open_cameras(1)
+    device_manager.settings.trigger_motion_threshold = None
+    device_manager.settings.trigger_pre_seconds = 0.1
+    device_manager.settings.trigger_post_seconds = 0.1
+    try:
+        device_manager.start_recording(RECORDING_FORMAT_TRIGGERED)
+        time.sleep(0.3)
+        assert not list(tmp_path.glob("*.irraw"))
+        device_manager.trigger_recording()
+        time.sleep(0.3)
+        assert "trigger" in next(iter(device_manager)).telemetry.stages
+        device_manager.stop_recording()
+    finally:
+        device_manager.close()
+
+    reader = RawReader(str(tmp_path / "output_0_event1.irraw"))
+    # pre-trigger, trigger and post-trigger frames at 100 fps
+    assert len(reader) == 21
+    reader.close()
+
+def test_multi_view_shows_a_tile_per_device():
+    from src.multi_view_window import MultiViewWindow
+
+    device_manager = open_cameras(3)
+    multi_view_window = MultiViewWindow(device_manager)
+    multi_view_window.show()
+    try:
+        assert sorted(multi_view_window.canvases) == [0, 1, 2]
+        assert wait_for(lambda: all(canvas.frames_painted > 0 for canvas in multi_view_window.canvases.values()))
+        positions = {multi_view_window.tileLayout.getItemPosition(index)[:2] for index in range(3)}
+        assert positions == {(0, 0), (0, 1), (1, 0)}
+    finally:
+        multi_view_window.close()
+        device_manager.close()
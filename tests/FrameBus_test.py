@@ -0,0 +1,68 @@
+import multiprocessing
+import time
+import numpy as np
+
+from src.FrameBus import FrameBusWriter, FrameBusReader
+from src.drivers.base import FRAME_INFO_DTYPE
+
+def make_frame(sequence):
+    frame = np.full((12, 16), sequence, dtype=np.uint16)
+    frame_info = np.zeros((), dtype=FRAME_INFO_DTYPE)
+    frame_info["frame_index"] = sequence
+    return frame, frame_info
+
+def read_frames(name, count, results):
+    reader = FrameBusReader(name)
+    sums = []
+    while len(sums) < count:
+        frame, frame_info, sequence = reader.next_frame(timeout=5)
+        assert frame is not None
+        assert frame_info["frame_index"] == sequence
+        sums.append(int(frame[0, 0]))
+    results.put((sums, reader.frames_overrun))
+    reader.close()
+
+def test_reader_sees_frames_in_order_and_overruns():
+    writer = FrameBusWriter(None, (12, 16), capacity=4)
+    reader = FrameBusReader(writer.name)
+    try:
+        for sequence in range(1, 4):
+            writer.publish(*make_frame(sequence))
+        frames = [reader.next_frame(timeout=0)[2] for _ in range(3)]
+        assert frames == [1, 2, 3]
+        assert reader.next_frame(timeout=0)[2] == 0
+
+        frame, frame_info = reader.view(3)
+        assert frame[0, 0] == 3 and frame_info["frame_index"] == 3
+
+        for sequence in range(4, 14):
+            writer.publish(*make_frame(sequence))
+        frame, frame_info, sequence = reader.next_frame(timeout=0)
+        assert sequence == 11 and frame[0, 0] == 11
+        assert reader.frames_overrun == 7
+        # a slot that has been reused no longer validates
+        assert not reader.is_valid(3)
+        assert reader.view(3) == (None, None)
+        assert reader.latest()[2] == 13
+        del frame, frame_info
+    finally:
+        reader.close()
+        writer.close()
+
+def test_reader_in_another_process():
+    context = multiprocessing.get_context("spawn")
+    writer = FrameBusWriter(None, (12, 16), capacity=64)
+    results = context.Queue()
+    process = context.Process(target=read_frames, args=(writer.name, 20, results))
+    process.start()
+    try:
+        # the reader starts from the frames published after it attached
+        while process.is_alive() and results.empty():
+            writer.publish(*make_frame(writer.published + 1))
+            time.sleep(0.001)
+        sums, overruns = results.get(timeout=10)
+        assert sums == list(range(sums[0], sums[0] + 20))
+        assert overruns == 0
+    finally:
+        process.join(10)
+        writer.close()
@@ -0,0 +1,56 @@
+import os
+import numpy as np
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import QApplication, QSpinBox
+
+from src.FrameCanvas import FrameCanvas
+from src.utils import signals_blocked
+
+app = QApplication.instance() or QApplication([])
+
+def show_canvas(width, height):
+    canvas = FrameCanvas()
+    canvas.resize(width, height)
+    canvas.show()
+    app.processEvents()
+    return canvas
+
+def test_frames_are_coalesced_into_one_paint():
+    canvas = show_canvas(320, 240)
+    frame = np.zeros((120, 160, 3), dtype=np.uint8)
+    for value in range(5):
+        frame[:] = (value, 0, 200)
+        canvas.set_frame(frame)
+    assert canvas.frames_received == 5
+    assert canvas.frames_coalesced == 4
+
+    frame[:] = 0 # the canvas keeps its own copy
+    while canvas.pending:
+        app.processEvents()
+    assert canvas.frames_painted == 1
+
+    color = canvas.grab().toImage().pixelColor(160, 120)
+    assert (color.red(), color.green(), color.blue()) == (200, 0, 4)
+    canvas.close()
+
+def test_frame_is_fitted_keeping_the_aspect_ratio():
+    canvas = show_canvas(400, 200)
+    canvas.set_frame(np.zeros((120, 160), dtype=np.uint8))
+    rect = canvas.image_rect()
+    assert rect.height() == canvas.contentsRect().height()
+    assert abs(rect.width() / rect.height() - 4 / 3) < 0.02
+    assert abs(rect.center().x() - canvas.contentsRect().center().x()) <= 1
+    canvas.close()
+
+def test_signals_blocked_restores_the_previous_state():
+    spin_box = QSpinBox()
+    changes = []
+    spin_box.valueChanged.connect(changes.append)
+    with signals_blocked(spin_box):
+        spin_box.setValue(5)
+    assert changes == []
+    assert not spin_box.signalsBlocked()
+    spin_box.setValue(6)
+    assert changes == [6]
@@ -0,0 +1,56 @@
+import cv2
+import numpy as np
+
+from src.Compositor import Compositor
+from src.Calibrator import Calibrator
+from src.Geometry import GeometryTransform
+from src.drivers.SyntheticCamera import SyntheticCamera
+
+FRAME = np.random.default_rng(0).integers(0, 256, (120, 160), dtype=np.uint8)
+
+def oriented(frame, rotation, flip):
+    frame = np.rot90(frame, 4 - rotation)
+    return np.flip(frame, {0: (), 1: 0, 2: 1, 3: (0, 1)}[flip])
+
+def test_rotation_flip_and_crop_match_numpy():
+    geometry = GeometryTransform()
+    for rotation in range(4):
+        for flip in range(4):
+            output = geometry.apply(FRAME, rotation, flip)
+            assert np.array_equal(output, oriented(FRAME, rotation, flip))
+            output = geometry.apply(FRAME, rotation, flip, crop=(10, 20, 50, 30))
+            assert np.array_equal(output, oriented(FRAME[20:50, 10:60], rotation, flip))
+    assert np.shares_memory(geometry.apply(FRAME), FRAME)
+    assert np.shares_memory(geometry.apply(FRAME, crop=(10, 20, 50, 30)), FRAME)
+
+def test_scaling_matches_resize_and_maps_are_cached():
+    geometry = GeometryTransform()
+    for _ in range(3):
+        output = geometry.apply(FRAME, 0, 0, output_size=(640, 480), interpolation=cv2.INTER_CUBIC)
+    expected = cv2.resize(FRAME, (640, 480), interpolation=cv2.INTER_CUBIC)
+    assert np.abs(output.astype(int) - expected).max() <= 1
+    rotated = geometry.apply(FRAME, 1, 2, output_size=(240, 320), interpolation=cv2.INTER_CUBIC)
+    expected = cv2.resize(FRAME, (320, 240), interpolation=cv2.INTER_CUBIC)
+    assert np.abs(rotated.astype(int) - oriented(expected, 1, 2)).max() <= 1
+    assert geometry.plans_built == 2
+
+def test_compositor_renders_display_and_recording_sizes(tmp_path):
+    camera = SyntheticCamera(realtime=False, threaded_acquisition=False)
+    camera.connect()
+    compositor = Compositor()
+    compositor.calibrator = Calibrator()
+    compositor.assign_device(camera)
+    compositor.settings.rotation = 1
+    compositor.display_size = (400, 400)
+    compositor.recording_scale = 2
+    compositor.recording_name = str(tmp_path / "output")
+    compositor.recording_codec = "MJPG"
+    camera.read()
+    compositor.start_recording()
+    assert compositor.video_encoder.frame_size == (240, 320)
+    display_frame = compositor.read()
+    assert display_frame.shape == (400, 300, 3)
+    recording_frame = compositor.render_recording_frame(display_frame, (240, 320))
+    assert recording_frame.shape == (320, 240, 3)
+    compositor.stop_recording()
+    assert compositor.video_encoder is None
@@ -0,0 +1,46 @@
+import cv2
+import numpy as np
+
+from src.Palette import PaletteEngine, load_palette_file
+
+def reference_colorize(gray_frame, palette, invert):
+    color_frame = gray_frame
+    if invert:
+        color_frame = np.invert(color_frame)
+    color_frame = cv2.cvtColor(color_frame, cv2.COLOR_GRAY2BGR)
+    if palette is not None:
+        color_frame = cv2.applyColorMap(color_frame, palette)
+    return color_frame
+
+def test_colorize_matches_opencv_chain():
+    gray_frame = np.random.default_rng(0).integers(0, 256, (120, 160), dtype=np.uint8)
+    engine = PaletteEngine()
+    for palette in (None, cv2.COLORMAP_JET, cv2.COLORMAP_INFERNO):
+        for invert in (False, True):
+            color_frame = engine.colorize(gray_frame, palette, invert)
+            assert np.array_equal(color_frame, reference_colorize(gray_frame, palette, invert))
+
+def test_output_buffer_and_lut_are_reused():
+    gray_frame = np.zeros((120, 160), dtype=np.uint8)
+    engine = PaletteEngine()
+    first = engine.colorize(gray_frame, cv2.COLORMAP_JET)
+    lut = engine.get_lut(cv2.COLORMAP_JET)
+    second = engine.colorize(gray_frame, cv2.COLORMAP_JET)
+    assert first is second
+    assert engine.get_lut(cv2.COLORMAP_JET) is lut
+
+def test_ruler_uses_inverted_table():
+    engine = PaletteEngine()
+    ruler = engine.ruler(cv2.COLORMAP_JET, invert=True)
+    assert ruler.shape == (1, 256, 3)
+    assert np.array_equal(ruler[0, 0], engine.get_lut(cv2.COLORMAP_JET)[255, 0])
+
+def test_custom_palette_file(tmp_path):
+    path = tmp_path / "red.txt"
+    np.savetxt(path, [[0, 0, 0], [255, 0, 0]], fmt="%d")
+    name = load_palette_file(str(path))
+    engine = PaletteEngine()
+    color_frame = engine.colorize(np.array([[0, 255]], dtype=np.uint8), name)
+    # two entries are interpolated to 256, output is BGR
+    assert color_frame[0, 0].tolist() == [0, 0, 0]
+    assert color_frame[0, 1].tolist() == [0, 0, 255]
@@ -0,0 +1,93 @@
+import numpy as np
+
+from src.Calibrator import Calibrator
+from src.Compositor import Compositor
+from src.Radiometry import (
+    LinearCalibrationModel,
+    PlanckCalibrationModel,
+    RadiometricEngine,
+    load_calibration_model,
+    save_calibration_model,
+    KELVIN,
+)
+from src.settings import GeneralSettings
+
+PLANCK = PlanckCalibrationModel(r=2.2e6, b=1430.0, f=1.0, o=2000.0, fpa_slope=-50.0)
+
+def planck_counts(celsius, fpa_temp_celsius):
+    offset = PLANCK.o + PLANCK.fpa_slope * (fpa_temp_celsius - PLANCK.reference_fpa_celsius)
+    return PLANCK.r / (np.exp(PLANCK.b / (np.asarray(celsius) + KELVIN)) - PLANCK.f) + offset
+
+def test_frames_convert_with_one_table_per_fpa_bucket():
+    engine = RadiometricEngine(PLANCK)
+    temperatures = np.linspace(-10, 120, 160 * 120).reshape(120, 160)
+    fpa_temp_celsius = 31.0
+    frame = planck_counts(temperatures, fpa_temp_celsius).astype(np.float32)
+
+    converted = engine.convert(frame, fpa_temp_celsius)
+    assert converted.dtype == np.float32
+    assert np.max(np.abs(converted - temperatures)) < 0.1
+    assert np.allclose(engine.convert(np.rint(frame).astype(np.uint16), fpa_temp_celsius), converted)
+
+    # the FPA temperature drifting within a bucket reuses the table
+    engine.convert(frame, fpa_temp_celsius + 0.1)
+    assert engine.tables_built == 1
+    engine.convert(frame, fpa_temp_celsius + 0.5)
+    assert engine.tables_built == 2
+
+def test_fpa_drift_is_compensated():
+    engine = RadiometricEngine(PLANCK)
+    for fpa_temp_celsius in (20.0, 35.0):
+        counts = planck_counts(40.0, fpa_temp_celsius)
+        assert abs(engine.temperature(counts, fpa_temp_celsius) - 40.0) < 0.05
+
+def test_table_cache_is_bounded():
+    engine = RadiometricEngine(PLANCK, cache_size=3)
+    for fpa_temp_celsius in range(10):
+        engine.table(fpa_temp_celsius)
+    assert len(engine.tables) == 3
+    assert engine.tables_built == 10
+
+def test_counts_for_inverts_temperature():
+    engine = RadiometricEngine(PLANCK)
+    for celsius in (0.0, 25.0, 80.0):
+        counts = engine.counts_for(celsius, 25.0)
+        assert abs(engine.temperature(counts, 25.0) - celsius) < 1e-3
+        assert abs(counts - planck_counts(celsius, 25.0)) < 1
+
+def test_spot_averages_around_the_pixel():
+    engine = RadiometricEngine(LinearCalibrationModel(gain=0.01, offset=8000))
+    frame = np.full((120, 160), 8000, dtype=np.float32)
+    frame[59:62, 79:82] = 9000
+    assert abs(engine.spot(frame, 25.0, 80, 60) - 35.0) < 1e-3
+    assert abs(engine.spot(frame, 25.0, 0, 0) - 25.0) < 1e-3
+
+def test_models_round_trip_through_json(tmp_path):
+    path = str(tmp_path / "calibration.json")
+    save_calibration_model(PLANCK, path)
+    model = load_calibration_model(path)
+    assert isinstance(model, PlanckCalibrationModel)
+    assert vars(model) == vars(PLANCK)
+
+def test_compositor_spans_over_temperatures():
+    settings = GeneralSettings()
+    settings.temperature_span = True
+    settings.temperature_span_range = [20.0, 40.0]
+    compositor = Compositor()
+    compositor.settings = settings
+    compositor.calibrator = Calibrator()
+    compositor.set_calibration_model(LinearCalibrationModel(gain=0.01, offset=8000))
+
+    temperatures = np.linspace(10, 50, 160 * 120).reshape(120, 160)
+    raw_frame = (8000 + (temperatures - 25.0) * 100).astype(np.uint16)
+    compositor.palette_engine.colorize = lambda frame, palette, invert: frame
+    output = compositor.render(raw_frame, np.zeros(raw_frame.shape, np.float32), 30.0)
+
+    assert np.all(output[temperatures < 19.9] == 0)
+    assert np.all(output[temperatures > 40.1] == 255)
+    middle = np.abs(temperatures - 30.0) < 0.01
+    assert np.all(np.abs(output[middle].astype(int) - 128) <= 2)
+    properties = compositor.last_frame_properties
+    assert abs(properties.min_temperature - 20.0) < 1e-3
+    assert abs(properties.max_temperature - 40.0) < 1e-3
+    assert abs(properties.spot_temperature - temperatures[60, 80]) < 0.05
@@ -0,0 +1,57 @@
+import numpy as np
+
+from src.RawRecording import RawRecorder, RawReader, RAW_FOOTER
+from src.drivers.base import FRAME_INFO_DTYPE
+from src.drivers.ReplayCamera import ReplayCamera
+
+HEIGHT, WIDTH = 12, 16
+
+def record(path, frame_count=10, batch_size=4, ffc_at=(0, 6)):
+    recorder = RawRecorder(path, WIDTH, HEIGHT, {"serial_number": np.uint32(1234), "fps": 9}, batch_size=batch_size)
+    frame_info = np.zeros(1, dtype=FRAME_INFO_DTYPE)[0]
+    for index in range(frame_count):
+        frame_info["frame_index"] = 100 + index
+        frame_info["fpa_temp_celsius"] = 30 + index / 10
+        frame_info["timestamp"] = 1000 + index / 9
+        if index in ffc_at:
+            recorder.add_ffc_frame(np.full((HEIGHT, WIDTH), index + 0.5), frame_info)
+        recorder.append(np.full((HEIGHT, WIDTH), index, dtype=np.uint16), frame_info)
+    recorder.close()
+
+def test_round_trip_with_index(tmp_path):
+    path = str(tmp_path / "capture.irraw")
+    record(path)
+
+    reader = RawReader(path)
+    assert len(reader) == 10
+    assert reader.parameters == {"serial_number": 1234, "fps": 9}
+    for index in (0, 3, 4, 9):
+        assert np.all(reader.frame(index) == index)
+        assert reader.frame_info(index)["frame_index"] == 100 + index
+    assert np.array_equal(reader.frame_infos()["frame_index"], np.arange(100, 110))
+    assert np.array_equal(reader.frames(4, 8)[:, 0, 0], [4, 5, 6, 7])
+    assert reader.ffc_frame_for(5)[0, 0] == 0.5
+    assert reader.ffc_frame_for(6)[0, 0] == 6.5
+
+def test_interrupted_recording_is_scanned(tmp_path):
+    path = str(tmp_path / "capture.irraw")
+    record(path)
+    with open(path, "r+b") as f:
+        f.seek(-RAW_FOOTER.size, 2)
+        f.truncate()
+
+    reader = RawReader(path)
+    assert len(reader) == 10
+    assert np.all(reader.frame(9) == 9)
+    assert reader.ffc_frame_for(7)[0, 0] == 6.5
+
+def test_replay_camera_reads_recording(tmp_path):
+    path = str(tmp_path / "capture.irraw")
+    record(path)
+    camera = ReplayCamera(path, realtime=False, threaded_acquisition=False)
+    camera.connect()
+    assert camera.framerate == 9
+    for index in range(8):
+        camera.read()
+        assert np.all(camera.frame_buffer == index)
+    assert camera.ffc_frame[0, 0] == 6.5
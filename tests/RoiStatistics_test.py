@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from src.Calibrator import Calibrator
+from src.Compositor import Compositor
+from src.Radiometry import LinearCalibrationModel, RadiometricEngine
+from src.RoiStatistics import RoiStatistics, read_roi_log
+
+def random_rois(rng, count, width, height):
+    x = rng.integers(0, width - 1, count)
+    y = rng.integers(0, height - 1, count)
+    return np.stack([x, y, rng.integers(1, width - x + 1), rng.integers(1, height - y + 1)], axis=1)
+
+@pytest.mark.parametrize("count, direct", [(200, False), (3, True)])
+def test_statistics_match_slicing(count, direct):
+    rng = np.random.default_rng(0)
+    frame = rng.normal(8000, 300, (120, 160)).astype(np.float32)
+    rois = random_rois(rng, count, 160, 120)
+    if direct:
+        rois[:, 2:] = np.minimum(rois[:, 2:], 20)
+    statistics = RoiStatistics()
+    statistics.set_rois(rois)
+    results = statistics.compute(frame)
+
+    assert statistics.direct == direct
+    assert len(results) == count
+    for result, (x, y, width, height) in zip(results, rois):
+        area = frame[y:y + height, x:x + width]
+        assert result["min"] == area.min()
+        assert result["max"] == area.max()
+        assert abs(result["mean"] - area.mean()) < 1e-2
+        assert abs(result["std"] - area.std()) < 1e-2
+    assert np.all(np.isnan(results["mean_celsius"]))
+
+def test_rois_are_clipped_to_the_frame():
+    frame = np.arange(12 * 16, dtype=np.float32).reshape(12, 16)
+    statistics = RoiStatistics()
+    statistics.set_rois([(10, 8, 20, 20), (-5, -5, 6, 6)])
+    results = statistics.compute(frame)
+    assert results[0]["min"] == frame[8, 10] and results[0]["max"] == frame[11, 15]
+    assert results[1]["min"] == frame[0, 0] and results[1]["max"] == frame[0, 0]
+    with pytest.raises(ValueError):
+        statistics.set_rois([(0, 0, 0, 4)])
+
+def test_temperatures_come_from_the_radiometric_engine():
+    frame = np.full((120, 160), 9000, dtype=np.float32)
+    statistics = RoiStatistics()
+    statistics.set_rois([(10, 10, 20, 20)])
+    radiometry = RadiometricEngine(LinearCalibrationModel(gain=0.01, offset=8000))
+    results = statistics.compute(frame, radiometry, 25.0)
+    assert abs(results[0]["mean_celsius"] - 35.0) < 1e-3
+    assert abs(results[0]["max_celsius"] - 35.0) < 1e-3
+
+def test_compositor_logs_roi_statistics(tmp_path):
+    compositor = Compositor()
+    compositor.calibrator = Calibrator()
+    compositor.roi_statistics.set_rois([(0, 0, 16, 16), (40, 30, 80, 60)])
+    path = str(tmp_path / "rois.bin")
+    compositor.start_roi_log(path)
+    ffc_frame = np.zeros((120, 160), np.float32)
+    for level in (1000, 2000, 3000):
+        compositor.render(np.full((120, 160), level, np.uint16), ffc_frame)
+    compositor.stop_roi_log()
+
+    log = read_roi_log(path)
+    assert len(log) == 6
+    assert log["frame"].tolist() == [0, 0, 1, 1, 2, 2]
+    assert log["roi"].tolist() == [0, 1] * 3
+    assert log["mean"].tolist() == [1000, 1000, 2000, 2000, 3000, 3000]
@@ -0,0 +1,58 @@
+import csv
+import time
+
+from src.Telemetry import Telemetry, TelemetrySink, RollingHistogram
+
+def test_disabled_telemetry_records_nothing():
+    telemetry = Telemetry(enabled=False)
+    started = telemetry.start()
+    telemetry.stop("stage", started)
+    telemetry.tick("frames")
+    telemetry.set_value("dropped", 3)
+    assert started == 0
+    assert telemetry.snapshot().keys() == {"time"}
+
+def test_rolling_histogram_keeps_window():
+    histogram = RollingHistogram(window=100)
+    for value in range(1000):
+        histogram.add(value)
+    p50, p95, p99 = histogram.percentiles()
+    assert 940 < p50 < 960
+    assert p99 <= 999
+
+def test_snapshot_and_csv_sink(tmp_path):
+    telemetry = Telemetry(enabled=True)
+    for _ in range(10):
+        started = telemetry.start()
+        time.sleep(0.001)
+        telemetry.stop("colorize", started)
+        telemetry.tick("acquired")
+    telemetry.set_value("frames_dropped", 2)
+
+    snapshot = telemetry.snapshot()
+    assert snapshot["colorize_p50_ms"] >= 1
+    assert snapshot["acquired_fps"] > 0
+    assert snapshot["frames_dropped"] == 2
+    assert "colorize" in telemetry.summary()
+
+    path = tmp_path / "telemetry.csv"
+    sink = TelemetrySink(telemetry, str(path), interval=0.01).start()
+    time.sleep(0.05)
+    # a stage showing up later adds rows under the same header
+    started = telemetry.start()
+    telemetry.stop("encode", started)
+    time.sleep(0.05)
+    sink.stop()
+    rows = list(csv.DictReader(open(path)))
+    assert rows and all(row.keys() == {"time", "key", "value"} for row in rows)
+    assert float(next(row for row in rows if row["key"] == "frames_dropped")["value"]) == 2
+    assert any(row["key"] == "encode_p50_ms" for row in rows)
+
+def test_named_sink_logs_with_its_name(caplog):
+    telemetry = Telemetry(enabled=True)
+    telemetry.tick("acquired")
+    with caplog.at_level("INFO", logger="src.Telemetry"):
+        sink = TelemetrySink(telemetry, interval=0.01, name=7).start()
+        time.sleep(0.05)
+        sink.stop()
+    assert caplog.messages and all(message.startswith("7: ") for message in caplog.messages)
@@ -0,0 +1,54 @@
+import numpy as np
+
+from src.Compositor import Compositor
+from src.TemporalDenoiser import TemporalDenoiser
+
+HEIGHT, WIDTH = 120, 160
+NOISE = 20.0
+
+def make_scene():
+    rows, cols = np.mgrid[0:HEIGHT, 0:WIDTH]
+    return (8000 + 10 * cols + 5 * rows).astype(np.float32)
+
+def test_static_noise_is_reduced():
+    rng = np.random.default_rng(0)
+    scene = make_scene()
+    denoiser = TemporalDenoiser(strength=0.8, motion_threshold=3 * NOISE)
+    for _ in range(50):
+        frame = scene + rng.normal(0, NOISE, scene.shape).astype(np.float32)
+        output = denoiser.denoise(frame)
+    residual = np.std(output - scene)
+    assert residual < NOISE / 2
+
+def test_motion_does_not_trail():
+    rng = np.random.default_rng(0)
+    scene = make_scene()
+    denoiser = TemporalDenoiser(strength=0.9, motion_threshold=3 * NOISE)
+    for _ in range(20):
+        denoiser.denoise(scene + rng.normal(0, NOISE, scene.shape).astype(np.float32))
+
+    moved = scene.copy()
+    moved[40:60, 40:60] += 2000
+    output = denoiser.denoise(moved + rng.normal(0, NOISE, scene.shape).astype(np.float32))
+    # a hot object shows up at once instead of fading in over ~10 frames
+    assert np.all(np.abs(output[40:60, 40:60] - moved[40:60, 40:60]) < 5 * NOISE)
+
+def test_reset_on_ffc_and_settings():
+    compositor = Compositor()
+    compositor.settings.temporal_denoise = True
+    frame = np.full((HEIGHT, WIDTH), 100, dtype=np.uint16)
+    ffc_frame = np.zeros((HEIGHT, WIDTH), dtype=np.float32)
+    compositor.denoise(compositor.correct_ffc(frame, ffc_frame))
+    assert compositor.temporal_denoiser.initialized
+
+    compositor.correct_ffc(frame, np.ones((HEIGHT, WIDTH), dtype=np.float32))
+    assert not compositor.temporal_denoiser.initialized
+
+    compositor.denoise(compositor.correct_ffc(frame, ffc_frame))
+    compositor.settings.denoise_strength = 0.5
+    compositor.denoise(compositor.correct_ffc(frame, ffc_frame))
+    assert compositor.temporal_denoiser.strength == 0.5
+    state = compositor.temporal_denoiser.state
+    compositor.denoise(compositor.correct_ffc(frame, ffc_frame))
+    # the state buffer is reused from frame to frame
+    assert compositor.temporal_denoiser.state is state
@@ -0,0 +1,81 @@
+import numpy as np
+
+from src.RawRecording import RawReader
+from src.Radiometry import RadiometricEngine, LinearCalibrationModel
+from src.TriggerEngine import TriggerEngine, MotionTrigger, TemperatureTrigger
+from src.drivers.frame_info import FRAME_INFO_DTYPE
+
+HEIGHT, WIDTH = 24, 32
+
+def feed(engine, frames, ffc_frame, performing_ffc=False):
+    frame_info = np.zeros(1, dtype=FRAME_INFO_DTYPE)[0]
+    for frame in frames:
+        frame_info["frame_index"] = engine.ring_buffer.sequence + 1
+        frame_info["fpa_temp_celsius"] = 30.0
+        engine.on_frame(frame, frame_info, ffc_frame, performing_ffc)
+
+def still_frames(count, level=1000):
+    return [np.full((HEIGHT, WIDTH), level, dtype=np.uint16) for _ in range(count)]
+
+def test_motion_records_pre_and_post_trigger_window(tmp_path):
+    prefix = str(tmp_path / "watch")
+    # 4 frames before the trigger, 3 after
+    engine = TriggerEngine(prefix, (HEIGHT, WIDTH), 10, pre_trigger_seconds=0.4, post_trigger_seconds=0.3,
+                           triggers=[MotionTrigger()])
+    ffc_frame = np.full((HEIGHT, WIDTH), 1000, dtype=np.float32)
+    feed(engine, still_frames(20), ffc_frame)
+    assert engine.events == [] and not (tmp_path / "watch_event1.irraw").exists()
+
+    moving = still_frames(1)[0]
+    moving[4:12, 8:16] = 1500
+    feed(engine, [moving], ffc_frame)
+    assert engine.recording_event
+    feed(engine, still_frames(10), ffc_frame)
+    engine.close()
+
+    event, = engine.events
+    assert event.trigger == "motion" and event.pre_trigger_frames == 4
+    reader = RawReader(event.path)
+    assert len(reader) == 8
+    assert np.array_equal(reader.frame_infos()["frame_index"], np.arange(17, 25))
+    assert np.array_equal(reader.frame(4), moving)
+    assert reader.ffc_frame_for(0)[0, 0] == 1000
+
+def test_retrigger_extends_the_event_and_external_trigger(tmp_path):
+    engine = TriggerEngine(str(tmp_path / "watch"), (HEIGHT, WIDTH), 10, pre_trigger_seconds=0.2,
+                           post_trigger_seconds=0.3)
+    ffc_frame = np.zeros((HEIGHT, WIDTH), dtype=np.float32)
+    feed(engine, still_frames(5), ffc_frame)
+    engine.fire()
+    feed(engine, still_frames(2), ffc_frame)
+    # during FFC only the external trigger is evaluated
+    engine.fire()
+    feed(engine, still_frames(1), ffc_frame, performing_ffc=True)
+    feed(engine, still_frames(10), ffc_frame)
+    engine.fire()
+    feed(engine, still_frames(1), ffc_frame)
+    engine.close()
+
+    first, second = engine.events
+    assert first.trigger == "external" and first.retriggers == 1
+    # 2 pre-trigger, the trigger, 1 frame, the retrigger and 3 after it
+    assert len(RawReader(first.path)) == 8
+    assert second.path.endswith("watch_event2.irraw")
+    assert len(RawReader(second.path)) == 3
+
+def test_temperature_trigger_on_roi(tmp_path):
+    engine = TriggerEngine(str(tmp_path / "watch"), (HEIGHT, WIDTH), 10, pre_trigger_seconds=0.1,
+                           post_trigger_seconds=0.1, triggers=[TemperatureTrigger(50.0, roi=(16, 0, 16, 12))])
+    # 20 degrees at 1000 counts, 0.1 degrees per count
+    engine.radiometry = RadiometricEngine(LinearCalibrationModel(0.1, 1000, reference_celsius=20.0))
+    ffc_frame = np.full((HEIGHT, WIDTH), 1000, dtype=np.float32)
+    hot_outside = still_frames(1)[0]
+    hot_outside[16:, :8] = 1400
+    feed(engine, [hot_outside] * 3, ffc_frame)
+    assert engine.events == []
+
+    hot_inside = still_frames(1)[0]
+    hot_inside[4:8, 20:24] = 1400
+    feed(engine, [hot_inside], ffc_frame)
+    assert engine.events[0].trigger == "temperature"
+    engine.close()
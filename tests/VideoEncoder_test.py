@@ -0,0 +1,98 @@
+import threading
+import time
+import cv2
+import numpy as np
+
+from src.VideoEncoder import (
+    VideoEncoder,
+    BACKPRESSURE_BLOCK,
+    BACKPRESSURE_DROP_NEWEST,
+    BACKPRESSURE_DROP_OLDEST,
+)
+
+WIDTH, HEIGHT = 64, 48
+
+def make_frame(value):
+    return np.full((HEIGHT, WIDTH, 3), value, dtype=np.uint8)
+
+def count_frames(path):
+    capture = cv2.VideoCapture(path)
+    frames = 0
+    while capture.read()[0]:
+        frames += 1
+    capture.release()
+    return frames
+
+def blocking_writer(release, encoded):
+    return type("BlockingWriter", (), {
+        "write": lambda self, frame: (release.wait(), encoded.append(int(frame[0, 0, 0]))),
+        "release": lambda self: None,
+    })()
+
+def test_encodes_every_frame_and_scales(tmp_path):
+    path = str(tmp_path / "output.avi")
+    encoder = VideoEncoder(path, 10, (WIDTH, HEIGHT), codec="MJPG", scale=2, backpressure=BACKPRESSURE_BLOCK, queue_size=4)
+    for value in range(20):
+        assert encoder.submit(make_frame(value * 10))
+    encoder.close()
+    assert encoder.frames_queued == encoder.frames_encoded == 20
+    assert encoder.frames_dropped == 0
+    assert count_frames(path) == 20
+    capture = cv2.VideoCapture(path)
+    assert capture.read()[1].shape == (HEIGHT * 2, WIDTH * 2, 3)
+    capture.release()
+
+def test_drop_policies(tmp_path):
+    for policy, kept in ((BACKPRESSURE_DROP_NEWEST, [0, 1, 2]), (BACKPRESSURE_DROP_OLDEST, [0, 8, 9])):
+        encoder = VideoEncoder(str(tmp_path / f"{policy}.avi"), 10, (WIDTH, HEIGHT), codec="MJPG", queue_size=2, backpressure=policy)
+        encoded = []
+        release = threading.Event()
+        encoder.video_writer = blocking_writer(release, encoded)
+        encoder.submit(make_frame(0))
+        while encoder.queue_depth:
+            time.sleep(0.001) # wait for the worker to pick up the first frame
+        for value in range(1, 10):
+            encoder.submit(make_frame(value))
+        release.set()
+        encoder.close()
+        assert encoded == kept
+        assert encoder.frames_dropped == 7
+
+def test_blocked_submit_is_refused_on_close(tmp_path):
+    encoder = VideoEncoder(str(tmp_path / "output.avi"), 10, (WIDTH, HEIGHT), codec="MJPG", queue_size=1,
+                           backpressure=BACKPRESSURE_BLOCK)
+    encoded = []
+    release = threading.Event()
+    encoder.video_writer = blocking_writer(release, encoded)
+    encoder.submit(make_frame(0))
+    while encoder.queue_depth:
+        time.sleep(0.001)
+    encoder.submit(make_frame(1))
+    results = []
+    submitter = threading.Thread(target=lambda: results.append(encoder.submit(make_frame(2))))
+    submitter.start()
+    time.sleep(0.02)
+    closer = threading.Thread(target=encoder.close)
+    closer.start()
+    submitter.join(1)
+    assert results == [False]
+    release.set()
+    closer.join(1)
+    assert encoded == [0, 1] and encoder.frames_dropped == 1
+
+def test_failed_worker_releases_blocked_submitters(tmp_path):
+    encoder = VideoEncoder(str(tmp_path / "output.avi"), 10, (WIDTH, HEIGHT), codec="MJPG", queue_size=1,
+                           backpressure=BACKPRESSURE_BLOCK)
+    def fail(frame):
+        time.sleep(0.01)
+        raise OSError("disk full")
+    encoder.video_writer = type("FailingWriter", (), {"write": lambda self, frame: fail(frame),
+                                                      "release": lambda self: None})()
+    results = []
+    submitter = threading.Thread(target=lambda: results.extend(encoder.submit(make_frame(value)) for value in range(5)))
+    submitter.start()
+    submitter.join(2)
+    assert not submitter.is_alive()
+    assert results[0] and not results[-1]
+    assert isinstance(encoder.error, OSError)
+    encoder.close()
@@ -0,0 +1,217 @@
+import numpy as np
+import pytest
+
+from src.drivers.MAG160Core import Mag160Core, COMMAND_CODES, FRAME_TAIL_DTYPE, RESPONSE_CODES
+
+WIDTH, HEIGHT = 160, 120
+
+class FakeEndpoint():
+    bEndpointAddress = 0x81
+
+class FakeUsbDevice():
+    """Serves canned header/content packets to `read` calls."""
+    def __init__(self, packets):
+        self.packets = packets
+        self.reads = 0
+
+    def read(self, endpoint, buffer, timeout):
+        packet = self.packets[self.reads % len(self.packets)]
+        self.reads += 1
+        memoryview(buffer)[:len(packet)] = packet
+        return len(packet)
+
+def make_content_packet(frame, frame_index, fpa_temp, int_drop=0):
+    tail = np.zeros(1, dtype=FRAME_TAIL_DTYPE)
+    tail["code"] = 0x1BB1B11C
+    tail["frame_index"] = frame_index
+    tail["fpa_temp"] = fpa_temp
+    tail["int_drop"] = int_drop
+    return frame.astype("<u2").tobytes() + tail.tobytes()
+
+def make_camera(packets):
+    camera = Mag160Core()
+    camera.frame_width, camera.frame_height = WIDTH, HEIGHT
+    camera.frame_packet_size = WIDTH * HEIGHT * 2 + 1024
+    camera.device_info = {"fpa_temp_fix": 250}
+    camera.imgin_endpoint = FakeEndpoint()
+    camera.device = FakeUsbDevice(packets)
+    camera.allocate_frame_buffers()
+    return camera
+
+def test_get_image_data_decodes_packet_in_place():
+    frame = np.arange(WIDTH * HEIGHT, dtype=np.uint16).reshape(HEIGHT, WIDTH)
+    header = bytes(28)
+    camera = make_camera([header, make_content_packet(frame, 42, 30000, 3)])
+
+    image, frame_info = camera.get_image_data()
+    assert image.dtype == np.uint16
+    assert np.array_equal(image, frame)
+    assert frame_info["frame_index"] == 42
+    assert frame_info["int_drop"] == 3
+    assert frame_info["fpa_temp_celsius"] == np.float32(30.25)
+    assert frame_info["cam_temp_celsius"] == np.float32(29.75)
+
+    # the next frame reuses the same buffers
+    image2, frame_info2 = camera.get_image_data()
+    assert np.shares_memory(image, image2)
+
+def test_find_devices_lists_every_core(monkeypatch):
+    import usb.core
+    from src.drivers import MAG160Core as mag160_core
+    cores = [object(), object()]
+    def find(find_all=False, **match):
+        assert find_all and match == {"idVendor": mag160_core.VID, "idProduct": mag160_core.PID}
+        return iter(cores)
+    monkeypatch.setattr(usb.core, "find", find)
+    assert mag160_core.find_devices() == cores
+    assert Mag160Core(cores[1]).device is cores[1]
+
+class FakeCalibrationDevice():
+    """Answers GetCaliInfo and streams a calibration file in blocks."""
+    def __init__(self, data, timestamp):
+        self.data = data
+        self.timestamp = timestamp
+        self.position = 0
+        self.commands = []
+
+    def write(self, endpoint, data, timeout):
+        self.commands.append(int.from_bytes(data[:4], "little"))
+        return len(data)
+
+    def read(self, endpoint, buffer, timeout):
+        if endpoint == CALIBRATION_ENDPOINT.bEndpointAddress:
+            block = self.data[self.position:self.position + len(buffer) - 100]
+            self.position += len(block)
+            memoryview(buffer)[:len(block)] = block
+            return len(block)
+        response = bytearray(64)
+        response[0:4] = RESPONSE_CODES["SendCaliInfo"].to_bytes(4, "little")
+        response[4:8] = len(self.data).to_bytes(4, "little")
+        response[12:20] = self.timestamp.to_bytes(8, "little")
+        return response
+
+class CalibrationEndpoint():
+    bEndpointAddress = 0x84
+
+CALIBRATION_ENDPOINT = CalibrationEndpoint()
+
+def make_calibration_camera(tmp_path, data, timestamp=1700000000):
+    camera = Mag160Core()
+    camera.device = FakeCalibrationDevice(data, timestamp)
+    camera.cmdout_endpoint = camera.cmdin_endpoint = FakeEndpoint()
+    camera.calibration_in_endpoint = CALIBRATION_ENDPOINT
+    camera.device_info = {"serial_number": 1234}
+    camera.calibration_cache_directory = str(tmp_path)
+    camera.commands.start()
+    camera.get_calibration_info()
+    return camera
+
+def test_calibration_file_streams_into_the_cache(tmp_path):
+    data = np.random.default_rng(0).integers(0, 256, 100000, dtype=np.uint8).tobytes()
+    camera = make_calibration_camera(tmp_path, data)
+    progress = []
+    calibration = camera.load_calibration_file(lambda received, size: progress.append((received, size)))
+    assert calibration.tobytes() == data
+    assert progress[-1] == (len(data), len(data))
+    assert all(a[0] < b[0] for a, b in zip(progress, progress[1:]))
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["1234_1700000000.dat"]
+
+    # reconnecting to the same camera skips the transfer
+    camera = make_calibration_camera(tmp_path, data)
+    assert camera.load_calibration_file().tobytes() == data
+    assert camera.device.position == 0
+    assert COMMAND_CODES["GetCaliFile"] not in camera.device.commands
+
+    # a new calibration date downloads again
+    camera = make_calibration_camera(tmp_path, data, timestamp=1700000001)
+    camera.load_calibration_file()
+    assert camera.device.position == len(data)
+
+def test_calibration_file_size_is_validated(tmp_path):
+    camera = make_calibration_camera(tmp_path, bytes(1000))
+    with pytest.raises(ValueError):
+        camera.load_calibration_file()
+
+def test_interrupted_download_leaves_no_cache(tmp_path):
+    camera = make_calibration_camera(tmp_path, bytes(100000))
+    camera.device.data = camera.device.data[:70000]
+    with pytest.raises(IOError):
+        camera.load_calibration_file()
+    assert list(tmp_path.iterdir()) == []
+
+class FakeParameterDevice():
+    def __init__(self, parameter1, parameter2):
+        self.responses = {
+            COMMAND_CODES["GetParameter1"]: RESPONSE_CODES["SendParameter1"].to_bytes(4, "little") + parameter1,
+            COMMAND_CODES["GetParameter2"]: RESPONSE_CODES["SendParameter2"].to_bytes(4, "little") + parameter2,
+        }
+        self.commands = []
+
+    def write(self, endpoint, data, timeout):
+        self.commands.append(int.from_bytes(data[:4], "little"))
+
+    def read(self, endpoint, size, timeout):
+        return self.responses[self.commands[-1]]
+
+def test_parameters_are_parsed_and_cached_per_serial(tmp_path):
+    rng = np.random.default_rng(0)
+    parameter1, parameter2 = (rng.integers(0, 256, 60, dtype=np.uint8).tobytes() for _ in range(2))
+    def make_parameter_camera():
+        camera = Mag160Core()
+        camera.device = FakeParameterDevice(parameter1, parameter2)
+        camera.cmdout_endpoint = camera.cmdin_endpoint = FakeEndpoint()
+        camera.parameter_cache_directory = str(tmp_path)
+        camera.commands.start()
+        return camera
+
+    camera = make_parameter_camera()
+    parameters = camera.get_parameters()
+    camera.commands.stop()
+    word = lambda data, start, size=4: int.from_bytes(data[start:start + size], "little")
+    assert parameters["serial_number"] == word(parameter1, 0)
+    assert parameters["hardware_version"] == word(parameter1, 4, 3)
+    assert parameters["device_type"] == parameter1[7]
+    assert parameters["gsk"] == word(parameter1, 52)
+    assert parameters["reserved_3"] == word(parameter2, 12, 2)
+    assert parameters["fpa_temp_fix"] == word(parameter2, 14, 2)
+    assert parameters["at_error_slope"] == np.frombuffer(parameter2[44:48], "<f4")[0]
+    assert parameters["reserved_5"] == word(parameter2, 52)
+
+    # a known camera only identifies itself
+    camera = make_parameter_camera()
+    assert camera.get_parameters() == parameters
+    assert camera.device.commands == [COMMAND_CODES["GetParameter1"]]
+
+    # setting parameters invalidates the cache
+    camera.device_info = parameters
+    camera.commands.stop()
+    camera.clear_cached_parameters()
+    camera = make_parameter_camera()
+    camera.get_parameters()
+    assert COMMAND_CODES["GetParameter2"] in camera.device.commands
+    camera.commands.stop()
+
+class FakeUnresponsiveDevice():
+    """Enumerates fine but never answers a command."""
+    def set_configuration(self):
+        pass
+
+    def get_active_configuration(self):
+        return {(0, 0): None}
+
+    def write(self, endpoint, data, timeout):
+        import usb.core
+        raise usb.core.USBTimeoutError("timeout")
+
+def test_failed_connect_releases_the_device(monkeypatch):
+    import usb.util
+    from src.drivers import MAG160Core as mag160_core
+    claimed = []
+    monkeypatch.setattr(usb.util, "claim_interface", lambda device, interface: claimed.append(interface))
+    monkeypatch.setattr(usb.util, "release_interface", lambda device, interface: claimed.remove(interface))
+    monkeypatch.setattr(mag160_core, "get_endpoint", lambda interface, address: FakeEndpoint())
+    camera = Mag160Core(FakeUnresponsiveDevice())
+    with pytest.raises(Exception):
+        camera.connect()
+    assert claimed == []
+    assert not camera.commands.running
@@ -0,0 +1,42 @@
+import numpy as np
+
+from src.drivers.SyntheticCamera import SyntheticCamera
+from src.drivers.ReplayCamera import ReplayCamera, save_capture
+from src.drivers.base import FRAME_INFO_DTYPE
+
+def test_synthetic_frames_and_ffc():
+    camera = SyntheticCamera(width=64, height=48, realtime=False, threaded_acquisition=False, dead_pixels=5)
+    camera.connect()
+    received = []
+    camera.frame_ready.connect(lambda message: received.append(camera.frame_info["frame_index"]))
+
+    camera.read()
+    assert camera.frame_buffer.shape == (48, 64)
+    assert camera.frame_buffer.dtype == np.uint16
+    assert np.count_nonzero(camera.frame_buffer == 0) >= 5
+    # the first frame triggers the temperature FFC
+    assert camera.performing_ffc
+
+    for _ in range(30):
+        camera.read()
+    assert not camera.performing_ffc
+    assert received == list(range(31))
+    # the reference is the closed shutter image: flat level plus fixed pattern
+    assert abs(camera.ffc_frame.mean() - camera.base_level) < 50
+    corrected = camera.frame_buffer - camera.ffc_frame
+    assert np.std(corrected[~camera.dead_pixel_mask]) < np.std(camera.frame_buffer[~camera.dead_pixel_mask])
+
+def test_replay_serves_recorded_frames(tmp_path):
+    frames = np.arange(5 * 6 * 4, dtype=np.uint16).reshape(5, 6, 4)
+    frame_infos = np.zeros(5, dtype=FRAME_INFO_DTYPE)
+    frame_infos["frame_index"] = np.arange(100, 105)
+    path = str(tmp_path / "capture.npy")
+    save_capture(path, frames, frame_infos)
+
+    camera = ReplayCamera(path, realtime=False, threaded_acquisition=False)
+    camera.connect()
+    assert (camera.frame_height, camera.frame_width) == (6, 4)
+    for index in range(7):
+        camera.read()
+        assert np.array_equal(camera.frame_buffer, frames[index % 5])
+        assert camera.frame_info["frame_index"] == 100 + index % 5
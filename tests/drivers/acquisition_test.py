@@ -0,0 +1,45 @@
+import time
+import numpy as np
+from PyQt5.QtCore import QCoreApplication
+
+from src.drivers.acquisition import AcquisitionThread
+from src.RingBuffer import RingBuffer
+
+app = QCoreApplication.instance() or QCoreApplication([])
+
+def test_ring_buffer_latest():
+    ring = RingBuffer(3, (2, 2), np.uint16)
+    assert ring.latest()[0] is None
+    for i in range(5):
+        ring.push(np.full((2, 2), i), {"frame_index": i})
+    frame, info, sequence = ring.latest()
+    assert sequence == 5
+    assert frame[0, 0] == 4 and info["frame_index"] == 4
+    assert ring.get(2) == (None, None)
+    assert ring.get(4)[0][0, 0] == 3
+
+def test_acquisition_counts_index_gaps():
+    indices = iter([0, 1, 2, 5, 6, 10])
+    def grab_frame():
+        try:
+            index = next(indices)
+        except StopIteration:
+            time.sleep(0.001)
+            return None
+        return np.full((4, 4), index, np.uint16), {"frame_index": index}
+
+    received = []
+    acquisition = AcquisitionThread(grab_frame, (4, 4), np.uint16, lambda: received.append(acquisition.latest()))
+    acquisition.start()
+    deadline = time.time() + 2
+    while acquisition.frames_acquired < 6 and time.time() < deadline:
+        time.sleep(0.001)
+    acquisition.stop()
+    app.processEvents()
+
+    assert acquisition.frames_acquired == 6
+    assert acquisition.frames_dropped == 5
+    # the GUI side only ever sees the newest frame
+    frame, info = received[-1]
+    assert info["frame_index"] == 10
+    assert frame[0, 0] == 10
@@ -0,0 +1,51 @@
+import threading
+import pytest
+
+from src.drivers.commands import CommandChannel, response_code
+
+def word(value):
+    return value.to_bytes(4, "little")
+
+class FakeCommandPipe():
+    """Answers every command with the responses queued for it."""
+    def __init__(self, answers):
+        self.answers = answers
+        self.responses = []
+        self.threads = set()
+
+    def write(self, payload, timeout):
+        self.threads.add(threading.current_thread().name)
+        self.responses.extend(self.answers.get(response_code(payload), []))
+
+    def read(self, timeout):
+        if not self.responses:
+            raise TimeoutError("read timed out")
+        return self.responses.pop(0)
+
+def test_responses_are_matched_by_code():
+    # a stale response left by an earlier command comes first
+    pipe = FakeCommandPipe({1: [word(0xA2) + b"late", word(0xA1) + b"data"], 2: [word(0xFF)]})
+    channel = CommandChannel(pipe.write, pipe.read)
+    channel.start()
+    first = channel.submit(word(1), expected_response=0xA1)
+    second = channel.submit(word(2))
+    silent = channel.submit(word(3), read_response=False)
+    assert first.result(1) == word(0xA1) + b"data"
+    assert second.result(1) == word(0xFF)
+    assert silent.result(1) is None
+    assert channel.responses_discarded == 1
+    assert pipe.threads == {"CommandChannel"}
+    channel.stop()
+
+def test_errors_are_set_on_the_future():
+    pipe = FakeCommandPipe({1: [word(0xA2)]})
+    channel = CommandChannel(pipe.write, pipe.read)
+    channel.start()
+    with pytest.raises(TimeoutError):
+        channel.submit(word(1), expected_response=0xA1, timeout=50).result(1)
+    # the channel keeps serving commands
+    pipe.answers[2] = [word(0xA3)]
+    assert channel.submit(word(2)).result(1) == word(0xA3)
+    channel.stop()
+    with pytest.raises(RuntimeError):
+        channel.submit(word(2))
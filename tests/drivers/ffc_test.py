@@ -0,0 +1,37 @@
+import numpy as np
+
+from src.drivers.ffc import FfcStateMachine, FFC_IDLE
+
+def make_info(fpa_temp_celsius):
+    return {"fpa_temp_celsius": fpa_temp_celsius}
+
+def test_ffc_sequence_averages_reference():
+    shutter_states = []
+    references = []
+    ffc = FfcStateMachine(shutter_states.append, lambda reference, info: references.append(reference), 
+                          framerate=10, averaged_frames=4)
+    ffc.last_ffc_temp = 30.0
+    ffc.request()
+
+    frame_values = iter(range(100))
+    while True:
+        ffc.on_frame(np.full((2, 2), next(frame_values), np.uint16), make_info(30.0))
+        if not ffc.performing:
+            break
+
+    assert shutter_states == [1, 0]
+    assert len(references) == 1
+    # trigger at 0, 5 frames of shutter settling, then 6..9 are averaged
+    assert ffc.close_settle_frames == 5
+    assert np.allclose(references[0], 7.5)
+    assert references[0].dtype == np.float32
+
+def test_temperature_trigger_only_on_drift():
+    shutter_states = []
+    ffc = FfcStateMachine(shutter_states.append, lambda reference, info: None, framerate=10)
+    ffc.last_ffc_temp = 30.0
+    ffc.on_frame(np.zeros((2, 2)), make_info(30.2))
+    assert ffc.state == FFC_IDLE
+    ffc.on_frame(np.zeros((2, 2)), make_info(30.4))
+    assert ffc.performing
+    assert shutter_states == [1]
@@ -0,0 +1,30 @@
+import os
+import cv2
+
+from src import forms
+from src.settings import COLORMAPS
+
+def test_forms_are_compiled_once_and_recompiled_when_edited(tmp_path, monkeypatch):
+    ui_directory = tmp_path / "ui"
+    ui_directory.mkdir()
+    ui_source = open(os.path.join(forms.UI_DIRECTORY, "blind_pixel_detection_window.ui")).read()
+    (ui_directory / "dialog.ui").write_text(ui_source)
+    monkeypatch.setattr(forms, "UI_DIRECTORY", str(ui_directory))
+    monkeypatch.setattr(forms, "COMPILED_DIRECTORY", str(tmp_path / "compiled_ui"))
+
+    assert not forms.is_current("dialog")
+    form_class = forms.load_form("dialog")
+    assert form_class.__name__ == "Ui_Dialog"
+    assert forms.is_current("dialog")
+
+    compiled_at = os.path.getmtime(forms.compiled_path("dialog"))
+    forms.load_form("dialog")
+    assert os.path.getmtime(forms.compiled_path("dialog")) == compiled_at
+
+    (ui_directory / "dialog.ui").write_text(ui_source.replace("<class>Dialog<", "<class>Calibration<"))
+    assert not forms.is_current("dialog")
+    assert forms.load_form("dialog").__name__ == "Ui_Calibration"
+
+def test_static_colormaps_match_opencv():
+    opencv_colormaps = {name: getattr(cv2, name) for name in dir(cv2) if name.startswith("COLORMAP")}
+    assert {name: value for name, value in COLORMAPS.items() if value is not None} == opencv_colormaps
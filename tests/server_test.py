@@ -0,0 +1,118 @@
+import asyncio
+import numpy as np
+import pytest
+
+from src.Compositor import Compositor
+from src.drivers.SyntheticCamera import SyntheticCamera
+from src.drivers.frame_info import FRAME_INFO_DTYPE
+from src.server import FrameServer, Subscription, subscribe, receive_frame, FORMAT_RAW, FORMAT_JPEG, FORMAT_COLOR
+from src.settings import COLORMAPS
+
+@pytest.fixture
+def streaming_camera():
+    camera = SyntheticCamera(width=64, height=48, framerate=100, threaded_acquisition=True)
+    camera.connect()
+    server = FrameServer("127.0.0.1", 0).start()
+    server.attach(camera)
+    yield camera, server
+    server.stop()
+    camera.close()
+
+def test_fan_out_encodes_each_variant_once(streaming_camera):
+    camera, server = streaming_camera
+
+    async def run_clients():
+        clients = [
+            await subscribe("127.0.0.1", server.port, format=FORMAT_RAW),
+            await subscribe("127.0.0.1", server.port, format=FORMAT_RAW),
+            await subscribe("127.0.0.1", server.port, format=FORMAT_JPEG, roi=[8, 4, 32, 16]),
+            await subscribe("127.0.0.1", server.port, format=FORMAT_COLOR, decimation=3),
+        ]
+        received = [[await receive_frame(reader) for _ in range(5)] for reader, writer, _ in clients]
+        for _, writer, _ in clients:
+            writer.close()
+        return received
+
+    raw_a, raw_b, jpeg, color = asyncio.run(run_clients())
+    frame, frame_info, sequence = raw_a[-1]
+    assert frame.shape == (48, 64) and frame.dtype == np.dtype("<u2")
+    assert frame_info["timestamp"] > 0
+    assert jpeg[0][0].shape == (16, 32, 3)
+    assert color[0][0].shape == (48, 64, 3)
+    sequences = [sequence for _, _, sequence in color]
+    assert all(later - earlier >= 3 for earlier, later in zip(sequences, sequences[1:]))
+    # four clients, three variants
+    assert server.frames_encoded < 3.5 * max(raw_a[-1][2], raw_b[-1][2], jpeg[-1][2], color[-1][2])
+
+def test_slow_client_does_not_stall_acquisition():
+    camera = SyntheticCamera(width=640, height=512, framerate=50, threaded_acquisition=True)
+    camera.connect()
+    server = FrameServer("127.0.0.1", 0).start()
+    server.attach(camera)
+
+    async def slow_client():
+        reader, writer, _ = await subscribe("127.0.0.1", server.port, format=FORMAT_RAW)
+        await receive_frame(reader)
+        await asyncio.sleep(1)
+        client = server.clients[0]
+        writer.close()
+        return client
+
+    try:
+        client = asyncio.run(slow_client())
+        acquired = camera.acquisition_thread.frames_acquired
+    finally:
+        server.stop()
+        camera.close()
+    # stale frames were replaced instead of queued, capture kept its pace
+    assert client.frames_skipped > 0
+    assert acquired > 35
+
+def test_invalid_subscription_is_rejected(streaming_camera):
+    camera, server = streaming_camera
+    with pytest.raises(ValueError):
+        asyncio.run(subscribe("127.0.0.1", server.port, format="mpeg"))
+
+def test_roi_outside_the_frame_only_drops_its_client(streaming_camera):
+    camera, server = streaming_camera
+
+    async def run_clients():
+        # accepted before the first frame tells the server the frame size
+        bad_reader, bad_writer, _ = await subscribe("127.0.0.1", server.port, format=FORMAT_JPEG,
+                                                    roi=[100, 100, 10, 10])
+        reader, writer, _ = await subscribe("127.0.0.1", server.port, format=FORMAT_RAW, roi=[60, 40, 10, 10])
+        frames = [await receive_frame(reader) for _ in range(5)]
+        closed = await asyncio.wait_for(bad_reader.read(), 2)
+        with pytest.raises(ValueError):
+            await subscribe("127.0.0.1", server.port, format=FORMAT_COLOR, roi=[64, 0, 10, 10])
+        writer.close()
+        bad_writer.close()
+        return frames, closed
+
+    frames, closed = asyncio.run(run_clients())
+    assert closed == b""
+    # clipped to the frame
+    assert frames[-1][0].shape == (8, 4)
+
+def test_colorized_frames_are_ffc_corrected():
+    server = FrameServer()
+    ffc_frame = np.random.default_rng(0).integers(7900, 8100, (48, 64)).astype(np.float32)
+    frame = (ffc_frame + 100).astype(np.uint16)
+    frame[10:20, 10:20] += 500
+    message = server.encode(frame, np.zeros((), dtype=FRAME_INFO_DTYPE), 1, Subscription(FORMAT_COLOR), ffc_frame)
+    color_frame = np.frombuffer(message[-64 * 48 * 3:], dtype=np.uint8).reshape(-1, 3)
+    # the fixed pattern is gone, only the background and the hot square are left
+    assert len(np.unique(color_frame, axis=0)) == 2
+
+def test_custom_palette_is_served_without_touching_colormaps(tmp_path):
+    path = tmp_path / "server_red.txt"
+    np.savetxt(path, [[0, 0, 0], [255, 0, 0]], fmt="%d")
+    name = Compositor().load_palette(str(path))
+    assert name not in COLORMAPS
+
+    frame = np.tile(np.arange(64, dtype=np.uint16) * 10 + 8000, (48, 1))
+    message = FrameServer().encode(frame, np.zeros((), dtype=FRAME_INFO_DTYPE), 1,
+                                   Subscription(FORMAT_COLOR, palette=name), np.zeros((48, 64), dtype=np.float32))
+    color_frame = np.frombuffer(message[-64 * 48 * 3:], dtype=np.uint8).reshape(48, 64, 3)
+    # only the red channel of the BGR output is set
+    assert not color_frame[..., :2].any() and color_frame[0, -1, 2] == 255